@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de escritura de metadatos (MetadataSetter.write_tags).
+
+Genera fixtures M4A/MP3 sintéticos de varios tamaños (o copia una biblioteca
+existente con --folder) y mide, por archivo, la primera escritura de tags y el
+retag posterior, con y sin portada y letras. El escenario ``full-2pass`` guarda
+tags y portada en dos escrituras, como antes de la escritura en una pasada.
+Reporta percentiles de latencia, throughput (archivos/s) y bytes reescritos, y
+puede guardar JSON y compararlo contra un baseline para detectar regresiones.
+
+Uso:
+    python benchmarks/bench_metadata.py
+    python benchmarks/bench_metadata.py --files 100 --sizes 1,8,32 --json results.json
+    python benchmarks/bench_metadata.py --folder music/mi_playlist --scenarios full,full-2pass
+    python benchmarks/bench_metadata.py --baseline results.json --threshold 1.25
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mutagen
+from m4a_downloader.core.cover_art import CoverArt
+from m4a_downloader.core.metadata import MetadataSetter
+from m4a_downloader.core.timings import percentile
+from m4a_downloader.core.track_info import TrackInfo
+from benchmarks.fixtures import generate_library, make_cover
+
+SCENARIOS = {
+    'tags': {'cover': False, 'lyrics': False},
+    'tags+cover': {'cover': True, 'lyrics': False},
+    'tags+lyrics': {'cover': False, 'lyrics': True},
+    'full': {'cover': True, 'lyrics': True},
+    'full-2pass': {'cover': True, 'lyrics': True, 'two_pass': True},
+}
+FIRST_METADATA = TrackInfo(
+    artist_name="Benchmark Artist",
+    track_title="Benchmark Title",
+    track_number=1,
+    album_name="Benchmark Album",
+    release_date="2024-01-01",
+    artists=("Benchmark Artist",),
+)
+# El retag cambia los tags (p. ej. formato multi-artista) para forzar una escritura real
+RETAG_METADATA = dataclasses.replace(FIRST_METADATA, artists=("Benchmark Artist", "Featured Artist"), track_number=2)
+LYRICS = "[00:01.00] la la la la la la\n" * 60
+CHUNK_SIZE = 64 * 1024
+
+
+def bytes_rewritten(before_path, after_path):
+    """Bytes entre el primer y el último byte modificado (hasta el final si cambió el tamaño)"""
+    first_diff = None
+    last_diff = 0
+    offset = 0
+    with open(before_path, 'rb') as before, open(after_path, 'rb') as after:
+        while True:
+            a = before.read(CHUNK_SIZE)
+            b = after.read(CHUNK_SIZE)
+            if not a and not b:
+                break
+            if a != b:
+                # Afinar a nivel de byte dentro del bloque
+                common = min(len(a), len(b))
+                diffs = [i for i in range(common) if a[i] != b[i]]
+                if len(a) != len(b):
+                    diffs.append(common)
+                if first_diff is None:
+                    first_diff = offset + diffs[0]
+                last_diff = offset + (diffs[-1] + 1 if len(a) == len(b) else max(len(a), len(b)))
+            offset += max(len(a), len(b))
+    if first_diff is None:
+        return 0
+    if os.path.getsize(before_path) != os.path.getsize(after_path):
+        return os.path.getsize(after_path) - first_diff
+    return last_diff - first_diff
+
+
+def _snapshot(path):
+    snapshot = f"{path}.before"
+    with open(path, 'rb') as src, open(snapshot, 'wb') as dst:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            dst.write(chunk)
+    return snapshot
+
+
+def _measure(paths, metadata, lyrics, cover, two_pass=False):
+    latencies = []
+    rewritten = []
+    for path in paths:
+        snapshot = _snapshot(path)
+        start = time.perf_counter()
+        if two_pass:
+            # Tags de texto y después la portada, reabriendo el archivo
+            MetadataSetter.write_tags(path, metadata, lyrics=lyrics)
+        MetadataSetter.write_tags(path, metadata, lyrics=lyrics, cover=cover)
+        latencies.append((time.perf_counter() - start) * 1000)
+        rewritten.append(bytes_rewritten(snapshot, path))
+        os.remove(snapshot)
+    return latencies, rewritten
+
+
+def _summarize(latencies, rewritten):
+    return {
+        "files": len(latencies),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+        # Archivos por segundo de escritura, sin contar la preparación de cada archivo
+        "files_per_s": round(len(latencies) / (sum(latencies) / 1000), 2),
+        "bytes_rewritten_total": sum(rewritten),
+        "bytes_rewritten_per_file": round(sum(rewritten) / len(rewritten)),
+    }
+
+
+def _copy_library(source_files, folder):
+    """Copiar archivos existentes a ``folder`` para no tocar la biblioteca original"""
+    os.makedirs(folder)
+    return [shutil.copy2(path, folder) for path in source_files]
+
+
+def _run_case(results, paths, audio_format, size_mb, scenario, cover):
+    options = SCENARIOS[scenario]
+    lyrics = LYRICS if options['lyrics'] else None
+    scenario_cover = cover if options['cover'] else None
+
+    for phase, metadata in (('first', FIRST_METADATA), ('retag', RETAG_METADATA)):
+        # El retag es siempre una escritura; con padding suficiente, in-place
+        two_pass = options.get('two_pass', False) and phase == 'first'
+        latencies, rewritten = _measure(paths, metadata, lyrics, scenario_cover, two_pass)
+        row = {"format": audio_format, "audio_mb": size_mb, "scenario": scenario, "phase": phase}
+        row.update(_summarize(latencies, rewritten))
+        results.append(row)
+        print(f"{audio_format:<6} {size_mb:>5}MB {scenario:<12} {phase:<6} "
+              f"p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  p99 {row['p99_ms']:>8.2f}ms  "
+              f"{row['files_per_s']:>9.1f} files/s  rewritten/file {row['bytes_rewritten_per_file']:>10} B")
+
+    for path in paths:
+        os.remove(path)
+
+
+def run_suite(workdir, formats, sizes_mb, scenarios, files, source_files=None):
+    """Ejecutar cada combinación; con ``source_files`` se usan copias de esos archivos"""
+    cover = CoverArt(make_cover(), "image/jpeg")
+    results = []
+    if source_files:
+        size_mb = round(sum(os.path.getsize(path) for path in source_files) / len(source_files) / (1024 * 1024), 1)
+        for scenario in scenarios:
+            paths = _copy_library(source_files, os.path.join(workdir, f"folder_{scenario}"))
+            _run_case(results, paths, "folder", size_mb, scenario, cover)
+        return results
+
+    for audio_format in formats:
+        for size_mb in sizes_mb:
+            for scenario in scenarios:
+                folder = os.path.join(workdir, f"{audio_format}_{size_mb}mb_{scenario}")
+                paths = generate_library(folder, files, audio_format, audio_bytes=int(size_mb * 1024 * 1024))
+                _run_case(results, paths, audio_format, size_mb, scenario, cover)
+    return results
+
+
+def _result_key(row):
+    return (row["format"], row["audio_mb"], row["scenario"], row["phase"])
+
+
+def compare_with_baseline(results, baseline_path, threshold):
+    """Devolver ``(fila, fila del baseline, motivo)`` de cada p50 o throughput que empeoró más de ``threshold`` veces"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {_result_key(row): row for row in json.load(f)["results"]}
+    regressions = []
+    for row in results:
+        previous = baseline.get(_result_key(row))
+        if not previous:
+            continue
+        if previous["p50_ms"] > 0 and row["p50_ms"] / previous["p50_ms"] > threshold:
+            regressions.append((row, previous, f"p50 {previous['p50_ms']}ms -> {row['p50_ms']}ms"))
+        # Los baselines anteriores al throughput no lo tienen
+        if previous.get("files_per_s") and previous["files_per_s"] / row["files_per_s"] > threshold:
+            regressions.append((row, previous, f"{previous['files_per_s']} -> {row['files_per_s']} archivos/s"))
+    return regressions
+
+
+def _parse_list(value, cast=str):
+    return [cast(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=50, help='Archivos por combinación')
+    parser.add_argument('--formats', default='m4a,mp3', help='Formatos separados por coma')
+    parser.add_argument('--sizes', default='1,8', help='Tamaños de audio en MB separados por coma')
+    parser.add_argument('--folder', help='Carpeta con archivos .m4a/.mp3 existentes (en lugar de fixtures)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Escenarios: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--json', dest='json_path', help='Guardar resultados en JSON')
+    parser.add_argument('--baseline', help='JSON previo contra el que comparar p50 y throughput')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Factor de regresión permitido (p50 y throughput)')
+    args = parser.parse_args()
+
+    scenarios = _parse_list(args.scenarios)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(unknown)}")
+
+    source_files = None
+    if args.folder:
+        source_files = sorted(
+            os.path.join(args.folder, name) for name in os.listdir(args.folder)
+            if name.lower().endswith(('.m4a', '.mp3'))
+        )
+        if not source_files:
+            parser.error(f"No hay archivos .m4a/.mp3 en {args.folder}")
+
+    with tempfile.TemporaryDirectory(prefix='bench_metadata_') as workdir:
+        results = run_suite(
+            workdir,
+            _parse_list(args.formats),
+            _parse_list(args.sizes, float),
+            scenarios,
+            args.files,
+            source_files,
+        )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mutagen": mutagen.version_string,
+            "files_per_case": len(source_files) if source_files else args.files,
+            "folder": args.folder,
+        },
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados guardados en {args.json_path}")
+
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.threshold)
+        for row, previous, change in regressions:
+            print(f"REGRESIÓN {_result_key(row)}: {change}")
+        if regressions:
+            sys.exit(1)
+        print("Sin regresiones respecto al baseline")
+
+
+if __name__ == '__main__':
+    main()
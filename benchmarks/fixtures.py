@@ -0,0 +1,65 @@
+"""Synthetic M4A/MP3 fixtures for the benchmarks (no FFmpeg needed)"""
+import os
+import struct
+
+# Frame MPEG-1 Layer III, 128 kbps, 44.1 kHz, sin padding: 417 bytes
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x00'
+MP3_FRAME_SIZE = 417
+
+
+def _atom(name, payload):
+    return struct.pack('>I', 8 + len(payload)) + name + payload
+
+
+def _full_atom(name, payload, version=0, flags=0):
+    return _atom(name, struct.pack('>I', (version << 24) | flags) + payload)
+
+
+def make_m4a(path, audio_bytes=1024 * 1024, duration=180):
+    """Escribir un M4A mínimo (ftyp + moov + mdat) que mutagen puede taggear"""
+    ftyp = _atom(b'ftyp', b'M4A ' + struct.pack('>I', 0) + b'M4A isommp42')
+    mvhd = _full_atom(b'mvhd', struct.pack('>IIII', 0, 0, 1000, duration * 1000) + b'\x00' * 80)
+    mdhd = _full_atom(b'mdhd', struct.pack('>IIII', 0, 0, 44100, duration * 44100) + b'\x00' * 4)
+    hdlr = _full_atom(b'hdlr', b'\x00' * 4 + b'soun' + b'\x00' * 12 + b'SoundHandler\x00')
+    # stco con un único chunk: mutagen lo corrige si el moov cambia de tamaño
+    stco_placeholder = _full_atom(b'stco', struct.pack('>II', 1, 0))
+    stbl = _atom(b'stbl', stco_placeholder)
+    minf = _atom(b'minf', stbl)
+    mdia = _atom(b'mdia', mdhd + hdlr + minf)
+    trak = _atom(b'trak', mdia)
+    moov = _atom(b'moov', mvhd + trak)
+
+    mdat_offset = len(ftyp) + len(moov) + 8
+    moov = moov.replace(stco_placeholder, _full_atom(b'stco', struct.pack('>II', 1, mdat_offset)))
+
+    with open(path, 'wb') as f:
+        f.write(ftyp)
+        f.write(moov)
+        f.write(struct.pack('>I', 8 + audio_bytes) + b'mdat')
+        f.write(os.urandom(audio_bytes))
+    return path
+
+
+def make_mp3(path, audio_bytes=1024 * 1024):
+    """Escribir un MP3 sin tags compuesto por frames MPEG vacíos"""
+    frame = MP3_FRAME_HEADER + b'\x00' * (MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    frames = max(1, audio_bytes // MP3_FRAME_SIZE)
+    with open(path, 'wb') as f:
+        for _ in range(frames):
+            f.write(frame)
+    return path
+
+
+def make_cover(size=150 * 1024):
+    """Bytes con cabecera JPEG válida, suficientes para medir el embebido"""
+    return b'\xff\xd8\xff\xe0' + os.urandom(max(0, size - 6)) + b'\xff\xd9'
+
+
+def generate_library(folder, count, audio_format='m4a', audio_bytes=1024 * 1024):
+    """Crear ``count`` archivos sintéticos en ``folder`` y devolver sus rutas"""
+    os.makedirs(folder, exist_ok=True)
+    maker = make_m4a if audio_format == 'm4a' else make_mp3
+    paths = []
+    for i in range(1, count + 1):
+        paths.append(maker(os.path.join(folder, f"track_{i:05d}.{audio_format}"), audio_bytes=audio_bytes))
+    return paths
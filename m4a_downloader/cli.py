@@ -3,21 +3,38 @@ from rich.console import Console
 from .core.spotify_client import SpotifyClient
 from .core.youtube_downloader import YouTubeDownloader
 from .core.metadata import MetadataSetter
-from .utils import clean_temp_folder, detect_url_source, sanitize_filename_part
+from .core.lyrics import lyrics_prefetcher
+from .core.retag import find_audio_files, parse_source_id, read_source, retag_file
+from .core.batch import DOWNLOADED, FAILED, SKIPPED, BatchSource, read_url_file, read_url_list, track_keys
+from .core.events import EVENT_FORMATS, NULL_EVENTS, open_event_stream
+from .core.plan import PLAN_VERSION, load_plan, plan_entry, plan_summary, save_plan, track_record
+from .core.profiler import DEFAULT_TOP, run_profiled
+from .core.schedule import DEFAULT_DURATION, DEFAULT_POLICY, SCHEDULE_POLICIES, CostModel, ideal_seconds, item_duration
+from .core.timings import StageTimings
+from .core.trace import TraceRecorder
+from .core.track_info import TrackInfo, YouTubeEntry
+from .utils import clean_temp_folder, detect_url_source, is_spotify_url, sanitize_filename_part
 from .config import Config
-from .gui.config_dialog import get_saved_audio_format, get_saved_audio_quality, get_saved_parallel_downloads
+from .settings import load_settings
+import dataclasses
+import heapq
+import multiprocessing
 import os
+import queue
 import time
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from PySide6.QtCore import QSettings
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+from typing import List
 
 def get_formatted_filename(track_info, template, audio_format):
     mapping = {
-        "{title}": sanitize_filename_part(track_info.get('track_title', 'Unknown')) or "Unknown",
-        "{artist}": sanitize_filename_part(track_info.get('artist_name', 'Unknown')) or "Unknown",
-        "{album}": sanitize_filename_part(track_info.get('album_name', 'Unknown')) or "Unknown",
-        "{track_number}": f"{track_info.get('track_number', 0):02d}",
+        "{title}": sanitize_filename_part(track_info.track_title) or "Unknown",
+        "{artist}": sanitize_filename_part(track_info.artist_name) or "Unknown",
+        "{album}": sanitize_filename_part(track_info.album_name) or "Unknown",
+        "{track_number}": f"{track_info.track_number:02d}",
         "{ext}": audio_format
     }
     filename = template
@@ -28,20 +45,18 @@ def get_formatted_filename(track_info, template, audio_format):
 app = typer.Typer()
 console = Console()
 
-@app.command()
-def download_cli(
-    url: str = typer.Option(..., "--url", "-u", help="URL de Spotify o YouTube"),
-    output: str = typer.Option("music", help="Directorio de salida"),
-    format: str = typer.Option(None, "--format", "-f", help="Formato de audio (m4a/mp3)"),
-    quality: str = typer.Option(None, "--quality", "-q", help="Calidad de audio para MP3 (128/192/256/320)"),
-    parallel: int = typer.Option(None, "--parallel", "-p", help="Número de descargas paralelas (1-8)")
-):
-    """Descarga canciones, videos o playlists de Spotify/YouTube como M4A o MP3 (CLI)."""
-    return download(url, output, format, quality, parallel)
+# URLs de un lote que se enumeran a la vez
+ENUMERATION_WORKERS = 4
+# Intervalo mínimo (s) entre eventos de progreso en bytes de un mismo track
+PROGRESS_INTERVAL = 0.5
+# Cada cuánto (s) revisa el reparto de trabajo si el trabajo fue cancelado
+CANCEL_POLL_INTERVAL = 0.5
+# Tracks enumerados que pueden esperar worker a la vez: la enumeración no se
+# adelanta más, así la memoria no depende del tamaño de las fuentes
+SUBMISSION_WINDOW = 256
 
-def download(url, output="music", audio_format=None, quality=None, parallel=None, progress_callback=None, log_callback=None):
-    """Función principal de descarga - Mejorada con soporte MP3/M4A y descargas paralelas configurables"""
-    
+def make_log(log_callback=None):
+    """Devolver la función ``log(msg, level)``: callback de la GUI o consola Rich"""
     def log(msg, level="info"):
         if log_callback:
             log_callback(msg, level)
@@ -56,115 +71,399 @@ def download(url, output="music", audio_format=None, quality=None, parallel=None
             }
             end_color = "[/red]" if level == "error" else "[/green]" if level == "success" else "[/yellow]" if level == "warning" else ""
             console.print(f"{colors.get(level, '')}{msg}{end_color}")
-    
+    return log
+
+@app.callback(invoke_without_command=True)
+def download_cli(
+    ctx: typer.Context,
+    url: str = typer.Option(None, "--url", "-u", help="URL de Spotify o YouTube"),
+    batch: str = typer.Option(None, "--batch", "-b", help="Archivo con URLs, una por línea ('-' para stdin)"),
+    output: str = typer.Option("music", help="Directorio de salida"),
+    format: str = typer.Option(None, "--format", "-f", help="Formato de audio (m4a/mp3)"),
+    quality: str = typer.Option(None, "--quality", "-q", help="Calidad de audio para MP3 (128/192/256/320)"),
+    parallel: int = typer.Option(None, "--parallel", "-p", help="Número de descargas paralelas (1-8)"),
+    config: str = typer.Option(None, "--config", "-c", help="Archivo TOML de configuración"),
+    events: str = typer.Option(None, "--events", help="Emitir eventos estructurados (ndjson) por stdout"),
+    events_file: str = typer.Option(None, "--events-file", help="Escribir los eventos en este archivo en lugar de stdout"),
+    timings_report: str = typer.Option(None, "--timings-report", help="Guardar el desglose de tiempos por etapa como JSON"),
+    profile: bool = typer.Option(False, "--profile", help="Perfilar el trabajo (todos los hilos) y mostrar las funciones más costosas"),
+    profile_file: str = typer.Option(None, "--profile-file", help="Ruta del perfil pstats (por defecto morphy-profile-<fecha>.prof)"),
+    profile_top: int = typer.Option(DEFAULT_TOP, "--profile-top", help="Funciones a mostrar en el informe del perfil"),
+    trace: str = typer.Option(None, "--trace", help="Exportar una traza de Chrome/Perfetto (JSON) con un carril por hilo"),
+    schedule: str = typer.Option(None, "--schedule", help=f"Orden de descarga: {'/'.join(SCHEDULE_POLICIES)}")
+):
+    """Descarga canciones, videos o playlists de Spotify/YouTube como M4A o MP3 (CLI)."""
+    if ctx.invoked_subcommand is not None:
+        return
     try:
-        # Determinar formato, calidad y paralelismo
-        if not audio_format:
-            audio_format = get_saved_audio_format()
-        if not quality:
-            quality = get_saved_audio_quality()
-        if not parallel:
-            parallel = get_saved_parallel_downloads()
-            
-        # Validar formato
-        if audio_format not in Config.SUPPORTED_FORMATS:
-            audio_format = Config.DEFAULT_FORMAT
-            log(f"Formato no válido, usando: {audio_format}", "warning")
-            
-        # Validar calidad
-        if quality not in Config.SUPPORTED_QUALITY:
-            quality = Config.DEFAULT_QUALITY
-            log(f"Calidad no válida, usando: {quality}", "warning")
-            
-        # Validar paralelismo
-        if not isinstance(parallel, int) or not (1 <= parallel <= 8):
-            parallel = 2
-            log(f"Número de descargas paralelas no válido, usando: {parallel}", "warning")
-            
-        # Verificar FFmpeg si se necesita MP3
-        if audio_format == 'mp3':
-            if Config.check_ffmpeg():
-                log(f"FFmpeg encontrado: {Config.get_ffmpeg_path()}", "success")
-            else:
-                log("FFmpeg no encontrado, cambiando a M4A", "warning")
-                audio_format = 'm4a'
-        
-        format_info = Config.get_format_info(audio_format)
-        log(f"Configuración: {audio_format.upper()} - {quality} kbps - {parallel} descargas paralelas", "info")
-        log(f"Descripción: {format_info['description']}", "info")
+        urls = read_url_list(([url] if url else []) + (read_url_file(batch) if batch else []))
+    except OSError as e:
+        raise typer.BadParameter(f"No se pudo leer el archivo de URLs: {e}", param_hint="--batch")
+    if not urls:
+        raise typer.BadParameter("Indica una URL con --url o un archivo de URLs con --batch", param_hint="--url")
+    settings = load_settings(config)
+    if schedule:
+        settings = dataclasses.replace(settings, schedule_policy=schedule)
+    return _run_cli_job(
+        lambda event_stream: download_batch(urls, output, format, quality, parallel, settings=settings,
+                                            events=event_stream, timings_report=timings_report, trace_path=trace),
+        settings, events, events_file, profile, profile_file, profile_top,
+    )
+
+def _run_cli_job(job, settings, events, events_file, profile, profile_file, profile_top):
+    """Ejecutar ``job(event_stream)`` con los eventos y el perfilado pedidos en la CLI"""
+    events = events or ("ndjson" if events_file else None)
+    if events and events not in EVENT_FORMATS:
+        raise typer.BadParameter(f"Formatos soportados: {', '.join(EVENT_FORMATS)}", param_hint="--events")
+    if events and events_file in (None, "-"):
+        # stdout queda solo para los eventos: los mensajes van a stderr
+        console.stderr = True
+    with open_event_stream(events, events_file) as event_stream:
+        if profile or profile_file or settings.profile_downloads:
+            return run_profiled(lambda: job(event_stream), profile_file, profile_top, log=make_log(), echo=True)
+        return job(event_stream)
+
+@app.command("plan")
+def plan_cli(
+    urls: List[str] = typer.Argument(None, help="URLs de Spotify o YouTube"),
+    batch: str = typer.Option(None, "--batch", "-b", help="Archivo con URLs, una por línea ('-' para stdin)"),
+    plan_file: str = typer.Option("morphy-plan.json", "--plan", "-P", help="Archivo donde guardar el plan"),
+    output: str = typer.Option("music", help="Directorio de salida (relativo a él se guardan las carpetas del plan)"),
+    format: str = typer.Option(None, "--format", "-f", help="Formato de audio (m4a/mp3)"),
+    quality: str = typer.Option(None, "--quality", "-q", help="Calidad de audio para MP3 (128/192/256/320)"),
+    parallel: int = typer.Option(None, "--parallel", "-p", help="Número de búsquedas paralelas (1-8)"),
+    config: str = typer.Option(None, "--config", "-c", help="Archivo TOML de configuración")
+):
+    """Resuelve el video de YouTube de cada track sin descargar nada y guarda el plan."""
+    try:
+        urls = read_url_list(list(urls or []) + (read_url_file(batch) if batch else []))
+    except OSError as e:
+        raise typer.BadParameter(f"No se pudo leer el archivo de URLs: {e}", param_hint="--batch")
+    if not urls:
+        raise typer.BadParameter("Indica las URLs como argumentos o un archivo de URLs con --batch", param_hint="URLS")
+    return plan_batch(urls, plan_file, output, format, quality, parallel, settings=load_settings(config))
+
+@app.command("execute")
+def execute_cli(
+    plan_file: str = typer.Argument(..., help="Plan guardado con el comando plan"),
+    output: str = typer.Option(None, help="Directorio de salida (por defecto, el del plan)"),
+    parallel: int = typer.Option(None, "--parallel", "-p", help="Número de descargas paralelas (1-8)"),
+    config: str = typer.Option(None, "--config", "-c", help="Archivo TOML de configuración"),
+    events: str = typer.Option(None, "--events", help="Emitir eventos estructurados (ndjson) por stdout"),
+    events_file: str = typer.Option(None, "--events-file", help="Escribir los eventos en este archivo en lugar de stdout"),
+    timings_report: str = typer.Option(None, "--timings-report", help="Guardar el desglose de tiempos por etapa como JSON"),
+    profile: bool = typer.Option(False, "--profile", help="Perfilar el trabajo (todos los hilos) y mostrar las funciones más costosas"),
+    profile_file: str = typer.Option(None, "--profile-file", help="Ruta del perfil pstats (por defecto morphy-profile-<fecha>.prof)"),
+    profile_top: int = typer.Option(DEFAULT_TOP, "--profile-top", help="Funciones a mostrar en el informe del perfil"),
+    trace: str = typer.Option(None, "--trace", help="Exportar una traza de Chrome/Perfetto (JSON) con un carril por hilo"),
+    schedule: str = typer.Option(None, "--schedule", help=f"Orden de descarga: {'/'.join(SCHEDULE_POLICIES)}")
+):
+    """Descarga los videos de un plan sin volver a buscarlos en YouTube."""
+    try:
+        plan = load_plan(plan_file)
+    except (OSError, ValueError) as e:
+        raise typer.BadParameter(f"No se pudo leer el plan: {e}", param_hint="PLAN_FILE")
+    settings = load_settings(config)
+    if schedule:
+        settings = dataclasses.replace(settings, schedule_policy=schedule)
+    return _run_cli_job(
+        lambda event_stream: execute_plan(plan, output, parallel, settings=settings, events=event_stream,
+                                          timings_report=timings_report, trace_path=trace),
+        settings, events, events_file, profile, profile_file, profile_top,
+    )
+
+@app.command("retag")
+def retag_cli(
+    folder: str = typer.Argument(..., help="Carpeta de la biblioteca a re-etiquetar"),
+    workers: int = typer.Option(None, "--workers", "-w", help="Procesos para escribir tags (por defecto, núcleos de CPU)"),
+    lyrics: bool = typer.Option(None, "--lyrics/--no-lyrics", help="Forzar (o desactivar) letras en el retag"),
+    config: str = typer.Option(None, "--config", "-c", help="Archivo TOML de configuración")
+):
+    """Reaplica los metadatos a una biblioteca ya descargada sin volver a descargar el audio."""
+    return retag(folder, workers=workers, lyrics=lyrics, settings=load_settings(config))
+
+@app.command("serve")
+def serve_cli(
+    host: str = typer.Option(None, "--host", help="Dirección de escucha (por defecto 127.0.0.1)"),
+    port: int = typer.Option(None, "--port", help="Puerto de la API (por defecto 8765)"),
+    queue_file: str = typer.Option(None, "--queue", help="Archivo de la cola persistente de trabajos"),
+    jobs: int = typer.Option(None, "--jobs", "-j", help="Trabajos ejecutados a la vez (por defecto 3)"),
+    config: str = typer.Option(None, "--config", "-c", help="Archivo TOML de configuración")
+):
+    """Servicio en segundo plano: API HTTP/JSON local para encolar, seguir y cancelar descargas."""
+    # Importación diferida: el servicio usa download_batch de este módulo
+    from .daemon import serve
+    return serve(host, port, queue_file, load_settings(config), log=make_log(), jobs=jobs)
+
+def download(url, output="music", audio_format=None, quality=None, parallel=None, progress_callback=None, log_callback=None, settings=None, events=None):
+    """Función principal de descarga - Mejorada con soporte MP3/M4A y descargas paralelas configurables
+
+    ``settings`` es el snapshot de configuración del trabajo; si no se pasa se
+    carga una vez desde config.toml / entorno (nunca desde Qt).
+    """
+    return download_batch([url], output, audio_format, quality, parallel, progress_callback, log_callback, settings, events)
+
+def _job_options(audio_format, quality, parallel, settings, log):
+    """Validar formato, calidad y paralelismo del trabajo; devuelve los valores efectivos"""
+    # Determinar formato, calidad y paralelismo
+    if not audio_format:
+        audio_format = settings.audio_format
+    if not quality:
+        quality = settings.audio_quality
+    if not parallel:
+        parallel = settings.parallel_downloads
         
-        source_type = detect_url_source(url)
-        if source_type == "unknown":
-            raise ValueError("URL no reconocida. Usa una URL de Spotify o YouTube válida.")
+    # Validar formato
+    if audio_format not in Config.SUPPORTED_FORMATS:
+        audio_format = Config.DEFAULT_FORMAT
+        log(f"Formato no válido, usando: {audio_format}", "warning")
         
-        # Determinar tipo de contenido y obtener datos
-        playlist_folder = output
-        is_playlist = False
+    # Validar calidad
+    if quality not in Config.SUPPORTED_QUALITY:
+        quality = Config.DEFAULT_QUALITY
+        log(f"Calidad no válida, usando: {quality}", "warning")
         
-        settings = QSettings('MorphyDownloader', 'Config')
-        create_subfolders = settings.value('create_subfolders', False, type=bool)
-        naming_format = settings.value('naming_format', '{title}.{ext}')
+    # Validar paralelismo
+    if not isinstance(parallel, int) or not (1 <= parallel <= 8):
+        parallel = 2
+        log(f"Número de descargas paralelas no válido, usando: {parallel}", "warning")
         
-        if source_type.startswith("spotify"):
-            spotify = SpotifyClient()
+    # Verificar FFmpeg si se necesita MP3
+    if audio_format == 'mp3':
+        if Config.check_ffmpeg():
+            log(f"FFmpeg encontrado: {Config.get_ffmpeg_path()}", "success")
+        else:
+            log("FFmpeg no encontrado, cambiando a M4A", "warning")
+            audio_format = 'm4a'
+    return audio_format, quality, parallel
 
-        if source_type == "spotify_track":
-            log("🎵 Obteniendo información de la canción...")
-            songs = [spotify.get_track_info(url)]
-            if create_subfolders:
-                safe_album = sanitize_filename_part(songs[0].get('album_name', 'Tracks')) or "Tracks"
-                playlist_folder = os.path.join(output, safe_album)
-        elif source_type == "spotify_album":
-            log("💿 Obteniendo información del álbum...")
-            is_playlist = True
-            playlist_name, songs = spotify.get_album_tracks(url)
-            if create_subfolders:
-                safe_name = sanitize_filename_part(playlist_name) or "Album"
-                playlist_folder = os.path.join(output, safe_name)
-        elif source_type == "spotify_playlist":
-            log("📋 Obteniendo información de la playlist...")
-            is_playlist = True
-            playlist_name, songs = spotify.get_playlist_tracks(url)
+def _open_source(source, spotify, settings, output, quality, audio_format, log, create_folders=True, downloaders=None):
+    """Enumerar la URL de ``source``: rellena tipo, nombre, total y carpeta y devuelve sus items
+
+    Sin ``create_folders`` (al planificar) no se crea la carpeta ni el
+    ``YouTubeDownloader`` de la fuente. ``downloaders`` crea (o reutiliza) los
+    ``YouTubeDownloader`` con los mismos argumentos; por defecto la clase.
+    """
+    downloaders = downloaders or YouTubeDownloader
+    source_type = detect_url_source(source.url)
+    if source_type == "unknown":
+        raise ValueError("URL no reconocida. Usa una URL de Spotify o YouTube válida.")
+    source.source_type = source_type
+    tag = source.tag
+    folder = output
+    create_subfolders = settings.create_subfolders
+    
+    if source_type == "spotify_track":
+        log(f"{tag}🎵 Obteniendo información de la canción...")
+        track_info = spotify.get_track_info(source.url)
+        name, total, items = track_info.track_title, 1, [track_info]
+        if create_subfolders:
+            folder = os.path.join(output, sanitize_filename_part(track_info.album_name) or "Tracks")
+    elif source_type == "spotify_album":
+        log(f"{tag}💿 Obteniendo información del álbum...")
+        name, total, items = spotify.iter_album_tracks(source.url)
+        if create_subfolders:
+            folder = os.path.join(output, sanitize_filename_part(name) or "Album")
+    elif source_type == "spotify_playlist":
+        log(f"{tag}📋 Obteniendo información de la playlist...")
+        name, total, items = spotify.iter_playlist_tracks(source.url)
+        if create_subfolders:
+            folder = os.path.join(output, sanitize_filename_part(name) or "Playlist")
+    elif source_type.startswith("youtube"):
+        log(f"{tag}▶️ Analizando URL de YouTube...")
+        yt_probe = downloaders(
+            output_dir=output,
+            quality=quality,
+            audio_format=audio_format
+        )
+        name, is_playlist, total, items = yt_probe.iter_youtube_entries(source.url)
+        if is_playlist or source_type == "youtube_playlist":
+            name = name or "YouTube"
             if create_subfolders:
-                safe_name = sanitize_filename_part(playlist_name) or "Playlist"
-                playlist_folder = os.path.join(output, safe_name)
-        elif source_type.startswith("youtube"):
-            log("▶️ Analizando URL de YouTube...")
-            yt_probe = YouTubeDownloader(
-                output_dir=output,
-                quality=quality,
-                audio_format=audio_format
-            )
-            entries = yt_probe.get_youtube_entries(url)
-            is_playlist = len(entries) > 1 or source_type == "youtube_playlist"
-            playlist_name = entries[0].get("playlist_title") or "YouTube"
-            if is_playlist and create_subfolders:
-                safe_name = sanitize_filename_part(playlist_name) or "YouTube Playlist"
-                playlist_folder = os.path.join(output, safe_name)
-            songs = entries
-            if is_playlist:
-                log(f"📋 Playlist de YouTube detectada: {len(songs)} video(s)")
-            else:
-                log("🎬 Video de YouTube detectado")
+                folder = os.path.join(output, sanitize_filename_part(name) or "YouTube Playlist")
+            log(f"{tag}📋 Playlist de YouTube detectada: {total or '?'} video(s)")
         else:
-            raise ValueError("Tipo de URL no soportado")
-        
-        # Configurar directorios
-        temp_dir = os.path.join(playlist_folder, "tmp")
-        os.makedirs(playlist_folder, exist_ok=True)
-        
-        # Inicializar descargador de YouTube con formato y calidad
-        yt_downloader = YouTubeDownloader(
-            output_dir=temp_dir, 
+            items = list(items)
+            name = items[0].title if items else "YouTube"
+            log(f"{tag}🎬 Video de YouTube detectado")
+    else:
+        raise ValueError("Tipo de URL no soportado")
+    
+    source.name = name
+    source.total = total
+    source.folder = folder
+    if create_folders:
+        os.makedirs(folder, exist_ok=True)
+        source.yt_downloader = downloaders(
+            output_dir=os.path.join(folder, "tmp"),
             quality=quality,
             audio_format=audio_format
         )
+    return items
+
+def _open_planned_source(source, plan, output, quality, audio_format, log, downloaders=None):
+    """Como ``_open_source`` pero con la fuente y los videos ya resueltos en ``plan``"""
+    planned = plan["sources"][source.index - 1]
+    if planned.get("error"):
+        raise ValueError(planned["error"])
+    records = [record for record in plan["tracks"] if record["source"] == source.index]
+    source.source_type = planned["type"]
+    source.name = planned["name"]
+    source.total = len(records)
+    source.folder = os.path.join(output, planned["folder"])
+    log(f"{source.tag}🗺️ Plan: {source.name} ({source.total} track(s) ya resuelto(s))")
+    unresolved = sum(1 for record in records if not record.get("url"))
+    if unresolved:
+        log(f"{source.tag}⚠️ {unresolved} track(s) sin video en el plan: se omiten", "warning")
+    os.makedirs(source.folder, exist_ok=True)
+    source.yt_downloader = (downloaders or YouTubeDownloader)(
+        output_dir=os.path.join(source.folder, "tmp"),
+        quality=quality,
+        audio_format=audio_format
+    )
+    return records
+
+def _enumerate_source(source, open_source, pipeline_events, acquire_slot, timings):
+    """Enumerar ``source`` en un hilo del pool de enumeración.
+
+    Cada item entra en ``pipeline_events`` como ``("item", source, item)``
+    tras conseguir hueco con ``acquire_slot`` (``False`` para dejar de
+    enumerar) y al final llega ``("enumerated", source, error)``. Las páginas se
+    piden a medida que se consumen: con la ventana llena la enumeración se
+    pausa, y su tiempo no cuenta esas esperas.
+    """
+    error = None
+    started = time.perf_counter()
+    waited = 0.0
+    try:
+        for item in open_source(source):
+            wait_started = time.perf_counter()
+            if not acquire_slot():
+                break
+            waited += time.perf_counter() - wait_started
+            pipeline_events.put(("item", source, item))
+    except Exception as e:
+        error = e
+    timings.record("enumerate", time.perf_counter() - started - waited, start=started, source=source.index)
+    pipeline_events.put(("enumerated", source, error))
+
+def _planned_source_record(source, output):
+    """Fuente del lote tal como se guarda en el plan (carpeta relativa a ``output``)"""
+    return {
+        "index": source.index,
+        "url": source.url,
+        "type": source.source_type,
+        "name": source.name,
+        "total": source.total,
+        "folder": os.path.relpath(source.folder, output) if source.folder else None,
+        "duplicates": source.duplicates,
+        "error": str(source.error) if source.error else None,
+    }
+
+def _source_counts(source):
+    """Resumen de una fuente para los eventos estructurados"""
+    return {
+        "source": source.index,
+        "url": source.url,
+        "name": source.name,
+        "downloaded": source.downloaded,
+        "submitted": source.submitted,
+        "skipped": source.skipped,
+        "duplicates": source.duplicates,
+        "failed": source.failed,
+        "error_class": type(source.error).__name__ if source.error else None,
+        "error": str(source.error) if source.error else None,
+    }
+
+def _source_summary(source):
+    """Línea de resumen de una fuente del lote"""
+    if source.error:
+        return f"{source.tag}❌ {source.url}: {source.error}"
+    return (
+        f"{source.tag}{source.name or source.url}: {source.downloaded}/{source.submitted} descargada(s), "
+        f"{source.skipped} ya existía(n), {source.duplicates} duplicada(s), {source.failed} con error "
+        f"→ {os.path.abspath(source.folder)}"
+    )
+
+def download_batch(urls, output="music", audio_format=None, quality=None, parallel=None, progress_callback=None, log_callback=None, settings=None, events=None, timings_report=None, trace_path=None, plan=None, spotify=None, cancel=None, downloaders=None):
+    """Descargar varias URLs en un solo trabajo.
+
+    Las URLs se enumeran a la vez (hasta ``ENUMERATION_WORKERS``) y todos sus
+    tracks alimentan un único pool de descargas compartido, con los mismos
+    clientes y cachés. Un track que aparece en varias fuentes (por id, ISRC o
+    id de video) se descarga una sola vez. Devuelve la lista de ``BatchSource``
+    con el resumen de cada URL.
+
+    ``events`` es un ``EventStream`` opcional que recibe los eventos
+    estructurados del trabajo (inicio, track resuelto, progreso en bytes,
+    tiempos por etapa, skips, errores y resumen). El desglose de tiempos por
+    etapa (n, total y p50/p95/p99) se muestra al final y, con
+    ``timings_report``, se guarda como JSON en esa ruta. Con ``trace_path``
+    cada etapa de cada track se guarda como span en una traza de Chrome
+    (Perfetto), con un carril por hilo.
+
+    Con ``plan`` (ver ``execute_plan``) las fuentes y los videos salen del
+    plan: no se enumera nada ni se busca en YouTube.
+
+    ``spotify`` reutiliza un ``SpotifyClient`` ya creado (p. ej. el del
+    servicio, compartido entre trabajos). ``cancel`` es un ``threading.Event``:
+    al activarse se deja de enumerar y de enviar tracks, los que aún no
+    empezaron se descartan y los que están en curso terminan. ``downloaders``
+    crea o reutiliza los ``YouTubeDownloader`` de cada fuente (el servicio
+    los conserva entre trabajos con su caché de búsquedas).
+
+    Los tracks esperan en una cola de prioridad y pasan al pool cuando queda
+    un worker libre, en el orden de ``settings.schedule_policy`` (ver
+    ``core.schedule``). Los costes esperados salen de la duración de cada
+    track y de los tiempos por etapa de trabajos anteriores, que se
+    actualizan al terminar.
+    """
+    if settings is None:
+        settings = load_settings()
+    if events is None:
+        events = NULL_EVENTS
+    
+    log = make_log(log_callback)
+    # Claves de las letras que este trabajo dejó en la cola del prefetch
+    prefetched = []
+    lyrics_prefetcher.acquire()
+    
+    try:
+        if not urls:
+            raise ValueError("No hay URLs que descargar")
+        audio_format, quality, parallel = _job_options(audio_format, quality, parallel, settings, log)
         
-        log(f"🚀 Iniciando descarga de {len(songs)} canción(es) en formato {audio_format.upper()} con {parallel} descargas paralelas...")
+        format_info = Config.get_format_info(audio_format)
+        log(f"Configuración: {audio_format.upper()} - {quality} kbps - {parallel} descargas paralelas", "info")
+        log(f"Descripción: {format_info['description']}", "info")
         
-        start_time = time.time()
-        downloaded = 0
-        total = len(songs)
+        batch = len(urls) > 1
+        sources = [
+            BatchSource(url, index=i, tag=f"[{i}] " if batch else "")
+            for i, url in enumerate(urls, start=1)
+        ]
+        if batch:
+            log(f"📚 Lote de {len(sources)} URL(s): enumeración simultánea y un solo pipeline de descargas")
+        
+        naming_format = settings.naming_format
+        download_lyrics = settings.download_lyrics
+        schedule = settings.schedule_policy
+        if schedule not in SCHEDULE_POLICIES:
+            log(f"Orden de descarga no válido, usando: {DEFAULT_POLICY}", "warning")
+            schedule = DEFAULT_POLICY
+        cost_model = CostModel.load()
+        # Segundos de audio de los intentos medidos en cada etapa, para los costes por segundo
+        stage_audio = Counter()
+        stage_audio_lock = threading.Lock()
+        tracer = TraceRecorder() if trace_path else None
+        timings = StageTimings(
+            listener=lambda stage, seconds, context: events.emit("stage", stage=stage, seconds=round(seconds, 4), **context)
+            if events.enabled else None,
+            tracer=tracer,
+        )
+        # Un único cliente (y token) para todas las fuentes de Spotify del lote
+        if spotify is None and plan is None and any(is_spotify_url(source.url) for source in sources):
+            spotify = SpotifyClient()
         
         # Descargar una sola canción
         def get_available_destination(destination):
@@ -178,116 +477,385 @@ def download(url, output="music", audio_format=None, quality=None, parallel=None
                     return candidate
                 counter += 1
 
-        def download_spotify_song(track_info, i):
+        def emit_error(source, i, stage, error, fatal=True):
+            events.emit("error", source=source.index, track=i, stage=stage, fatal=fatal,
+                        error_class=type(error).__name__, message=str(error))
+
+        def progress_hook(source, i):
+            """Hook de yt-dlp que emite el progreso en bytes (como mucho cada ``PROGRESS_INTERVAL`` s)"""
+            if not events.enabled:
+                return None
+            last_emit = [0.0]
+
+            def hook(status):
+                now = time.monotonic()
+                state = status.get('status')
+                if state == 'downloading' and now - last_emit[0] < PROGRESS_INTERVAL:
+                    return
+                last_emit[0] = now
+                events.emit(
+                    "progress", source=source.index, track=i, status=state,
+                    downloaded_bytes=status.get('downloaded_bytes'),
+                    total_bytes=status.get('total_bytes') or status.get('total_bytes_estimate'),
+                )
+            return hook
+
+        def fetch_audio(source, i, url, track_timings, duration, **kwargs):
+            """Descargar el audio midiendo por separado la transferencia y el postproceso FFmpeg
+
+            ``duration`` (s de audio) se suma a lo medido en cada etapa, aunque el intento falle.
+            """
+            postprocessing = []
+            pp_started = {}
+
+            def postprocessor_hook(status):
+                name = status.get('postprocessor') or ''
+                if not name.startswith('FFmpeg'):
+                    return
+                if status.get('status') == 'started':
+                    pp_started[name] = time.perf_counter()
+                elif status.get('status') == 'finished' and name in pp_started:
+                    pp_start = pp_started.pop(name)
+                    postprocessing.append((pp_start, time.perf_counter() - pp_start))
+
+            started = time.perf_counter()
+            try:
+                return source.yt_downloader.download_audio(
+                    url, progress_hook=progress_hook(source, i), postprocessor_hook=postprocessor_hook, **kwargs
+                )
+            finally:
+                # Los postprocesos corren al final: la transferencia es lo anterior
+                ffmpeg_seconds = sum(seconds for _, seconds in postprocessing)
+                track_timings.record("transfer", time.perf_counter() - started - ffmpeg_seconds, start=started)
+                if postprocessing:
+                    track_timings.record("ffmpeg", ffmpeg_seconds, start=postprocessing[0][0])
+                with stage_audio_lock:
+                    stage_audio["transfer"] += duration
+                    if postprocessing:
+                        stage_audio["ffmpeg"] += duration
+
+        def run_track(worker_func, source, item, i):
+            """Ejecutar el worker de un item; con traza, como un span de track en su hilo"""
+            if tracer is None:
+                return worker_func(source, item, i)
+            title = item.title if isinstance(item, YouTubeEntry) else item.track_title
+            with tracer.track(f"{source.tag}{i}. {title}", source=source.index, track=i):
+                return worker_func(source, item, i)
+
+        def schedule_key(source, item, seq):
+            """Clave de la cola de prioridad (menor = antes); ``seq`` desempata por orden de llegada"""
+            if schedule == "fifo":
+                return (seq,)
+            if schedule == "priority":
+                return (source.index, seq)
+            track = item.track if isinstance(item, YouTubeEntry) else item
+            if track is not None and os.path.exists(
+                    os.path.join(source.folder, get_formatted_filename(track, naming_format, audio_format))):
+                # Se saltará al instante
+                cost = 0.0
+            else:
+                search = isinstance(item, TrackInfo) and not source.yt_downloader.has_cached_search(item)
+                cost = cost_model.estimate(item, search=search)
+            return (cost, seq) if schedule == "cached" else (-cost, seq)
+
+        def download_spotify_song(source, track_info, i):
+            tag = source.tag
+            shown_total = source.total or "?"
+            events.emit("track_start", source=source.index, track=i,
+                        title=track_info.track_title, artist=track_info.artist_name)
             expected_name = get_formatted_filename(track_info, naming_format, audio_format)
-            destination = os.path.join(playlist_folder, expected_name)
+            destination = os.path.join(source.folder, expected_name)
             
             # Skip si ya existe
             if os.path.exists(destination):
-                log(f"({i}/{total}) {expected_name} ya existe. Saltando...", "warning")
-                if progress_callback:
-                    progress_callback(i, total)
-                return 0  # No descargada
+                log(f"{tag}({i}/{shown_total}) {expected_name} ya existe. Saltando...", "warning")
+                events.emit("skip", source=source.index, track=i, reason="exists", file=destination)
+                return SKIPPED
             
+            stage = "search"
+            track_timings = timings.bind(source=source.index, track=i)
             try:
-                log(f"({i}/{total}) Buscando '{track_info['track_title']} - {track_info['artist_name']}'...")
-                video_link = yt_downloader.find_youtube(track_info)
+                log(f"{tag}({i}/{shown_total}) Buscando '{track_info.track_title} - {track_info.artist_name}'...")
+                with track_timings.measure(stage):
+                    match = source.yt_downloader.search_youtube(track_info)
+                events.emit(
+                    "track_resolved", source=source.index, track=i, source_id=track_info.source_id,
+                    title=track_info.track_title, artist=track_info.artist_name, video_url=match.url,
+                    video_title=match.title, query=match.query, score=match.score,
+                    fallback=match.fallback, cached=match.cached,
+                )
                 
-                log(f"({i}/{total}) Descargando desde YouTube...")
-                audio_file = yt_downloader.download_audio(video_link)
+                log(f"{tag}({i}/{shown_total}) Descargando desde YouTube...")
+                stage = "transfer"
+                audio_file = fetch_audio(source, i, match.url, track_timings,
+                                         item_duration(track_info) or match.duration or DEFAULT_DURATION)
                 
                 if audio_file and os.path.exists(audio_file):
                     # Aplicar metadatos
+                    stage = "tag"
                     try:
-                        MetadataSetter.set_metadata(track_info, audio_file)
-                        log(f"({i}/{total}) Metadatos aplicados correctamente")
+                        MetadataSetter.set_metadata(track_info, audio_file, settings, track_timings)
+                        log(f"{tag}({i}/{shown_total}) Metadatos aplicados correctamente")
                     except Exception as e:
-                        log(f"({i}/{total}) Warning: Error aplicando metadatos: {e}", "warning")
+                        log(f"{tag}({i}/{shown_total}) Warning: Error aplicando metadatos: {e}", "warning")
+                        emit_error(source, i, stage, e, fatal=False)
                     
                     # Mover archivo final
                     if os.path.abspath(audio_file) != os.path.abspath(destination):
                         os.replace(audio_file, destination)
                     
-                    log(f"✅ Descargado: {expected_name}", "success")
-                    return 1  # Descargada exitosamente
+                    log(f"{tag}✅ Descargado: {expected_name}", "success")
+                    events.emit("track_done", source=source.index, track=i, file=destination)
+                    return DOWNLOADED
                 else:
-                    log(f"❌ Error descargando {track_info['track_title']}", "error")
-                    return 0
+                    log(f"{tag}❌ Error descargando {track_info.track_title}", "error")
+                    emit_error(source, i, stage, FileNotFoundError(f"No audio file for {match.url}"))
+                    return FAILED
                 
             except Exception as e:
-                log(f"❌ Error en {track_info['track_title']}: {e}", "error")
-                return 0
-            
-            finally:
-                if progress_callback:
-                    progress_callback(i, total)
+                log(f"{tag}❌ Error en {track_info.track_title}: {e}", "error")
+                emit_error(source, i, stage, e)
+                return FAILED
 
-        def download_youtube_item(entry, i):
+        def download_youtube_item(source, entry, i):
+            tag = source.tag
+            shown_total = source.total or "?"
+            events.emit("track_start", source=source.index, track=i, title=entry.title,
+                        artist=entry.track.artist_name if entry.track else None)
+            stage = "metadata"
+            track_timings = timings.bind(source=source.index, track=i)
             try:
-                log(f"({i}/{total}) Leyendo metadata de YouTube: {entry.get('title', 'Video')}")
-                track_info = yt_downloader.get_youtube_metadata(
-                    entry["url"],
-                    track_number=entry.get("track_number", i),
-                    playlist_title=entry.get("playlist_title", "")
+                track_info = entry.track
+                if track_info is None:
+                    log(f"{tag}({i}/{shown_total}) Leyendo metadata de YouTube: {entry.title or 'Video'}")
+                    with track_timings.measure(stage):
+                        track_info = source.yt_downloader.get_youtube_metadata(
+                            entry.url,
+                            track_number=entry.track_number,
+                            playlist_title=entry.playlist_title
+                        )
+                events.emit(
+                    "track_resolved", source=source.index, track=i, source_id=track_info.source_id,
+                    title=track_info.track_title, artist=track_info.artist_name, video_url=entry.url,
+                    video_title=entry.title, query=None, score=None, fallback=False, cached=False,
                 )
                 expected_name = get_formatted_filename(track_info, naming_format, audio_format)
-                destination = os.path.join(playlist_folder, expected_name)
+                destination = os.path.join(source.folder, expected_name)
 
                 if os.path.exists(destination):
-                    log(f"({i}/{total}) {expected_name} ya existe. Saltando...", "warning")
-                    return 0
+                    log(f"{tag}({i}/{shown_total}) {expected_name} ya existe. Saltando...", "warning")
+                    events.emit("skip", source=source.index, track=i, reason="exists", file=destination)
+                    return SKIPPED
+
+                if download_lyrics:
+                    prefetched.extend(lyrics_prefetcher.prefetch([track_info]))
 
-                log(f"({i}/{total}) Descargando video de YouTube...")
-                audio_file = yt_downloader.download_audio(entry["url"], playlist=False)
+                log(f"{tag}({i}/{shown_total}) Descargando video de YouTube...")
+                stage = "transfer"
+                audio_file = fetch_audio(source, i, entry.url, track_timings,
+                                         item_duration(track_info) or DEFAULT_DURATION, playlist=False)
 
                 if audio_file and os.path.exists(audio_file):
+                    stage = "tag"
                     try:
-                        MetadataSetter.set_metadata(track_info, audio_file)
-                        log(f"({i}/{total}) Metadatos de YouTube aplicados")
+                        MetadataSetter.set_metadata(track_info, audio_file, settings, track_timings)
+                        log(f"{tag}({i}/{shown_total}) Metadatos de YouTube aplicados")
                     except Exception as e:
-                        log(f"({i}/{total}) Warning: Error aplicando metadatos: {e}", "warning")
+                        log(f"{tag}({i}/{shown_total}) Warning: Error aplicando metadatos: {e}", "warning")
+                        emit_error(source, i, stage, e, fatal=False)
 
                     final_destination = get_available_destination(destination)
                     if os.path.abspath(audio_file) != os.path.abspath(final_destination):
                         os.replace(audio_file, final_destination)
 
-                    log(f"✅ Descargado: {os.path.basename(final_destination)}", "success")
-                    return 1
+                    log(f"{tag}✅ Descargado: {os.path.basename(final_destination)}", "success")
+                    events.emit("track_done", source=source.index, track=i, file=final_destination)
+                    return DOWNLOADED
 
-                log(f"❌ Error descargando {entry.get('title', 'video')}", "error")
-                return 0
+                log(f"{tag}❌ Error descargando {entry.title or 'video'}", "error")
+                emit_error(source, i, stage, FileNotFoundError(f"No audio file for {entry.url}"))
+                return FAILED
 
             except Exception as e:
-                log(f"❌ Error en {entry.get('title', 'video')}: {e}", "error")
-                return 0
-
-            finally:
-                if progress_callback:
-                    progress_callback(i, total)
+                log(f"{tag}❌ Error en {entry.title or 'video'}: {e}", "error")
+                emit_error(source, i, stage, e)
+                return FAILED
+        
+        # Los hilos de enumeración y los workers solo publican eventos; este hilo
+        # es el único que reparte trabajo y actualiza los contadores de cada fuente
+        pipeline_events = queue.SimpleQueue()
+        # Un hueco por track encolado o esperando worker; se libera al pasar al pool
+        window = threading.Semaphore(SUBMISSION_WINDOW)
+        
+        def acquire_slot():
+            """Esperar hueco en la ventana de envío; ``False`` si el trabajo se cancela antes"""
+            while not window.acquire(timeout=CANCEL_POLL_INTERVAL):
+                if cancel is not None and cancel.is_set():
+                    return False
+            if cancel is not None and cancel.is_set():
+                window.release()
+                return False
+            return True
         
-        # Paralelización: Usar ThreadPoolExecutor con max_workers configurables
-        max_workers = min(parallel, len(songs))  # No usar más workers que canciones
+        def open_source(source):
+            if plan is None:
+                items = _open_source(source, spotify, settings, output, quality, audio_format, log,
+                                     downloaders=downloaders)
+            else:
+                items = map(plan_entry, _open_planned_source(source, plan, output, quality, audio_format, log,
+                                                             downloaders))
+            events.emit("source", source=source.index, url=source.url, type=source.source_type,
+                        name=source.name, total=source.total or None, folder=source.folder)
+            for item in items:
+                if item is None:
+                    # Track que el plan no pudo resolver
+                    events.emit("skip", source=source.index, track=None, reason="unresolved")
+                    continue
+                yield item
         
-        log(f"🔧 Usando {max_workers} workers para descargas paralelas", "info")
+        log(f"🔧 Usando {parallel} workers para descargas paralelas", "info")
+        events.emit("job_start", urls=list(urls), format=audio_format, quality=quality, parallel=parallel)
+        start_time = time.time()
+        seen = set()
+        completed = 0
+        enumerating = len(sources)
+        outstanding = 0
+        # (clave, source, item, i) de los tracks que esperan un worker libre
+        ready = []
+        arrivals = 0
+        # future -> (item, inicio): solo los tracks en curso; se sueltan al terminar
+        in_flight = {}
+        # Para la cota ideal sin guardar los tiempos de cada track
+        track_total = track_longest = 0.0
+        cancelled = False
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for i, track_info in enumerate(songs, start=1):
-                worker_func = download_youtube_item if source_type.startswith("youtube") else download_spotify_song
-                futures.append(executor.submit(worker_func, track_info, i))
+        with ThreadPoolExecutor(max_workers=min(ENUMERATION_WORKERS, len(sources))) as enumerators, \
+                ThreadPoolExecutor(max_workers=parallel) as executor:
+            for source in sources:
+                enumerators.submit(_enumerate_source, source, open_source, pipeline_events, acquire_slot, timings)
             
-            for future in as_completed(futures):
-                downloaded += future.result() or 0  # Sumar descargas exitosas
+            # Cada track entra en la cola en cuanto llega su página: las descargas
+            # empiezan mientras la enumeración (de esta y de las demás URLs) sigue
+            while enumerating or outstanding or ready:
+                if cancel is not None and cancel.is_set() and not cancelled:
+                    cancelled = True
+                    log("⛔ Trabajo cancelado: terminan las descargas en curso y se descartan las pendientes", "warning")
+                    lyrics_prefetcher.cancel_pending(prefetched)
+                    for _, source, _, _ in ready:
+                        # Nunca llegaron al pool: no cuentan como enviados
+                        source.submitted -= 1
+                        window.release()
+                    ready.clear()
+                # Solo hay en el pool tantos tracks como workers: el orden lo decide la cola
+                while ready and outstanding < parallel:
+                    _, source, item, i = heapq.heappop(ready)
+                    window.release()
+                    worker_func = download_youtube_item if isinstance(item, YouTubeEntry) else download_spotify_song
+                    future = executor.submit(run_track, worker_func, source, item, i)
+                    future.add_done_callback(lambda f, source=source: pipeline_events.put(("finished", source, f)))
+                    # Con un worker libre el track empieza al enviarse
+                    in_flight[future] = (item, time.perf_counter())
+                    outstanding += 1
+                if not (enumerating or outstanding or ready):
+                    break
+                try:
+                    kind, source, value = pipeline_events.get(
+                        timeout=CANCEL_POLL_INTERVAL if cancel is not None else None
+                    )
+                except queue.Empty:
+                    continue
+                if kind == "item":
+                    if cancelled:
+                        window.release()
+                        continue
+                    keys = track_keys(value)
+                    if any(key in seen for key in keys):
+                        window.release()
+                        source.duplicates += 1
+                        events.emit("skip", source=source.index, track=None, reason="duplicate", keys=keys)
+                        continue
+                    seen.update(keys)
+                    source.submitted += 1
+                    if source.submitted == 1:
+                        log(f"{source.tag}🚀 Iniciando descarga de {source.total or '?'} canción(es) en formato {audio_format.upper()} con {parallel} descargas paralelas...")
+                    if download_lyrics and isinstance(value, TrackInfo) and not os.path.exists(
+                            os.path.join(source.folder, get_formatted_filename(value, naming_format, audio_format))):
+                        # Las letras se buscan en segundo plano mientras se descargan los audios
+                        prefetched.extend(lyrics_prefetcher.prefetch([value]))
+                    arrivals += 1
+                    heapq.heappush(ready, (schedule_key(source, value, arrivals), source, value, source.submitted))
+                    continue
+                
+                if kind == "enumerated":
+                    enumerating -= 1
+                    source.enumerated = True
+                    source.error = value
+                    if value is not None:
+                        emit_error(source, None, "enumerate", value)
+                else:
+                    item, track_started = in_flight.pop(value)
+                    track_seconds = time.perf_counter() - track_started
+                    track_total += track_seconds
+                    track_longest = max(track_longest, track_seconds)
+                    outstanding -= 1
+                    completed += 1
+                    status = FAILED if value.exception() else value.result()
+                    source.record(status)
+                    if progress_callback:
+                        progress_callback(completed, sum(s.expected for s in sources))
+                if source.done:
+                    events.emit("source_done", **_source_counts(source))
+                    if batch:
+                        log(f"📦 {_source_summary(source)}", "error" if source.error else "info")
         
         # Limpieza final
-        clean_temp_folder(temp_dir)
+        for temp_dir in {os.path.join(source.folder, "tmp") for source in sources if source.folder}:
+            clean_temp_folder(temp_dir)
         end_time = time.time()
         
+        failed_sources = [source for source in sources if source.error]
+        ideal = ideal_seconds(track_total, track_longest, parallel)
+        if timings.summary():
+            cost_model.update(timings.summary(), stage_audio)
+            cost_model.save()
+        events.emit(
+            "job_summary",
+            cancelled=cancelled,
+            schedule=schedule,
+            ideal_seconds=round(ideal, 3),
+            downloaded=sum(source.downloaded for source in sources),
+            submitted=sum(source.submitted for source in sources),
+            skipped=sum(source.skipped for source in sources),
+            duplicates=sum(source.duplicates for source in sources),
+            failed=sum(source.failed for source in sources),
+            failed_sources=len(failed_sources),
+            seconds=round(end_time - start_time, 3),
+            sources=[_source_counts(source) for source in sources],
+        )
+        if len(failed_sources) == len(sources):
+            if not batch:
+                raise sources[0].error
+            raise ValueError("No se pudo leer ninguna URL del lote")
+        
+        downloaded = sum(source.downloaded for source in sources)
+        total = sum(source.submitted for source in sources)
+        duplicates = sum(source.duplicates for source in sources)
+        
         # Resultados finales
-        log(f"\n📁 Ubicación: {os.path.abspath(playlist_folder)}")
-        log(f"✅ COMPLETADO: {downloaded}/{len(songs)} canción(es) descargada(s) en formato {audio_format.upper()}", "success")
+        if batch:
+            log("\n📊 Resumen por fuente:")
+            for source in sources:
+                log(_source_summary(source), "error" if source.error else "info")
+            if duplicates:
+                log(f"🔁 {duplicates} track(s) repetido(s) en el lote descargado(s) una sola vez", "info")
+        else:
+            log(f"\n📁 Ubicación: {os.path.abspath(sources[0].folder)}")
+        log(f"✅ COMPLETADO: {downloaded}/{total} canción(es) descargada(s) en formato {audio_format.upper()}", "success")
         log(f"⏱️ Tiempo total: {round(end_time - start_time)} segundos")
-        log(f"🚀 Descargas paralelas utilizadas: {max_workers}")
+        log(f"🚀 Descargas paralelas utilizadas: {parallel}")
+        if ideal:
+            # Cota inferior con los tiempos reales de cada track y un reparto perfecto
+            log(f"📐 Orden '{schedule}': cota ideal {ideal:.1f} s con {parallel} workers", "info")
         
         if audio_format == 'mp3' and downloaded > 0:
             log(f"🔧 Conversiones MP3 realizadas con FFmpeg", "info")
@@ -296,10 +864,309 @@ def download(url, output="music", audio_format=None, quality=None, parallel=None
         if downloaded > 0:
             avg_time_per_song = (end_time - start_time) / downloaded
             log(f"📊 Tiempo promedio por canción: {avg_time_per_song:.1f} segundos", "info")
+        if timings.summary():
+            # Las etapas se solapan entre workers: los totales pueden superar el tiempo total
+            log("⏱️ Tiempo por etapa:", "info")
+            for line in timings.format_table():
+                log(f"  {line}", "info")
+        if tracer:
+            tracer.save(trace_path, urls=list(urls), format=audio_format, parallel=parallel)
+            log(f"🧵 Traza guardada en {trace_path} (ábrela en https://ui.perfetto.dev o chrome://tracing)", "info")
+        if timings_report:
+            timings.save_report(
+                timings_report, end_time - start_time,
+                urls=list(urls), format=audio_format, quality=quality, parallel=parallel,
+                downloaded=downloaded, submitted=total,
+            )
+            log(f"📄 Informe de tiempos guardado en {timings_report}", "info")
+        return sources
+        
+    except Exception as e:
+        log(f"❌ Error fatal: {e}", "error")
+        events.emit("job_error", error_class=type(e).__name__, message=str(e))
+        raise
+    finally:
+        # Letras de tracks que no llegaron a taggearse (fallidos o cancelados)
+        lyrics_prefetcher.cancel_pending(prefetched)
+        lyrics_prefetcher.release()
+
+def plan_batch(urls, plan_path, output="music", audio_format=None, quality=None, parallel=None, log_callback=None, settings=None):
+    """Resolver un lote sin transferir audio y guardar el plan en ``plan_path``.
+
+    Enumera las URLs a la vez y busca en YouTube cada track de Spotify
+    (``parallel`` búsquedas a la vez) como ``download_batch``, con la misma
+    deduplicación entre fuentes. No crea ninguna carpeta. Para cada track guarda el video elegido, su score, los
+    candidatos evaluados y la duración y el tamaño esperados; ``execute_plan``
+    descarga después esos videos sin volver a buscar. Devuelve el plan.
+    """
+    if settings is None:
+        settings = load_settings()
+    
+    log = make_log(log_callback)
+    
+    try:
+        if not urls:
+            raise ValueError("No hay URLs que planificar")
+        audio_format, quality, parallel = _job_options(audio_format, quality, parallel, settings, log)
+        log(f"🗺️ Planificando {len(urls)} URL(s): {audio_format.upper()} - {quality} kbps - {parallel} búsquedas paralelas", "info")
+        
+        batch = len(urls) > 1
+        sources = [
+            BatchSource(url, index=i, tag=f"[{i}] " if batch else "")
+            for i, url in enumerate(urls, start=1)
+        ]
+        spotify = SpotifyClient() if any(is_spotify_url(source.url) for source in sources) else None
+        # Solo busca y enumera: nunca descarga, así que no crea carpetas (las del plan las crea execute_plan)
+        resolver = YouTubeDownloader(output_dir=os.path.join(output, "tmp"), quality=quality, audio_format=audio_format)
+        timings = StageTimings()
+        start_time = time.time()
+        seen = set()
+        # Búsquedas en vuelo, en orden; con los tracks encolados, como mucho SUBMISSION_WINDOW
+        pending = deque()
+        tracks = []
+        pipeline_events = queue.SimpleQueue()
+        window = threading.Semaphore(SUBMISSION_WINDOW)
+        
+        def open_source(source):
+            return _open_source(source, spotify, settings, output, quality, audio_format, log,
+                                create_folders=False, downloaders=lambda **kwargs: resolver)
+        
+        def acquire_slot():
+            window.acquire()
+            return True
+        
+        def resolve(track_info):
+            with timings.measure("search"):
+                return resolver.search_youtube(track_info)
+        
+        def collect():
+            """Esperar la búsqueda más antigua y guardar su registro"""
+            source, i, item, future = pending.popleft()
+            window.release()
+            match = error = None
+            if future is not None:
+                try:
+                    match = future.result()
+                except Exception as e:
+                    error = e
+            tracks.append(track_record(source.index, i, item, match, error))
+            shown_total = source.total or "?"
+            if error:
+                log(f"{source.tag}({i}/{shown_total}) ❌ {item.track_title} - {item.artist_name}: {error}", "warning")
+            elif match:
+                score = "fallback" if match.fallback else f"score {match.score:.2f}"
+                log(f"{source.tag}({i}/{shown_total}) {item.track_title} → {match.title} ({score})")
+        
+        enumerating = len(sources)
+        with ThreadPoolExecutor(max_workers=min(ENUMERATION_WORKERS, len(sources))) as enumerators, \
+                ThreadPoolExecutor(max_workers=parallel) as executor:
+            # Las fuentes se enumeran a la vez, como en download_batch, y las
+            # búsquedas empiezan mientras tanto
+            for source in sources:
+                enumerators.submit(_enumerate_source, source, open_source, pipeline_events, acquire_slot, timings)
+            while enumerating:
+                kind, source, value = pipeline_events.get()
+                if kind == "enumerated":
+                    enumerating -= 1
+                    if value is not None:
+                        source.error = value
+                        log(f"{source.tag}❌ {source.url}: {value}", "error")
+                    continue
+                keys = track_keys(value)
+                if any(key in seen for key in keys):
+                    window.release()
+                    source.duplicates += 1
+                    continue
+                seen.update(keys)
+                source.submitted += 1
+                # Los videos de YouTube ya son el resultado: solo se buscan los tracks de Spotify
+                future = None if isinstance(value, YouTubeEntry) else executor.submit(resolve, value)
+                pending.append((source, source.submitted, value, future))
+                while len(pending) >= SUBMISSION_WINDOW:
+                    collect()
+            while pending:
+                collect()
+        
+        if all(source.error for source in sources):
+            if not batch:
+                raise sources[0].error
+            raise ValueError("No se pudo leer ninguna URL del lote")
+        
+        summary = plan_summary(tracks)
+        plan = {
+            "version": PLAN_VERSION,
+            "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "output": output,
+            "format": audio_format,
+            "quality": quality,
+            "sources": [_planned_source_record(source, output) for source in sources],
+            "tracks": tracks,
+            "summary": summary,
+        }
+        save_plan(plan_path, plan)
+        
+        duplicates = sum(source.duplicates for source in sources)
+        log(f"✅ Plan guardado en {plan_path}: {summary['resolved']}/{summary['tracks']} track(s) resuelto(s)"
+            f"{f', {duplicates} duplicado(s)' if duplicates else ''}", "success")
+        log(f"📦 Descarga esperada: ~{summary['filesize_bytes'] / 1_000_000:.0f} MB, "
+            f"{summary['duration_s'] / 60:.0f} min de audio", "info")
+        if summary["unresolved"]:
+            log(f"⚠️ {summary['unresolved']} track(s) sin video: se omitirán al ejecutar el plan", "warning")
+        log(f"⏱️ Tiempo total: {round(time.time() - start_time)} segundos")
+        for line in timings.format_table():
+            log(f"  {line}", "info")
+        return plan
+        
+    except Exception as e:
+        log(f"❌ Error fatal: {e}", "error")
+        raise
+
+def execute_plan(plan, output=None, parallel=None, progress_callback=None, log_callback=None, settings=None, events=None, timings_report=None, trace_path=None):
+    """Descargar los videos de un plan (ruta o dict de ``plan_batch``) sin buscar de nuevo.
+
+    Formato y calidad son los del plan; ``output`` reemplaza la carpeta de
+    salida del plan (las carpetas de cada fuente se guardan relativas a ella).
+    """
+    if isinstance(plan, str):
+        plan = load_plan(plan)
+    return download_batch(
+        [source["url"] for source in plan["sources"]], output or plan["output"], plan["format"], plan["quality"],
+        parallel, progress_callback, log_callback, settings,
+        events=events, timings_report=timings_report, trace_path=trace_path, plan=plan,
+    )
+
+def retag(folder, workers=None, lyrics=None, progress_callback=None, log_callback=None, settings=None):
+    """Re-etiquetar una biblioteca existente sin transferir audio.
+
+    Cada archivo se asocia a su track por el ``source_id`` guardado en sus tags.
+    Los tracks de Spotify se piden por lotes de 50, portadas y letras se
+    precargan una vez en las cachés en disco y la escritura de tags se reparte
+    en un pool de procesos.
+    """
+    if settings is None:
+        settings = load_settings()
+    if lyrics is not None:
+        settings = dataclasses.replace(settings, download_lyrics=lyrics)
+    
+    log = make_log(log_callback)
+    lyrics_prefetcher.acquire()
+    
+    try:
+        if not os.path.isdir(folder):
+            raise ValueError(f"La carpeta no existe: {folder}")
+        
+        paths = list(find_audio_files(folder))
+        total = len(paths)
+        if not total:
+            log(f"No se encontraron archivos M4A/MP3 en {folder}", "warning")
+            return 0
+        
+        workers = workers or os.cpu_count() or 2
+        workers = max(1, min(workers, total))
+        chunksize = max(1, min(64, total // (workers * 4)))
+        start_time = time.time()
+        log(f"🏷️ Re-etiquetando {total} archivo(s) con {workers} procesos...")
+        
+        # spawn en todas las plataformas: los workers no heredan los hilos de las cachés
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # 1. Leer el identificador de fuente de cada archivo
+            spotify_files = {}
+            youtube_files = {}
+            untracked = 0
+            for path, tags, error in executor.map(read_source, paths, chunksize=chunksize):
+                if error:
+                    log(f"⚠️ No se pudieron leer los tags de {os.path.basename(path)}: {error}", "warning")
+                    untracked += 1
+                    continue
+                source, source_id = parse_source_id(tags.get("source_id", ""))
+                if source == "spotify":
+                    spotify_files[path] = (source_id, tags)
+                elif source == "youtube":
+                    youtube_files[path] = (source_id, tags)
+                else:
+                    untracked += 1
+            if untracked:
+                log(f"⚠️ {untracked} archivo(s) sin identificador de fuente; se dejan como están", "warning")
+            
+            # 2. Resolver la metadata actual: Spotify por lotes, YouTube en paralelo
+            jobs = {}
+            if spotify_files:
+                log(f"🎵 Consultando {len(spotify_files)} track(s) de Spotify por lotes...")
+                by_id = SpotifyClient().get_tracks_info([source_id for source_id, _ in spotify_files.values()])
+                for path, (source_id, _) in spotify_files.items():
+                    if source_id in by_id:
+                        jobs[path] = by_id[source_id]
+                    else:
+                        log(f"⚠️ Track no disponible en Spotify: {os.path.basename(path)}", "warning")
+            
+            if youtube_files:
+                log(f"▶️ Leyendo metadata de {len(youtube_files)} video(s) de YouTube...")
+                temp_dir = os.path.join(folder, "tmp")
+                yt_downloader = YouTubeDownloader(output_dir=temp_dir)
+                
+                def youtube_metadata(item):
+                    path, (video_id, tags) = item
+                    try:
+                        return path, yt_downloader.get_youtube_metadata(
+                            f"https://www.youtube.com/watch?v={video_id}",
+                            track_number=tags.get("track_number", 1),
+                            playlist_title=tags.get("album_name", ""),
+                        )
+                    except Exception as e:
+                        log(f"⚠️ No se pudo leer {os.path.basename(path)} de YouTube: {e}", "warning")
+                        return path, None
+                
+                with ThreadPoolExecutor(max_workers=settings.parallel_downloads) as pool:
+                    for path, track_info in pool.map(youtube_metadata, youtube_files.items()):
+                        if track_info:
+                            jobs[path] = track_info
+                clean_temp_folder(temp_dir)
+            
+            # 3. Precargar portadas (una por URL) y letras en las cachés en disco
+            track_infos = list(jobs.values())
+            if settings.download_lyrics:
+                lyrics_prefetcher.prefetch(track_infos)
+            album_arts = {info.album_art for info in track_infos if info.album_art}
+            if album_arts:
+                log(f"🖼️ Preparando {len(album_arts)} portada(s)...")
+                
+                def warm_cover(url):
+                    try:
+                        MetadataSetter.get_cover(url, settings)
+                    except Exception as e:
+                        log(f"⚠️ Portada no disponible ({url}): {e}", "warning")
+                
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    list(pool.map(warm_cover, album_arts))
+            if settings.download_lyrics:
+                for track_info in track_infos:
+                    lyrics_prefetcher.get(track_info)
+            
+            # 4. Escribir los tags en el pool de procesos
+            retagged = 0
+            job_paths = list(jobs)
+            results = executor.map(
+                retag_file, job_paths, [jobs[path] for path in job_paths], repeat(settings),
+                chunksize=max(1, min(64, len(job_paths) // (workers * 4))),
+            )
+            for i, (path, error) in enumerate(results, start=1):
+                if error:
+                    log(f"❌ Error en {os.path.basename(path)}: {error}", "error")
+                else:
+                    retagged += 1
+                if progress_callback:
+                    progress_callback(i, len(job_paths))
+        
+        end_time = time.time()
+        log(f"✅ COMPLETADO: {retagged}/{total} archivo(s) re-etiquetado(s)", "success")
+        log(f"⏱️ Tiempo total: {round(end_time - start_time)} segundos")
+        return retagged
         
     except Exception as e:
         log(f"❌ Error fatal: {e}", "error")
         raise
+    finally:
+        lyrics_prefetcher.release()
 
 if __name__ == "__main__":
     app()
@@ -40,6 +40,31 @@ class Config:
             base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             return os.path.join(base_path, 'assets', filename)
     
+    @staticmethod
+    def get_cache_dir(*parts):
+        """Directorio de caché por usuario (portadas, letras, respuestas de API)"""
+        base = os.environ.get('MORPHY_CACHE_DIR')
+        if not base:
+            if sys.platform.startswith('win'):
+                root = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+            elif sys.platform.startswith('darwin'):
+                root = os.path.expanduser('~/Library/Caches')
+            else:
+                root = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+            base = os.path.join(root, 'MorphyDownloader')
+        return os.path.join(base, *parts)
+    
+    @staticmethod
+    def get_config_dir():
+        """Directorio de configuración por usuario (config.toml compartido GUI/CLI)"""
+        if sys.platform.startswith('win'):
+            root = os.environ.get('APPDATA') or os.path.expanduser('~\\AppData\\Roaming')
+        elif sys.platform.startswith('darwin'):
+            root = os.path.expanduser('~/Library/Application Support')
+        else:
+            root = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+        return os.path.join(root, 'MorphyDownloader')
+    
     @staticmethod
     def check_ffmpeg():
         """Verificar si FFmpeg está disponible en el sistema"""
@@ -5,5 +5,6 @@ Core modules for MorphyDownloader
 from .spotify_client import SpotifyClient
 from .youtube_downloader import YouTubeDownloader
 from .metadata import MetadataSetter
+from .track_info import TrackInfo
 
-__all__ = ['SpotifyClient', 'YouTubeDownloader', 'MetadataSetter']
\ No newline at end of file
+__all__ = ['SpotifyClient', 'YouTubeDownloader', 'MetadataSetter', 'TrackInfo']
\ No newline at end of file
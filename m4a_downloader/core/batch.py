@@ -0,0 +1,111 @@
+"""Batch download helpers - URL lists, per-source bookkeeping and cross-source dedup"""
+import sys
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ..utils import youtube_video_id
+from .track_info import YouTubeEntry
+
+# Resultado de descargar un item del pipeline
+DOWNLOADED = "downloaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def read_url_list(stream):
+    """Leer URLs (una por línea) de un archivo o stdin.
+
+    Se ignoran las líneas vacías y los comentarios ``#``; las URLs repetidas
+    se quedan solo la primera vez.
+    """
+    urls = []
+    seen = set()
+    for line in stream:
+        url = line.strip()
+        if not url or url.startswith('#') or url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+    return urls
+
+
+def read_url_file(path):
+    """Leer la lista de URLs de ``path`` (``-`` para stdin)"""
+    if path == '-':
+        return read_url_list(sys.stdin)
+    with open(path, 'r', encoding='utf-8') as f:
+        return read_url_list(f)
+
+
+def track_keys(item):
+    """Identificadores de un track para deduplicar entre fuentes del lote.
+
+    Un track es duplicado si comparte cualquiera de ellos con uno ya encolado:
+    el mismo tema en un álbum y en una playlist de Spotify coincide por id o
+    ISRC, y un video de YouTube por su id.
+    """
+    if isinstance(item, YouTubeEntry):
+        keys = []
+        if item.track and item.track.source_id:
+            keys.append(item.track.source_id)
+        video_id = youtube_video_id(item.url)
+        keys.append(f"youtube:{video_id}" if video_id else item.url)
+        return keys
+    keys = []
+    if item.source_id:
+        keys.append(item.source_id)
+    if item.isrc:
+        keys.append(f"isrc:{item.isrc.upper()}")
+    if not keys:
+        keys.append(f"title:{item.artist_name.lower()}|{item.track_title.lower()}")
+    return keys
+
+
+@dataclass
+class BatchSource:
+    """Una URL del lote con su progreso y el resumen de resultados.
+
+    Solo la modifica el hilo que reparte el trabajo, así que no necesita locks.
+    """
+
+    url: str
+    index: int = 1
+    # Prefijo de los mensajes ("[2] ") cuando el lote tiene varias URLs
+    tag: str = ""
+    source_type: str = ""
+    name: str = ""
+    folder: str = ""
+    # 0 mientras la enumeración en streaming aún no conoce el total
+    total: int = 0
+    submitted: int = 0
+    downloaded: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    enumerated: bool = False
+    error: Optional[Exception] = None
+    yt_downloader: object = field(default=None, repr=False)
+
+    @property
+    def finished(self):
+        return self.downloaded + self.skipped + self.failed
+
+    @property
+    def done(self):
+        return self.enumerated and self.finished == self.submitted
+
+    @property
+    def expected(self):
+        """Tracks que se espera descargar (crece mientras se enumera)"""
+        if self.enumerated:
+            return self.submitted
+        return max(self.total - self.duplicates, self.submitted)
+
+    def record(self, status):
+        if status == DOWNLOADED:
+            self.downloaded += 1
+        elif status == SKIPPED:
+            self.skipped += 1
+        else:
+            self.failed += 1
+
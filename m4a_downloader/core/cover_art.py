@@ -0,0 +1,92 @@
+"""Cover art normalization - sniffed format, bounded size, shared bytes"""
+import io
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_pillow_warned = threading.Event()
+
+# Formatos que MP4 (covr) acepta; ID3 acepta cualquier MIME en APIC
+MP4_COVER_FORMATS = ("image/jpeg", "image/png")
+
+
+def sniff_image_format(data):
+    """Detectar el MIME real por los magic bytes (``None`` si no es una imagen conocida)"""
+    if data[:3] == b'\xff\xd8\xff':
+        return "image/jpeg"
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return "image/png"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "image/webp"
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return "image/gif"
+    return None
+
+
+class CoverArt:
+    """Portada ya procesada; una sola instancia se comparte entre todos los tracks"""
+
+    __slots__ = ('data', 'mime_type', '_mp4_cover')
+
+    def __init__(self, data, mime_type):
+        self.data = data
+        self.mime_type = mime_type
+        self._mp4_cover = None
+
+    def mp4_cover(self):
+        """``MP4Cover`` reutilizable (evita copiar los bytes por cada archivo M4A)"""
+        if self._mp4_cover is None:
+            from mutagen.mp4 import MP4Cover
+            imageformat = MP4Cover.FORMAT_PNG if self.mime_type == "image/png" else MP4Cover.FORMAT_JPEG
+            self._mp4_cover = MP4Cover(self.data, imageformat=imageformat)
+        return self._mp4_cover
+
+    def __len__(self):
+        return len(self.data)
+
+
+def process_cover(data, declared_mime=None, max_size=0, quality=90):
+    """Normalizar una portada descargada.
+
+    El formato se detecta por magic bytes (no por la URL). Si Pillow está
+    instalado, las imágenes mayores que ``max_size`` px (0 = sin límite) o en
+    formatos que MP4 no admite (webp/gif) se reescalan/recodifican a JPEG.
+    """
+    mime_type = sniff_image_format(data) or declared_mime or "image/jpeg"
+    if mime_type not in MP4_COVER_FORMATS or max_size:
+        try:
+            return _reencode(data, mime_type, max_size, quality)
+        except ImportError:
+            # Una sola vez por proceso, no por portada
+            if not _pillow_warned.is_set():
+                _pillow_warned.set()
+                logger.warning("Pillow no está instalado: las portadas no se reescalan y las WebP/GIF "
+                               "no se incrustan en M4A (pip install Pillow)")
+            if mime_type not in MP4_COVER_FORMATS:
+                logger.debug(f"Pillow not available, keeping {mime_type} cover as-is")
+        except Exception as e:
+            logger.warning(f"Failed to process cover art: {e}")
+    return CoverArt(data, mime_type)
+
+
+def _reencode(data, mime_type, max_size, quality):
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        too_big = bool(max_size) and max(image.size) > max_size
+        if mime_type in MP4_COVER_FORMATS and not too_big:
+            return CoverArt(data, mime_type)
+
+        original_size = image.size
+        if too_big:
+            image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=quality, optimize=True)
+
+    processed = output.getvalue()
+    logger.debug(f"Cover re-encoded: {mime_type} {original_size[0]}x{original_size[1]} "
+                 f"{len(data)} bytes -> image/jpeg {len(processed)} bytes")
+    return CoverArt(processed, "image/jpeg")
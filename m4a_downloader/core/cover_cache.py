@@ -0,0 +1,115 @@
+"""Cover art cache - in-memory LRU backed by an on-disk store"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from ..config import Config
+from .cover_art import CoverArt
+
+logger = logging.getLogger(__name__)
+
+MIME_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+EXTENSION_MIMES = {ext: mime for mime, ext in MIME_EXTENSIONS.items()}
+
+
+class CoverArtCache:
+    """Cache de portadas por URL compartida entre tracks, álbumes y ejecuciones.
+
+    Las descargas concurrentes de la misma URL se agrupan (single-flight):
+    solo un worker hace la petición y el resto espera su resultado.
+    """
+
+    def __init__(self, cache_dir=None, max_items=64):
+        self.cache_dir = cache_dir or Config.get_cache_dir('covers')
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, fetch, variant=''):
+        """Devolver el :class:`CoverArt` de ``url``, usando ``fetch(url)`` solo si no está en caché.
+
+        ``variant`` identifica el procesado aplicado (tamaño máximo, calidad):
+        cada variante se guarda por separado y se comparte entre todos los tracks.
+        """
+        key = f"{url}#{variant}" if variant else url
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                return cached
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            logger.debug(f"Waiting for in-flight cover download: {url}")
+            return pending.result()
+
+        try:
+            cover = self._load_from_disk(key)
+            if cover is None:
+                cover = fetch(url)
+                self._save_to_disk(key, cover)
+            self._remember(key, cover)
+            pending.set_result(cover)
+            return cover
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _remember(self, key, cover):
+        with self._lock:
+            self._memory[key] = cover
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _load_from_disk(self, key):
+        base = self._path_for(key)
+        for ext, mime_type in EXTENSION_MIMES.items():
+            path = f"{base}.{ext}"
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.debug(f"Failed to read cached cover {path}: {e}")
+                continue
+            logger.debug(f"Cover cache hit on disk: {key}")
+            return CoverArt(data, mime_type)
+        return None
+
+    def _save_to_disk(self, key, cover):
+        path = f"{self._path_for(key)}.{MIME_EXTENSIONS.get(cover.mime_type, 'jpg')}"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Escritura atómica: otros procesos nunca ven un archivo a medias
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(cover.data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"Failed to store cover in cache: {e}")
+
+
+# Instancia global compartida por todos los workers
+cover_cache = CoverArtCache()
@@ -0,0 +1,99 @@
+"""Structured job events - machine-readable NDJSON stream for orchestrators"""
+import json
+import queue
+import sys
+import threading
+import time
+
+EVENT_FORMATS = ('ndjson',)
+
+
+class EventStream:
+    """Eventos estructurados de un trabajo, un objeto JSON por línea (NDJSON).
+
+    ``emit`` solo encola una tupla en una ``SimpleQueue``: los workers no
+    compiten por ningún lock ni serializan JSON. Un hilo escritor serializa y
+    escribe los eventos en orden de llegada. Sin ``stream`` el stream está
+    desactivado y ``emit`` no hace nada.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.enabled = stream is not None
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        if self.enabled:
+            self._writer = threading.Thread(target=self._run, name="events-writer", daemon=True)
+            self._writer.start()
+
+    def emit(self, event, **fields):
+        if self.enabled:
+            self._queue.put((time.time(), event, fields))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, event, fields = item
+            record = {"ts": round(timestamp, 3), "event": event}
+            record.update(fields)
+            try:
+                self.stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                # Un flush por ráfaga, no por evento
+                if self._queue.empty():
+                    self.stream.flush()
+            except (OSError, ValueError):
+                # El lector cerró el pipe: se siguen consumiendo eventos sin escribir
+                self.enabled = False
+
+    def close(self):
+        """Escribir los eventos pendientes y detener el hilo escritor"""
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+        self.enabled = False
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventCallback:
+    """Misma interfaz que ``EventStream``, pero entrega cada evento a ``callback(event, fields)``.
+
+    El callback corre en el hilo que emite (workers, enumeración): debe ser
+    barato y seguro entre hilos, p. ej. encolar para la GUI.
+    """
+
+    enabled = True
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def emit(self, event, **fields):
+        self.callback(event, fields)
+
+    def close(self):
+        pass
+
+
+def open_event_stream(event_format=None, path=None):
+    """Crear el ``EventStream`` de un trabajo: a ``path`` o, sin ruta, a stdout"""
+    if not event_format:
+        return EventStream()
+    if event_format not in EVENT_FORMATS:
+        raise ValueError(f"Formato de eventos no soportado: {event_format}")
+    if path and path != '-':
+        return EventStream(open(path, 'w', encoding='utf-8'))
+    return EventStream(sys.stdout)
+
+
+# Stream desactivado por defecto (la GUI y las llamadas sin --events)
+NULL_EVENTS = EventStream()
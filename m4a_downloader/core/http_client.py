@@ -0,0 +1,198 @@
+"""Shared keep-alive HTTP client for metadata network I/O (covers, lyrics, Spotify revalidation)"""
+import http.client
+import json
+import logging
+import ssl
+import threading
+from collections import defaultdict
+from urllib.parse import urlencode, urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Estrategias SSL en orden de preferencia; la que funciona se recuerda por host
+SSL_STRATEGIES = ('certifi', 'default', 'insecure')
+# Sin 'insecure': para peticiones con credenciales, que deben fallar si el certificado no se verifica
+VERIFIED_SSL_STRATEGIES = ('certifi', 'default')
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+DEFAULT_HEADERS = {
+    'User-Agent': 'MorphyDownloader',
+    'Accept': '*/*',
+    'Connection': 'keep-alive',
+}
+
+
+class HttpResponse:
+    def __init__(self, url, status, reason, headers, content):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+class HttpSession:
+    """Pool de conexiones HTTP/HTTPS por host, seguro entre hilos.
+
+    Los contextos SSL se crean una sola vez por estrategia y las conexiones
+    se reutilizan (keep-alive), así que una playlist completa hace unos pocos
+    handshakes TLS en lugar de uno por portada o letra.
+    """
+
+    def __init__(self, max_idle_per_host=8, timeout=20, ssl_strategies=SSL_STRATEGIES):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.ssl_strategies = ssl_strategies
+        self.connections_opened = 0
+        self._idle = defaultdict(list)
+        self._ssl_contexts = {}
+        self._host_strategy = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None, max_redirects=5):
+        """GET ``url`` y devolver un :class:`HttpResponse` con el cuerpo completo"""
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        request_headers = dict(DEFAULT_HEADERS)
+        if headers:
+            request_headers.update(headers)
+
+        for _ in range(max_redirects + 1):
+            response = self._get_once(url, request_headers, timeout or self.timeout)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_CODES or not location:
+                return response
+            url = urljoin(url, location)
+        raise Exception(f"Too many redirects: {url}")
+
+    def _get_once(self, url, headers, timeout):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        host = parts.netloc
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        if parts.scheme == 'http':
+            return self._request(('http', host, None), url, path, headers, timeout)
+
+        last_error = None
+        for strategy in self._strategies_for(host):
+            try:
+                context = self._get_ssl_context(strategy)
+            except Exception as e:
+                last_error = e
+                continue
+            try:
+                response = self._request(('https', host, strategy), url, path, headers, timeout, context)
+            except ssl.SSLError as e:
+                last_error = e
+                logger.debug(f"SSL strategy '{strategy}' failed for {host}: {e}")
+                continue
+            if self._host_strategy.get(host) != strategy:
+                self._host_strategy[host] = strategy
+                logger.debug(f"Using SSL strategy '{strategy}' for {host}")
+            return response
+
+        raise last_error or Exception(f"All SSL strategies failed for {host}")
+
+    def _strategies_for(self, host):
+        known = self._host_strategy.get(host)
+        if not known:
+            return self.ssl_strategies
+        return (known,) + tuple(s for s in self.ssl_strategies if s != known)
+
+    def _get_ssl_context(self, strategy):
+        with self._lock:
+            context = self._ssl_contexts.get(strategy)
+            if context is None:
+                context = self._ssl_contexts[strategy] = self._create_ssl_context(strategy)
+            return context
+
+    @staticmethod
+    def _create_ssl_context(strategy):
+        if strategy == 'certifi':
+            import certifi
+            return ssl.create_default_context(cafile=certifi.where())
+        context = ssl.create_default_context()
+        if strategy == 'insecure':
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def _request(self, pool_key, url, path, headers, timeout, context=None):
+        conn, reused = self._acquire(pool_key, timeout, context)
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # El servidor cerró la conexión keep-alive; reintentar con una nueva
+            conn, _ = self._acquire(pool_key, timeout, context, fresh=True)
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+        try:
+            content = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(pool_key, conn)
+        return HttpResponse(url, response.status, response.reason, response.headers, content)
+
+    def _acquire(self, pool_key, timeout, context, fresh=False):
+        if not fresh:
+            with self._lock:
+                idle = self._idle[pool_key]
+                if idle:
+                    conn = idle.pop()
+                    if conn.sock is not None:
+                        conn.sock.settimeout(timeout)
+                    return conn, True
+
+        scheme, host, _ = pool_key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, timeout=timeout, context=context)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=timeout)
+        with self._lock:
+            self.connections_opened += 1
+        return conn, False
+
+    def _release(self, pool_key, conn):
+        with self._lock:
+            idle = self._idle[pool_key]
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for idle in pools:
+            for conn in idle:
+                conn.close()
+
+
+# Sesión global compartida por todos los workers de metadatos (portadas y letras públicas)
+http_session = HttpSession()
+# Sesión con verificación TLS obligatoria para la Web API de Spotify (lleva el token Bearer)
+verified_session = HttpSession(ssl_strategies=VERIFIED_SSL_STRATEGIES)
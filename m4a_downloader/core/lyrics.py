@@ -0,0 +1,189 @@
+"""Lyrics prefetch stage with a persistent on-disk cache (lrclib.net)"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config import Config
+from .http_client import http_session
+
+logger = logging.getLogger(__name__)
+
+LRCLIB_URL = "https://lrclib.net/api/get"
+# Los resultados negativos se reintentan pasado este tiempo (lrclib crece)
+NEGATIVE_TTL = 7 * 24 * 3600
+
+
+def _lyrics_key(track_info):
+    return track_info.main_artist, track_info.track_title, int(track_info.duration or 0)
+
+
+class LyricsCache:
+    """Cache en disco de letras por artista/título/duración, incluidos los negativos"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or Config.get_cache_dir('lyrics')
+
+    def _path_for(self, key):
+        digest = hashlib.sha1("\0".join(str(part) for part in key).lower().encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def get(self, key):
+        """Devolver ``(hit, lyrics)``; ``lyrics`` es ``None`` en un negativo cacheado"""
+        try:
+            with open(self._path_for(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        lyrics = entry.get("lyrics")
+        if lyrics is None and time.time() - entry.get("fetched_at", 0) > NEGATIVE_TTL:
+            return False, None
+        return True, lyrics
+
+    def put(self, key, lyrics):
+        path = self._path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"lyrics": lyrics, "fetched_at": time.time()}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"Failed to store lyrics in cache: {e}")
+
+
+class LyricsPrefetcher:
+    """Busca letras en segundo plano en cuanto se conoce la metadata de los tracks.
+
+    El tagging solo lee el resultado: si el prefetch ya terminó sale de la caché,
+    si sigue en curso espera a ese mismo future en lugar de repetir la petición,
+    y si aún no empezó lo cancela y busca en el hilo que taggea.
+
+    Cada trabajo que prefetchea lo abre con ``acquire`` y lo cierra con
+    ``release``: al salir el último se detienen los hilos (``shutdown``) y el
+    siguiente prefetch los vuelve a crear.
+    """
+
+    def __init__(self, cache=None, max_workers=4):
+        self.cache = cache or LyricsCache()
+        self.max_workers = max_workers
+        self._executor = None
+        self._inflight = {}
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def prefetch(self, tracks):
+        """Encolar la búsqueda de letras para cada track que no esté ya en caché; devuelve las claves encoladas"""
+        queued = []
+        for track_info in tracks:
+            key = _lyrics_key(track_info)
+            if not key[1]:
+                continue
+            with self._lock:
+                if key in self._inflight:
+                    continue
+                hit, _ = self.cache.get(key)
+                if hit:
+                    continue
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='lyrics')
+                self._inflight[key] = self._executor.submit(self._fetch_and_store, key)
+                queued.append(key)
+        return queued
+
+    def cancel_pending(self, keys=None):
+        """Cancelar los prefetch que aún no empezaron (solo los de ``keys`` si se indica)"""
+        with self._lock:
+            self._cancel_pending(keys)
+
+    def shutdown(self):
+        """Cancelar lo pendiente y detener los hilos sin esperar a las búsquedas en curso"""
+        with self._lock:
+            self._shutdown()
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+
+    def release(self):
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if not self._users:
+                self._shutdown()
+
+    def _cancel_pending(self, keys):
+        for key in list(self._inflight) if keys is None else keys:
+            pending = self._inflight.get(key)
+            if pending is not None and pending.cancel():
+                del self._inflight[key]
+
+    def _shutdown(self):
+        self._cancel_pending(None)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get(self, track_info, timeout=10):
+        """Devolver las letras del track (o ``None``), esperando un prefetch en curso"""
+        key = _lyrics_key(track_info)
+        with self._lock:
+            pending = self._inflight.get(key)
+        if pending is not None:
+            if pending.cancel():
+                # Aún en la cola del prefetch (detrás de otros tracks): buscar ahora en este hilo
+                with self._lock:
+                    if self._inflight.get(key) is pending:
+                        del self._inflight[key]
+                return self._fetch_and_store(key, track=False)
+            try:
+                return pending.result(timeout=timeout)
+            except Exception as e:
+                logger.debug(f"Lyrics prefetch not ready for {key[0]} - {key[1]}: {e}")
+                return None
+
+        hit, lyrics = self.cache.get(key)
+        if hit:
+            return lyrics
+        # Sin prefetch previo (p. ej. llamada directa a set_metadata): buscar ahora
+        return self._fetch_and_store(key, track=False)
+
+    def _fetch_and_store(self, key, track=True):
+        artist, title, duration = key
+        try:
+            lyrics = fetch_lyrics(artist, title, duration)
+            self.cache.put(key, lyrics)
+            return lyrics
+        except Exception as e:
+            # Error de red: no cachear como negativo
+            logger.debug(f"Failed to fetch lyrics: {e}")
+            return None
+        finally:
+            if track:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+
+def fetch_lyrics(artist, title, duration=0):
+    """Consultar lrclib; ``None`` si no hay letras, excepción si falla la red"""
+    params = {'artist_name': artist, 'track_name': title}
+    if duration:
+        params['duration'] = duration
+    response = http_session.get(LRCLIB_URL, params=params, timeout=5)
+    if response.status == 404 and duration:
+        # lrclib exige ±2 s de duración; reintentar sin ella como antes
+        return fetch_lyrics(artist, title)
+    if response.status == 404:
+        return None
+    if response.status != 200:
+        raise Exception(f"HTTP error {response.status}: {response.reason}")
+    data = response.json()
+    if data and isinstance(data, dict):
+        return data.get('syncedLyrics') or data.get('plainLyrics')
+    return None
+
+
+# Instancia global compartida por el pipeline de descarga y el tagging
+lyrics_prefetcher = LyricsPrefetcher()
@@ -1,15 +1,42 @@
 """M4A metadata setter module - Enhanced SSL and certificate handling"""
-from mutagen.mp4 import MP4, MP4Cover
+from mutagen.mp4 import MP4, MP4FreeForm
 from mutagen.id3 import ID3, APIC
-import urllib.request
-import tempfile
 import ssl
 import os
 import sys
 import logging
+from ..settings import Settings
+from .cover_art import MP4_COVER_FORMATS, process_cover
+from .cover_cache import cover_cache
+from .http_client import http_session
+from .lyrics import lyrics_prefetcher
+from .timings import NULL_TIMINGS
+from .track_info import TrackInfo
 
 logger = logging.getLogger(__name__)
 
+# Padding reservado al escribir tags: los retags posteriores caben in-place
+# sin reescribir el archivo completo (moov en M4A, audio en MP3)
+TAG_PADDING = 64 * 1024
+MAX_TAG_PADDING = 1024 * 1024
+
+def _tag_padding(info):
+    """Conservar el padding existente si alcanza; si no, reservar TAG_PADDING"""
+    if 0 <= info.padding <= MAX_TAG_PADDING:
+        return info.padding
+    return TAG_PADDING
+
+# Identificador de la fuente ("spotify:track:<id>", "youtube:<id>") para poder
+# re-etiquetar la biblioteca sin volver a descargar el audio
+SOURCE_ID_DESC = 'MORPHY_SOURCE_ID'
+SOURCE_ID_MP4_KEY = f'----:com.apple.iTunes:{SOURCE_ID_DESC}'
+
+COVER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
 class MetadataSetter:
     @staticmethod
     def get_ssl_context():
@@ -44,218 +71,187 @@ class MetadataSetter:
             return ssl_context
     
     @staticmethod
-    def _fetch_lyrics(artist, title):
-        import urllib.request
-        import urllib.parse
-        import json
-        try:
-            url = f"https://lrclib.net/api/get?artist_name={urllib.parse.quote(artist)}&track_name={urllib.parse.quote(title)}"
-            req = urllib.request.Request(url, headers={'User-Agent': 'MorphyDownloader'})
-            with urllib.request.urlopen(req, timeout=5) as response:
-                if response.status == 200:
-                    data = json.loads(response.read().decode('utf-8'))
-                    if data and isinstance(data, dict):
-                        return data.get('syncedLyrics') or data.get('plainLyrics')
-        except Exception as e:
-            logger.debug(f"Failed to fetch lyrics: {e}")
-        return None
+    def set_metadata(metadata, file_path, settings=None, timings=None):
+        """Set metadata for m4a or mp3 file using the job's settings snapshot
 
-    @staticmethod
-    def set_metadata(metadata, file_path):
-        """Set metadata for m4a or mp3 file"""
-        from PySide6.QtCore import QSettings
-        settings = QSettings('MorphyDownloader', 'Config')
-        download_lyrics_opt = settings.value('download_lyrics', False, type=bool)
+        ``timings`` (``StageTimings`` o su vista ``bind``) mide por separado
+        letras, portada y escritura de tags.
+        """
+        metadata = TrackInfo.coerce(metadata)
+        timings = timings or NULL_TIMINGS
         lyrics = None
         
-        if download_lyrics_opt:
-            logger.debug("Fetching lyrics...")
-            artists = metadata.get("artists", [])
-            artist_name = artists[0] if artists else ''
-            lyrics = MetadataSetter._fetch_lyrics(artist_name, metadata.get("track_title", ""))
+        if settings is not None and settings.download_lyrics:
+            # Normalmente ya prefetcheadas por el pipeline: solo se lee la caché
+            with timings.measure("lyrics"):
+                lyrics = lyrics_prefetcher.get(metadata)
+
+        # Reunir la portada antes de abrir el archivo para escribir todo de una vez
+        cover = None
+        album_art_url = metadata.album_art
+        if album_art_url:
+            try:
+                with timings.measure("cover"):
+                    cover = MetadataSetter.get_cover(album_art_url, settings)
+            except Exception as e:
+                logger.warning(f"Failed to download album art: {e}")
 
         try:
-            if file_path.lower().endswith('.m4a'):
-                # Set basic metadata for M4A
-                mp4file = MP4(file_path)
-                mp4file['\xa9nam'] = metadata.get("track_title", "")  # Title
-                mp4file['\xa9ART'] = ", ".join(metadata.get("artists", []))  # Artist
-                mp4file['\xa9alb'] = metadata.get("album_name", "")  # Album
-                mp4file['\xa9day'] = metadata.get("release_date", "")  # Year
-                mp4file['trkn'] = [(metadata.get("track_number", 0), 0)]  # Track number
-                
-                if lyrics:
-                    mp4file['\xa9lyr'] = lyrics
-                    
-                mp4file.save()
-                logger.debug(f"Basic metadata set for {os.path.basename(file_path)} (M4A)")
-            elif file_path.lower().endswith('.mp3'):
-                # Set basic metadata for MP3
-                from mutagen.id3 import ID3, TIT2, TPE1, TALB, TDRC, TRCK, APIC
-                try:
-                    audio = ID3(file_path)
-                except Exception:
-                    audio = ID3()
-                audio.delall("TIT2")
-                audio.delall("TPE1")
-                audio.delall("TALB")
-                audio.delall("TDRC")
-                audio.delall("TRCK")
-                audio.add(TIT2(encoding=3, text=metadata.get("track_title", "")))
-                audio.add(TPE1(encoding=3, text=metadata.get("artists", [])))
-                audio.add(TALB(encoding=3, text=metadata.get("album_name", "")))
-                audio.add(TDRC(encoding=3, text=metadata.get("release_date", "")))
-                audio.add(TRCK(encoding=3, text=str(metadata.get("track_number", 0))))
-                
-                if lyrics:
-                    from mutagen.id3 import USLT
-                    audio.delall("USLT")
-                    audio.add(USLT(encoding=3, lang='eng', text=lyrics))
-                    
-                audio.save(file_path, v2_version=3)
-                logger.debug(f"Basic metadata set for {os.path.basename(file_path)} (MP3)")
-            else:
-                logger.warning(f"Unsupported file type for metadata: {file_path}")
-                return
-            # Handle album art
-            album_art_url = metadata.get("album_art", "")
-            if album_art_url:
-                try:
-                    MetadataSetter._set_album_art_with_fallbacks(file_path, album_art_url)
-                    logger.debug(f"Album art successfully set for {os.path.basename(file_path)}")
-                except Exception as e:
-                    logger.warning(f"Failed to set album art: {e}")
+            with timings.measure("tag"):
+                MetadataSetter.write_tags(file_path, metadata, lyrics=lyrics, cover=cover)
         except Exception as e:
             logger.error(f"Failed to set metadata for {file_path}: {e}")
             raise
-    
+
+    @staticmethod
+    def get_cover(album_art_url, settings=None):
+        """Return the processed :class:`CoverArt` for ``album_art_url`` through the cover cache"""
+        # Sin snapshot (CLI sin config, retag): los valores por defecto de Settings
+        settings = settings or Settings()
+        max_size = settings.cover_max_size
+        quality = settings.cover_quality
+        return cover_cache.get(
+            album_art_url,
+            lambda url: process_cover(*MetadataSetter._fetch_album_art(url), max_size=max_size, quality=quality),
+            variant=f"max={max_size},q={quality}",
+        )
+
+    @staticmethod
+    def write_tags(file_path, metadata, lyrics=None, cover=None):
+        """Write text tags, lyrics and cover in a single save.
+
+        ``metadata`` is a :class:`TrackInfo` (dicts are accepted too) and
+        ``cover`` is a :class:`CoverArt` or ``None``.
+        """
+        metadata = TrackInfo.coerce(metadata)
+        if file_path.lower().endswith('.m4a'):
+            MetadataSetter._write_m4a_tags(file_path, metadata, lyrics, cover)
+        elif file_path.lower().endswith('.mp3'):
+            MetadataSetter._write_mp3_tags(file_path, metadata, lyrics, cover)
+        else:
+            logger.warning(f"Unsupported file type for metadata: {file_path}")
+            return
+        if cover:
+            logger.debug(f"Album art set: {len(cover)} bytes, {cover.mime_type}, file: {file_path}")
+
     @staticmethod
-    def _set_album_art_with_fallbacks(file_path, album_art_url):
-        """Set album art with multiple fallback strategies"""
-        strategies = [
-            MetadataSetter._download_with_certifi,
-            MetadataSetter._download_with_default_ssl,
-            MetadataSetter._download_without_ssl_verification,
-        ]
+    def _write_m4a_tags(file_path, metadata, lyrics, cover):
+        mp4file = MP4(file_path)
+        mp4file['\xa9nam'] = metadata.track_title  # Title
+        mp4file['\xa9ART'] = ", ".join(metadata.artists)  # Artist
+        mp4file['\xa9alb'] = metadata.album_name  # Album
+        mp4file['\xa9day'] = metadata.release_date  # Year
+        mp4file['trkn'] = [(metadata.track_number, 0)]  # Track number
+        if metadata.source_id:
+            mp4file[SOURCE_ID_MP4_KEY] = [MP4FreeForm(metadata.source_id.encode('utf-8'))]
         
-        last_error = None
-        for i, strategy in enumerate(strategies, 1):
-            try:
-                logger.debug(f"Trying album art download strategy {i}/{len(strategies)}")
-                strategy(file_path, album_art_url)
-                return  # Success!
-            except Exception as e:
-                last_error = e
-                logger.debug(f"Strategy {i} failed: {e}")
-                continue
+        if lyrics:
+            mp4file['\xa9lyr'] = lyrics
         
-        # All strategies failed
-        raise last_error or Exception("All album art download strategies failed")
-    
+        if cover:
+            if cover.mime_type in MP4_COVER_FORMATS:
+                # Reemplazar portadas previas para evitar duplicados
+                mp4file['covr'] = [cover.mp4_cover()]
+            else:
+                logger.warning(f"M4A only supports JPEG/PNG covers, skipping {cover.mime_type} (install Pillow to convert)")
+        
+        mp4file.save(padding=_tag_padding)
+        logger.debug(f"Metadata set for {os.path.basename(file_path)} (M4A)")
+
     @staticmethod
-    def _download_with_certifi(file_path, album_art_url):
-        """Strategy 1: Download using certifi certificates"""
+    def _write_mp3_tags(file_path, metadata, lyrics, cover):
+        from mutagen.id3 import ID3NoHeaderError, TIT2, TPE1, TALB, TDRC, TRCK, TXXX, USLT
         try:
-            import certifi
-        except ImportError:
-            raise Exception("certifi not available")
+            audio = ID3(file_path)
+        except ID3NoHeaderError:
+            audio = ID3()
+        audio.delall("TIT2")
+        audio.delall("TPE1")
+        audio.delall("TALB")
+        audio.delall("TDRC")
+        audio.delall("TRCK")
+        audio.add(TIT2(encoding=3, text=metadata.track_title))
+        audio.add(TPE1(encoding=3, text=list(metadata.artists)))
+        audio.add(TALB(encoding=3, text=metadata.album_name))
+        audio.add(TDRC(encoding=3, text=metadata.release_date))
+        audio.add(TRCK(encoding=3, text=str(metadata.track_number)))
+        if metadata.source_id:
+            audio.delall(f"TXXX:{SOURCE_ID_DESC}")
+            audio.add(TXXX(encoding=3, desc=SOURCE_ID_DESC, text=metadata.source_id))
         
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        MetadataSetter._download_and_set_art(file_path, album_art_url, ssl_context)
-    
-    @staticmethod
-    def _download_with_default_ssl(file_path, album_art_url):
-        """Strategy 2: Download with default SSL context"""
-        ssl_context = ssl.create_default_context()
-        MetadataSetter._download_and_set_art(file_path, album_art_url, ssl_context)
+        if lyrics:
+            audio.delall("USLT")
+            audio.add(USLT(encoding=3, lang='eng', text=lyrics))
+        
+        if cover:
+            audio.delall("APIC")
+            audio.add(APIC(
+                encoding=0,  # Latin1 para max compatibilidad
+                mime=cover.mime_type,
+                type=3,  # Cover (front)
+                desc="Cover",
+                data=cover.data
+            ))
+        
+        audio.save(file_path, v2_version=3, padding=_tag_padding)  # ID3v2.3 para compatibilidad
+        logger.debug(f"Metadata set for {os.path.basename(file_path)} (MP3)")
     
     @staticmethod
-    def _download_without_ssl_verification(file_path, album_art_url):
-        """Strategy 3: Download without SSL verification (last resort)"""
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        MetadataSetter._download_and_set_art(file_path, album_art_url, ssl_context)
-    
+    def read_tags(file_path):
+        """Read back ``source_id``, track number and album from a tagged file (``{}`` if unsupported)"""
+        info = {}
+        if file_path.lower().endswith('.m4a'):
+            tags = MP4(file_path).tags or {}
+            if SOURCE_ID_MP4_KEY in tags:
+                info["source_id"] = bytes(tags[SOURCE_ID_MP4_KEY][0]).decode('utf-8', errors='replace')
+            if 'trkn' in tags:
+                info["track_number"] = tags['trkn'][0][0]
+            if '\xa9alb' in tags:
+                info["album_name"] = tags['\xa9alb'][0]
+        elif file_path.lower().endswith('.mp3'):
+            from mutagen.id3 import ID3NoHeaderError
+            try:
+                audio = ID3(file_path)
+            except ID3NoHeaderError:
+                return info
+            frame = audio.get(f"TXXX:{SOURCE_ID_DESC}")
+            if frame:
+                info["source_id"] = str(frame.text[0])
+            if audio.get("TRCK"):
+                try:
+                    info["track_number"] = int(str(audio["TRCK"].text[0]).split('/')[0])
+                except ValueError:
+                    pass
+            if audio.get("TALB"):
+                info["album_name"] = str(audio["TALB"].text[0])
+        return info
+
     @staticmethod
-    def _download_and_set_art(file_path, album_art_url, ssl_context):
-        """Download and set album art with given SSL context for MP3 or m4a"""
-        # Create request with proper headers
-        request = urllib.request.Request(
-            album_art_url,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        )
-        
+    def _fetch_album_art(album_art_url):
+        """Download album art through the shared HTTP session, returns (data, declared mime_type)"""
+        # La sesión compartida prueba certifi / SSL por defecto / sin verificación
+        # y recuerda por host la estrategia que funcionó
         try:
-            # Download to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                with urllib.request.urlopen(request, context=ssl_context, timeout=20) as response:
-                    # Verify content type
-                    content_type = response.headers.get('Content-Type', '')
-                    if not content_type.startswith('image/'):
-                        raise Exception(f"Invalid content type: {content_type}")
-                    
-                    # Read and write data
-                    data = response.read()
-                    if len(data) < 1000:  # Too small to be a valid image
-                        raise Exception(f"Downloaded data too small: {len(data)} bytes")
-                    
-                    temp_file.write(data)
-                temp_path = temp_file.name
-            
-            # Verify we can read the image back
-            with open(temp_path, 'rb') as img_file:
-                album_art_data = img_file.read()
-            
-            # Clean up temp file
-            os.unlink(temp_path)
-            
-            # Determine MIME type from URL or content
-            mime_type = "image/jpeg"  # Default
-            if album_art_url.lower().endswith('.png'):
-                mime_type = "image/png"
-            elif album_art_url.lower().endswith('.webp'):
-                mime_type = "image/webp"
-            
-            # Check file extension to determine format
-            if file_path.lower().endswith('.m4a'):
-                # Handle m4a
-                audio = MP4(file_path)
-                # Remove previous covers to avoid duplicates
-                audio.pop('covr', None)
-                audio['covr'] = [MP4Cover(album_art_data, imageformat=MP4Cover.FORMAT_JPEG if mime_type == "image/jpeg" else MP4Cover.FORMAT_PNG)]
-                audio.save()
-            else:
-                # Handle MP3
-                audio = ID3(file_path)
-                audio.delall("APIC")
-                audio.add(APIC(
-                    encoding=0,  # Latin1 para max compatibilidad
-                    mime=mime_type,
-                    type=3,  # Cover (front)
-                    desc="Cover",
-                    data=album_art_data
-                ))
-                audio.save(v2_version=3)  # ID3v2.3 para compatibilidad
-            
-            logger.debug(f"Album art set successfully: {len(album_art_data)} bytes, {mime_type}, file: {file_path}")
-            
-        except urllib.error.HTTPError as e:
-            raise Exception(f"HTTP error {e.code}: {e.reason}")
-        except urllib.error.URLError as e:
-            raise Exception(f"URL error: {e.reason}")
+            response = http_session.get(album_art_url, headers=COVER_HEADERS, timeout=20)
         except ssl.SSLError as e:
             raise Exception(f"SSL error: {e}")
-        except Exception as e:
-            raise Exception(f"Download error: {e}")
+        except OSError as e:
+            raise Exception(f"URL error: {e}")
+        
+        if response.status != 200:
+            raise Exception(f"HTTP error {response.status}: {response.reason}")
+        
+        # Verify content type
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('image/'):
+            raise Exception(f"Invalid content type: {content_type}")
+        
+        album_art_data = response.content
+        if len(album_art_data) < 1000:  # Too small to be a valid image
+            raise Exception(f"Downloaded data too small: {len(album_art_data)} bytes")
+        
+        # El formato real se detecta después por magic bytes (process_cover)
+        return album_art_data, content_type.split(';')[0].strip()
     
     @staticmethod
     def verify_metadata_capabilities():
@@ -0,0 +1,81 @@
+"""Download plans - YouTube matches resolved ahead of time for a later execute step"""
+import json
+import os
+
+from ..utils import youtube_video_id
+from .track_info import TrackInfo, YouTubeEntry
+
+PLAN_VERSION = 1
+
+
+def track_record(source_index, i, item, match=None, error=None):
+    """Registro JSON de un track del plan.
+
+    ``item`` es el ``TrackInfo`` (Spotify) o el ``YouTubeEntry`` enumerado y
+    ``match`` el ``SearchMatch`` elegido para los tracks de Spotify.
+    """
+    record = {"source": source_index, "track": i}
+    if isinstance(item, YouTubeEntry):
+        track = item.track
+        record.update(
+            url=item.url, video_id=youtube_video_id(item.url), video_title=item.title,
+            playlist_title=item.playlist_title, track_number=item.track_number,
+            duration=track.duration if track else 0,
+        )
+    else:
+        track = item
+        record.update(url=None, video_id=None, video_title="", track_number=track.track_number, duration=track.duration)
+    if match:
+        record.update(
+            url=match.url, video_id=youtube_video_id(match.url), video_title=match.title,
+            query=match.query, score=match.score, fallback=match.fallback,
+            duration=match.duration or record["duration"], filesize=match.filesize,
+            candidates=list(match.candidates),
+        )
+    record["metadata"] = track.to_dict() if track else None
+    record["error"] = str(error) if error else None
+    return record
+
+
+def plan_entry(record):
+    """``YouTubeEntry`` listo para descargar de un registro del plan (``None`` si no se resolvió)"""
+    if not record.get("url"):
+        return None
+    metadata = record.get("metadata")
+    return YouTubeEntry(
+        record["url"],
+        title=record.get("video_title") or "",
+        playlist_title=record.get("playlist_title") or "",
+        track_number=record.get("track_number") or 1,
+        track=TrackInfo.from_dict(metadata) if metadata else None,
+    )
+
+
+def plan_summary(tracks):
+    """Totales del plan: tracks, resueltos, fallbacks, duración y tamaño esperados"""
+    resolved = [record for record in tracks if record.get("url")]
+    return {
+        "tracks": len(tracks),
+        "resolved": len(resolved),
+        "unresolved": len(tracks) - len(resolved),
+        "fallback": sum(1 for record in resolved if record.get("fallback")),
+        "duration_s": sum(record.get("duration") or 0 for record in resolved),
+        "filesize_bytes": sum(record.get("filesize") or 0 for record in resolved),
+    }
+
+
+def save_plan(path, plan):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+
+
+def load_plan(path):
+    """Leer un plan guardado por ``save_plan``; ``ValueError`` si no es de esta versión"""
+    with open(path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"Plan no compatible (se esperaba la versión {PLAN_VERSION}): {path}")
+    return plan
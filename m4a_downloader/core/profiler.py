@@ -0,0 +1,210 @@
+"""Thread-aware sampling profiler for download jobs"""
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.01
+DEFAULT_TOP = 30
+# Marcos donde un hilo solo espera trabajo (pools ociosos): esas muestras no cuentan
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),  # concurrent.futures esperando en su cola
+}
+
+
+def default_profile_path(directory='.'):
+    return os.path.join(directory, time.strftime('morphy-profile-%Y%m%d-%H%M%S.prof'))
+
+
+def _func_label(key):
+    filename, line, name = key
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class SamplingProfiler:
+    """Profiler por muestreo de todos los hilos de un trabajo.
+
+    Un hilo propio toma cada ``interval`` segundos las pilas de Python del hilo
+    que lo arranca y de todos los hilos creados después (workers de los
+    ``ThreadPoolExecutor``, enumeración, letras...). A diferencia de cProfile,
+    que solo mide el hilo donde se activa, ve a todos los hilos a la vez y
+    apenas añade overhead. Donde el sistema expone el reloj de CPU por hilo
+    (Linux), cada muestra se clasifica además como "en CPU" o "esperando" (red,
+    disco o el GIL), para separar el trabajo real de las esperas.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.cpu_clocks = hasattr(time, 'pthread_getcpuclockid')
+        self.samples = 0
+        self.wall_self = Counter()
+        self.wall_total = Counter()
+        self.cpu_self = Counter()
+        self.cpu_total = Counter()
+        self.callers = Counter()
+        self.thread_samples = Counter()
+        self.thread_cpu = Counter()
+        self.duration = 0.0
+        self._excluded = set()
+        self._cpu_time = {}
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = 0.0
+
+    def start(self):
+        # Hilos previos (p. ej. el event loop de Qt) quedan fuera; el que llama, dentro
+        self._excluded = {thread.ident for thread in threading.enumerate()} - {threading.get_ident()}
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        self.duration = time.perf_counter() - self._started
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            alive = set()
+            # Solo hilos vivos de ``threading``: el ident de uno terminado no sirve para su reloj de CPU
+            for thread in threading.enumerate():
+                if thread.ident == own or thread.ident in self._excluded or not thread.is_alive():
+                    continue
+                frame = frames.get(thread.ident)
+                if frame is not None:
+                    alive.add(thread.native_id)
+                    self._sample(thread, frame)
+            # Los hilos que terminaron no vuelven: su último tiempo de CPU sobra
+            for native_id in self._cpu_time.keys() - alive:
+                del self._cpu_time[native_id]
+
+    def _on_cpu(self, thread):
+        """``True`` si el hilo consumió CPU desde la muestra anterior (``None`` si no se sabe)"""
+        if not self.cpu_clocks or not thread.is_alive():
+            return None
+        try:
+            cpu_time = time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+        except (OSError, OverflowError):
+            return None
+        previous = self._cpu_time.get(thread.native_id)
+        self._cpu_time[thread.native_id] = cpu_time
+        return previous is not None and cpu_time > previous
+
+    def _sample(self, thread, frame):
+        thread_name = thread.name
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        top = stack[0]
+        if (os.path.basename(top[0]), top[2]) in IDLE_FRAMES:
+            return
+        on_cpu = self._on_cpu(thread)
+        self.samples += 1
+        self.thread_samples[thread_name] += 1
+        self.wall_self[top] += 1
+        for key in set(stack):
+            self.wall_total[key] += 1
+        for callee, caller in zip(stack, stack[1:]):
+            self.callers[(caller, callee)] += 1
+        if on_cpu:
+            self.thread_cpu[thread_name] += 1
+            self.cpu_self[top] += 1
+            for key in set(stack):
+                self.cpu_total[key] += 1
+
+    def write_stats(self, path):
+        """Guardar las muestras en formato ``pstats`` (``python -m pstats``, snakeviz...).
+
+        ``ncalls`` es el número de muestras y los tiempos son segundos de reloj.
+        """
+        stats = {}
+        callers = {}
+        for (caller, callee), count in self.callers.items():
+            seconds = count * self.interval
+            callers.setdefault(callee, {})[caller] = (count, count, seconds, seconds)
+        for key, count in self.wall_total.items():
+            stats[key] = (
+                count, count,
+                self.wall_self[key] * self.interval,
+                count * self.interval,
+                callers.get(key, {}),
+            )
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
+
+    def _top_lines(self, self_counts, total_counts, samples, top):
+        lines = [f"  {'self%':>6} {'total%':>7} {'self s':>8} {'total s':>8}  función"]
+        for key, count in self_counts.most_common(top):
+            lines.append(
+                f"  {100 * count / samples:>5.1f}% {100 * total_counts[key] / samples:>6.1f}% "
+                f"{count * self.interval:>8.2f} {total_counts[key] * self.interval:>8.2f}  {_func_label(key)}"
+            )
+        return lines
+
+    def format_report(self, top=DEFAULT_TOP):
+        """Informe de texto: muestras por hilo y top-N de funciones (CPU y reloj)"""
+        lines = [
+            f"Perfil por muestreo: {self.samples} muestras cada {self.interval * 1000:.0f} ms "
+            f"durante {self.duration:.1f} s",
+            "",
+            "Hilos (muestras ocupadas / en CPU):",
+        ]
+        for name, count in self.thread_samples.most_common():
+            cpu = f"{self.thread_cpu[name]:>7}" if self.cpu_clocks else f"{'-':>7}"
+            lines.append(f"  {name:<32} {count:>7} {cpu}")
+        if not self.samples:
+            return "\n".join(lines)
+        cpu_samples = sum(self.thread_cpu.values())
+        if cpu_samples:
+            lines += ["", f"Top {top} funciones por tiempo de CPU propio:"]
+            lines += self._top_lines(self.cpu_self, self.cpu_total, cpu_samples, top)
+        lines += ["", f"Top {top} funciones por tiempo de reloj propio (incluye esperas de red y disco):"]
+        lines += self._top_lines(self.wall_self, self.wall_total, self.samples, top)
+        return "\n".join(lines)
+
+    def save(self, path, top=DEFAULT_TOP):
+        """Escribir ``path`` (pstats) y ``path`` + ``.txt`` (informe); devuelve ambas rutas"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.write_stats(path)
+        report_path = f"{os.path.splitext(path)[0]}.txt"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(self.format_report(top) + "\n")
+        return path, report_path
+
+
+def run_profiled(fn, path=None, top=DEFAULT_TOP, log=None, echo=False):
+    """Ejecutar ``fn()`` bajo el profiler y guardar el perfil aunque falle.
+
+    Con ``echo`` el informe top-N también se envía a ``log``.
+    """
+    path = path or default_profile_path()
+    profiler = SamplingProfiler()
+    try:
+        with profiler:
+            return fn()
+    finally:
+        stats_path, report_path = profiler.save(path, top)
+        if log and echo:
+            log(profiler.format_report(top), "info")
+        if log:
+            log(f"🔬 Perfil guardado en {stats_path} (informe: {report_path})", "info")
@@ -0,0 +1,53 @@
+"""Library retag helpers - map existing files back to their source and rewrite their tags"""
+import logging
+import os
+
+from .metadata import MetadataSetter
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.m4a', '.mp3')
+SPOTIFY_PREFIX = 'spotify:track:'
+YOUTUBE_PREFIX = 'youtube:'
+
+
+def find_audio_files(folder):
+    """Recorrer ``folder`` devolviendo los archivos M4A/MP3 (se ignoran las carpetas ``tmp``)"""
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != 'tmp')
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def parse_source_id(source_id):
+    """Devolver ``('spotify', id)``, ``('youtube', id)`` o ``(None, None)``"""
+    if source_id.startswith(SPOTIFY_PREFIX):
+        return 'spotify', source_id[len(SPOTIFY_PREFIX):]
+    if source_id.startswith(YOUTUBE_PREFIX):
+        return 'youtube', source_id[len(YOUTUBE_PREFIX):]
+    return None, None
+
+
+# Las dos funciones siguientes se ejecutan en procesos del pool: deben ser
+# de módulo (picklables) y no lanzar, para no cortar el ``map`` del lote
+
+def read_source(file_path):
+    """Leer los tags de un archivo; devuelve ``(file_path, tags, error)``"""
+    try:
+        return file_path, MetadataSetter.read_tags(file_path), None
+    except Exception as e:
+        return file_path, {}, str(e)
+
+
+def retag_file(file_path, track_info, settings):
+    """Reaplicar la metadata de ``track_info``; devuelve ``(file_path, error)``.
+
+    Portadas y letras salen de las cachés en disco compartidas entre procesos,
+    así que el retag no vuelve a transferir audio ni, normalmente, imágenes.
+    """
+    try:
+        MetadataSetter.set_metadata(track_info, file_path, settings)
+        return file_path, None
+    except Exception as e:
+        return file_path, str(e)
@@ -0,0 +1,112 @@
+"""Work scheduling within a job - expected track costs and ordering policies"""
+import json
+import logging
+import os
+
+from ..config import Config
+from .track_info import YouTubeEntry
+
+logger = logging.getLogger(__name__)
+
+# longest: más costosos primero (LPT), acerca el tiempo total a la cota ideal
+# cached: más baratos primero (búsqueda en caché, archivo ya existente), progreso rápido al inicio
+# priority: en el orden de las URLs del lote, una fuente tras otra
+# fifo: en el orden de llegada de la enumeración
+SCHEDULE_POLICIES = ('longest', 'cached', 'priority', 'fifo')
+DEFAULT_POLICY = 'longest'
+
+# Costes iniciales sin historial: segundos por track o, con ``_per_s``, por segundo de audio
+DEFAULT_COSTS = {
+    'search': 2.5,
+    'metadata': 1.5,
+    'transfer_per_s': 0.02,
+    'ffmpeg_per_s': 0.01,
+    'lyrics': 0.5,
+    'cover': 0.3,
+    'tag': 0.1,
+}
+# Duración supuesta (s) de un track cuya duración no se conoce aún
+DEFAULT_DURATION = 210
+# Peso del último trabajo en la media móvil de los costes históricos
+HISTORY_WEIGHT = 0.3
+
+
+def default_history_path():
+    return Config.get_cache_dir('stage-history.json')
+
+
+def item_duration(item):
+    """Duración conocida (s) de un ``TrackInfo`` o ``YouTubeEntry``; 0 si aún no se sabe"""
+    track = item.track if isinstance(item, YouTubeEntry) else item
+    return (track.duration if track else 0) or getattr(item, 'duration', 0)
+
+
+def ideal_seconds(total_seconds, longest_seconds, workers):
+    """Cota inferior del tiempo de descarga: reparto perfecto del trabajo o el track más largo"""
+    return max(total_seconds / workers, longest_seconds)
+
+
+class CostModel:
+    """Coste esperado (s) de un track según su duración y los tiempos por etapa de trabajos anteriores.
+
+    Transferencia y FFmpeg escalan con la duración del audio; búsqueda,
+    metadata, letras, portada y tags cuestan lo mismo por track. El orden que
+    deciden estos costes solo aplica entre los tracks que ya llegaron y
+    esperan worker (como mucho ``SUBMISSION_WINDOW`` de ``cli``), no sobre
+    toda la fuente: la enumeración no se adelanta más que esa ventana.
+    """
+
+    def __init__(self, costs=None):
+        self.costs = dict(DEFAULT_COSTS)
+        self.costs.update(costs or {})
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or default_history_path()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(json.load(f).get('costs'))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, AttributeError) as e:
+            logger.debug(f"Ignoring stage history {path}: {e}")
+            return cls()
+
+    def save(self, path=None):
+        path = path or default_history_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'costs': self.costs}, f, indent=2)
+        except OSError as e:
+            logger.debug(f"Could not save stage history {path}: {e}")
+
+    def estimate(self, item, search=True):
+        """Segundos esperados para descargar ``item`` (``TrackInfo`` o ``YouTubeEntry``)"""
+        costs = self.costs
+        duration = item_duration(item) or DEFAULT_DURATION
+        cost = duration * (costs['transfer_per_s'] + costs['ffmpeg_per_s'])
+        cost += costs['lyrics'] + costs['cover'] + costs['tag']
+        if search:
+            cost += costs['search']
+        if isinstance(item, YouTubeEntry) and item.track is None:
+            cost += costs['metadata']
+        return cost
+
+    def update(self, summary, audio_seconds):
+        """Mezclar en los costes el ``StageTimings.summary()`` de un trabajo terminado.
+
+        ``audio_seconds`` es, por etapa (``transfer``, ``ffmpeg``), la duración
+        del audio de todos los intentos medidos en ella, también los que
+        fallaron: así su tiempo total se convierte en segundos por segundo de
+        audio sin inflarse con los fallos.
+        """
+        observed = {}
+        for stage in ('search', 'metadata', 'lyrics', 'cover', 'tag'):
+            if stage in summary:
+                observed[stage] = summary[stage]['mean_s']
+        for stage in ('transfer', 'ffmpeg'):
+            if stage in summary and audio_seconds.get(stage):
+                observed[f'{stage}_per_s'] = summary[stage]['total_s'] / audio_seconds[stage]
+        for key, value in observed.items():
+            self.costs[key] = (1 - HISTORY_WEIGHT) * self.costs[key] + HISTORY_WEIGHT * value
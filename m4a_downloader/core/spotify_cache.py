@@ -0,0 +1,151 @@
+"""On-disk cache of Spotify Web API responses with per-type TTLs and validators"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+# Se incrementa si cambia el formato de los datos guardados (invalida todo)
+CACHE_VERSION = 1
+# Vigencia por tipo de objeto. Tracks y álbumes casi nunca cambian; las
+# playlists no caducan por tiempo: se revalidan siempre por snapshot_id/ETag
+TTLS = {
+    "track": 30 * 24 * 3600,
+    "album": 30 * 24 * 3600,
+    "playlist": 0,
+}
+
+
+class SpotifyResponseCache:
+    """Cache en disco de respuestas de Spotify por tipo de objeto e id.
+
+    Cada entrada guarda los datos ya convertidos, la fecha de descarga y los
+    validadores (``etag``, ``snapshot_id``) para revalidarla con una petición
+    condicional barata en lugar de volver a descargarla.
+
+    Las listas de tracks de playlists y álbumes se guardan por trozos (uno por
+    página) con :meth:`chunk_writer` y se leen con :meth:`iter_chunks`, así ni
+    la escritura ni la lectura tienen la lista completa en memoria.
+    """
+
+    def __init__(self, cache_dir=None, ttls=None):
+        self.cache_dir = cache_dir or Config.get_cache_dir('spotify')
+        self.ttls = dict(TTLS, **(ttls or {}))
+
+    def _path_for(self, kind, object_id):
+        digest = hashlib.sha1(f"{kind}:{object_id}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, kind, digest[:2], f"{digest}.json")
+
+    def _chunk_path(self, kind, object_id, generation, index):
+        return self._path_for(f"{kind}-chunks", f"{object_id}:{generation}:{index}")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, payload):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.debug(f"Failed to store Spotify response in cache: {e}")
+
+    def get(self, kind, object_id):
+        """Devolver la entrada (dict con ``data``, ``etag``, ``fresh``...) o ``None``"""
+        entry = self._read(self._path_for(kind, object_id))
+        if not entry or entry.get("version") != CACHE_VERSION:
+            return None
+        data = entry.get("data")
+        if isinstance(data, dict) and "generation" in data and not all(
+            os.path.exists(self._chunk_path(kind, object_id, data["generation"], index))
+            for index in range(data["chunks"])
+        ):
+            # Falta algún trozo (borrado a mano, disco lleno...): como si no hubiera entrada
+            return None
+        entry["fresh"] = time.time() - entry.get("stored_at", 0) < self.ttls.get(kind, 0)
+        return entry
+
+    def put(self, kind, object_id, data, etag=None, **validators):
+        entry = {
+            "version": CACHE_VERSION,
+            "stored_at": time.time(),
+            "etag": etag,
+            "data": data,
+        }
+        entry.update(validators)
+        self._write(self._path_for(kind, object_id), entry)
+
+    def chunk_writer(self, kind, object_id):
+        return ChunkWriter(self, kind, object_id)
+
+    def iter_chunks(self, kind, object_id, data):
+        """Elementos de una entrada guardada por trozos, leyendo un trozo cada vez"""
+        for index in range(data["chunks"]):
+            items = self._read(self._chunk_path(kind, object_id, data["generation"], index))
+            if items is None:
+                raise ValueError(f"Spotify cache chunk {index} of {kind} {object_id} is missing")
+            yield from items
+
+    def delete_chunks(self, kind, object_id, generation, chunks):
+        for index in range(chunks):
+            try:
+                os.remove(self._chunk_path(kind, object_id, generation, index))
+            except OSError:
+                pass
+
+    def touch(self, kind, object_id, entry):
+        """Renovar la vigencia de una entrada revalidada (304 / mismo snapshot)"""
+        validators = {k: v for k, v in entry.items() if k not in ("version", "stored_at", "etag", "data", "fresh")}
+        self.put(kind, object_id, entry["data"], etag=entry.get("etag"), **validators)
+
+
+class ChunkWriter:
+    """Escritura por trozos de la lista de tracks de una entrada.
+
+    Cada ``add`` escribe un trozo en su propio archivo; ``commit`` escribe la
+    entrada (con ``generation`` y el número de trozos en ``data``) y borra los
+    trozos de la versión anterior. Sin ``commit`` la entrada no cambia: un
+    ``discard`` borra los trozos ya escritos.
+    """
+
+    def __init__(self, cache, kind, object_id):
+        self.cache = cache
+        self.kind = kind
+        self.object_id = object_id
+        self.generation = uuid.uuid4().hex[:12]
+        self.chunks = 0
+        self.count = 0
+
+    def add(self, items):
+        self.cache._write(self.cache._chunk_path(self.kind, self.object_id, self.generation, self.chunks), items)
+        self.chunks += 1
+        self.count += len(items)
+
+    def commit(self, data, etag=None, **validators):
+        previous = self.cache._read(self.cache._path_for(self.kind, self.object_id))
+        data = dict(data, generation=self.generation, chunks=self.chunks, count=self.count)
+        self.cache.put(self.kind, self.object_id, data, etag=etag, **validators)
+        old = (previous or {}).get("data")
+        if isinstance(old, dict) and old.get("generation") not in (None, self.generation):
+            self.cache.delete_chunks(self.kind, self.object_id, old["generation"], old.get("chunks", 0))
+
+    def discard(self):
+        self.cache.delete_chunks(self.kind, self.object_id, self.generation, self.chunks)
+
+
+# Instancia global compartida por todos los SpotifyClient
+spotify_cache = SpotifyResponseCache()
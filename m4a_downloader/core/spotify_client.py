@@ -1,17 +1,116 @@
 """Spotify API interaction module - Optimized version"""
+import hashlib
+import json
 import os
+import re
+import threading
+import requests
 import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from typing import Dict, List, Tuple
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyClientCredentials, SpotifyOauthError
+from typing import Dict, Iterator, List, Tuple
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+from ..config import Config
+from .http_client import verified_session
+from .spotify_cache import spotify_cache
+from .spotify_transport import call_with_retry, spotify_budget
+from .track_info import TrackInfo
 
 logger = logging.getLogger(__name__)
 
+API_URL = "https://api.spotify.com/v1"
+# Máximo de ids por llamada a /v1/tracks
+TRACKS_BATCH_SIZE = 50
+ALBUM_PAGE_SIZE = 50
+# Páginas de playlist/álbum pedidas en paralelo
+PAGE_WORKERS = 4
+
+
+def _spotify_id(kind: str, url: str) -> str:
+    """Extraer el id de una URL/URI de Spotify (``open.spotify.com/track/<id>``, ``spotify:track:<id>``)"""
+    match = re.search(rf'{kind}[:/]([A-Za-z0-9]+)', url)
+    return match.group(1) if match else url.strip()
+
+class _TokenCache(CacheHandler):
+    """Token de client-credentials en memoria, persistido en disco hasta que caduca.
+
+    Spotipy lee el ``cache_handler`` en cada petición: la copia en memoria evita
+    abrir el archivo cada vez y el archivo permite reutilizar el token entre
+    ejecuciones sin repetir el intercambio de credenciales.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self._token_info = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get_cached_token(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    with open(self.cache_path, 'r', encoding='utf-8') as f:
+                        self._token_info = json.load(f)
+                except (OSError, ValueError):
+                    self._token_info = None
+            return self._token_info
+
+    def save_token_to_cache(self, token_info):
+        with self._lock:
+            self._token_info = token_info
+            self._loaded = True
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            # Solo legible por el usuario: contiene un token de acceso válido
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(token_info, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.debug(f"Failed to persist Spotify token: {e}")
+
+
+_auth_managers = {}
+_auth_lock = threading.Lock()
+
+
+def get_auth_manager(client_id: str, client_secret: str) -> SpotifyClientCredentials:
+    """Gestor de credenciales compartido por todos los clientes del proceso con las mismas credenciales"""
+    key = (client_id, client_secret)
+    with _auth_lock:
+        manager = _auth_managers.get(key)
+        if manager is None:
+            digest = hashlib.sha1(client_id.encode('utf-8')).hexdigest()[:16]
+            manager = _auth_managers[key] = SpotifyClientCredentials(
+                client_id=client_id,
+                client_secret=client_secret,
+                cache_handler=_TokenCache(Config.get_cache_dir('spotify', f'token-{digest}.json')),
+            )
+        return manager
+
+
 class SpotifyClient:
-    def __init__(self):
-        """Inicialización optimizada - Conexión inmediata y rápida"""
-        self.client_id = os.getenv("SPOTIPY_CLIENT_ID")
-        self.client_secret = os.getenv("SPOTIPY_CLIENT_SECRET")
+    def __init__(self, client_id=None, client_secret=None, cache=None, page_workers=PAGE_WORKERS, budget=None):
+        """Crear el cliente sin tocar la red.
+
+        El token se obtiene (o se lee de disco) en la primera petición y se
+        comparte entre todos los clientes del proceso; las credenciales solo
+        se comprueban contra Spotify al llamar a :meth:`validate_credentials`.
+        ``page_workers`` acota las páginas de playlists/álbumes pedidas a la vez
+        (``1`` = paginación secuencial); ``budget`` es el presupuesto de peticiones
+        (por defecto el global del proceso).
+        """
+        self.cache = cache or spotify_cache
+        self.budget = budget or spotify_budget
+        self.page_workers = max(1, page_workers)
+        self.client_id = client_id or os.getenv("SPOTIPY_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("SPOTIPY_CLIENT_SECRET")
         
         if not self.client_id or not self.client_secret:
             raise EnvironmentError(
@@ -19,47 +118,43 @@ class SpotifyClient:
                 "Set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET environment variables."
             )
         
-        # Crear conexión inmediatamente con configuración optimizada
-        try:
-            client_credentials_manager = SpotifyClientCredentials(
-                client_id=self.client_id, 
-                client_secret=self.client_secret
-            )
-            
-            self.sp = spotipy.Spotify(
-                client_credentials_manager=client_credentials_manager,
+        self._sp = None
+
+    @property
+    def auth_manager(self) -> SpotifyClientCredentials:
+        return get_auth_manager(self.client_id, self.client_secret)
+
+    @property
+    def sp(self) -> spotipy.Spotify:
+        if self._sp is None:
+            self._sp = spotipy.Spotify(
+                client_credentials_manager=self.auth_manager,
+                # Sesión propia sin Retry de urllib3: con la de spotipy un 429 o 5xx llega como
+                # SpotifyException(429, "Max Retries") sin cabeceras, y call_with_retry necesita
+                # el estado real y su Retry-After
+                requests_session=requests.Session(),
                 requests_timeout=5,    # Timeout muy corto
-                retries=0,            # Sin reintentos para conexión rápida
             )
-            
-            # Test inmediato de conexión
-            self.sp.search(q="test", type="track", limit=1)
-            logger.debug("✅ Conexión con Spotify establecida")
-            
+        return self._sp
+
+    def validate_credentials(self) -> bool:
+        """Comprobar las credenciales con un intercambio de token real (sin usar la caché)"""
+        try:
+            self.auth_manager.get_access_token(as_dict=False, check_cache=False)
+        except SpotifyOauthError as e:
+            logger.debug(f"Spotify credentials rejected: {e}")
+            raise ValueError("Credenciales de Spotify inválidas")
         except Exception as e:
             logger.error(f"Error conectando con Spotify: {e}")
             raise Exception(f"No se pudo conectar con Spotify API: {e}")
+        logger.debug("✅ Credenciales de Spotify válidas")
+        return True
 
-    def get_track_info(self, track_url: str) -> Dict[str, str]:
+    def get_track_info(self, track_url: str) -> TrackInfo:
         """Get track information from Spotify - Optimizado"""
         try:
-            track = self.sp.track(track_url)
-            
-            # Acceso optimizado a album art
-            album_art = ""
-            if track["album"]["images"]:
-                album_art = track["album"]["images"][0]["url"]  # Usar primera imagen disponible
-            
-            return {
-                "artist_name": track["artists"][0]["name"],
-                "track_title": track["name"],
-                "track_number": track["track_number"],
-                "isrc": track["external_ids"].get("isrc", ""),
-                "album_art": album_art,
-                "album_name": track["album"]["name"],
-                "release_date": track["album"]["release_date"],
-                "artists": [artist["name"] for artist in track["artists"]],
-            }
+            data = self._cached_get("track", _spotify_id("track", track_url), lambda track: self._track_to_info(track).to_dict())
+            return TrackInfo.from_dict(data)
             
         except spotipy.exceptions.SpotifyException as e:
             if e.http_status == 404:
@@ -69,118 +164,351 @@ class SpotifyClient:
             else:
                 raise ValueError(f"Error de Spotify API: {e}")
 
-    def get_playlist_tracks(self, playlist_url: str) -> Tuple[str, List[Dict]]:
-        """Get all tracks from a Spotify playlist - Ultra optimizado"""
+    def _api_get(self, path: str, params: Dict = None, etag: str = None):
+        """GET condicional a la Web API; devuelve ``(json, etag)`` o ``(None, etag)`` si es 304"""
+        return call_with_retry(self._api_get_once, path, params, etag, budget=self.budget)
+
+    def _api_get_once(self, path: str, params: Dict = None, etag: str = None):
+        headers = {
+            'Authorization': f"Bearer {self.auth_manager.get_access_token(as_dict=False)}",
+            'Accept': 'application/json',
+        }
+        if etag:
+            headers['If-None-Match'] = etag
+        # Nunca por la estrategia 'insecure': si el certificado no se verifica, la llamada falla
+        response = verified_session.get(f"{API_URL}/{path}", params=params, headers=headers, timeout=5)
+        if response.status == 304:
+            return None, etag
+        if response.status != 200:
+            try:
+                message = response.json()["error"]["message"]
+            except Exception:
+                message = response.reason
+            raise spotipy.exceptions.SpotifyException(
+                response.status, -1, f"{response.url}:\n {message}", headers=dict(response.headers)
+            )
+        return response.json(), response.headers.get('ETag')
+
+    def _cached_get(self, kind: str, object_id: str, convert):
+        """Leer ``/<kind>s/<id>`` a través de la caché en disco.
+
+        Una entrada vigente no hace ninguna petición; una caducada se revalida
+        con ``If-None-Match`` y solo se descarga y convierte de nuevo si cambió.
+        """
+        entry = self.cache.get(kind, object_id)
+        if entry and entry["fresh"]:
+            return entry["data"]
+        
+        data, etag = self._api_get(f"{kind}s/{object_id}", etag=entry.get("etag") if entry else None)
+        if data is None:
+            logger.debug(f"Spotify {kind} {object_id} not modified")
+            self.cache.touch(kind, object_id, entry)
+            return entry["data"]
+        
+        converted = convert(data)
+        self.cache.put(kind, object_id, converted, etag=etag)
+        return converted
+
+    def _iter_pages(self, fetch_page, offsets) -> Iterator:
+        """Producir las páginas ``offsets`` en orden, con hasta ``page_workers`` en vuelo.
+
+        Cada página se entrega en cuanto llega (y las anteriores ya se entregaron),
+        así que el consumidor empieza tras la primera petición. Con
+        ``page_workers=1``, o si el modo concurrente falla, el resto se pide en secuencia.
+        """
+        offsets = list(offsets)
+        if self.page_workers <= 1 or len(offsets) <= 1:
+            for offset in offsets:
+                yield fetch_page(offset)
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.page_workers, len(offsets)), thread_name_prefix='spotify-page')
+        pending = deque()
+        try:
+            for offset in offsets[:self.page_workers]:
+                pending.append(executor.submit(fetch_page, offset))
+            next_index = len(pending)
+            for index in range(len(offsets)):
+                try:
+                    page = pending.popleft().result()
+                except spotipy.exceptions.SpotifyException as e:
+                    if e.http_status in (401, 404):
+                        raise
+                    logger.warning(f"Concurrent page fetch failed ({e}), retrying sequentially")
+                    for offset in offsets[index:]:
+                        yield fetch_page(offset)
+                    return
+                if next_index < len(offsets):
+                    pending.append(executor.submit(fetch_page, offsets[next_index]))
+                    next_index += 1
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _track_to_info(track: Dict) -> TrackInfo:
+        """Convertir un objeto track completo de la API al :class:`TrackInfo` del pipeline"""
+        # Acceso optimizado a album art
+        album_art = ""
+        if track["album"]["images"]:
+            album_art = track["album"]["images"][0]["url"]  # Usar primera imagen disponible
+        
+        return TrackInfo(
+            artist_name=track["artists"][0]["name"],
+            track_title=track["name"],
+            track_number=track["track_number"],
+            isrc=track["external_ids"].get("isrc", ""),
+            album_art=album_art,
+            album_name=track["album"]["name"],
+            release_date=track["album"]["release_date"],
+            artists=tuple(artist["name"] for artist in track["artists"]),
+            duration=track.get("duration_ms", 0) // 1000,
+            source_id=f"spotify:track:{track['id']}" if track.get("id") else "",
+        )
+
+    def _cached_tracks(self, kind: str, object_id: str, entry: Dict) -> Tuple[str, int, Iterator[TrackInfo]]:
+        """Tracks de una entrada de playlist/álbum en caché, leídos trozo a trozo"""
+        data = entry["data"]
+        if "tracks" in data:
+            # Entradas anteriores a la caché por trozos
+            tracks = data["tracks"]
+            return data["name"], len(tracks), (TrackInfo.from_dict(track) for track in tracks)
+        tracks = self.cache.iter_chunks(kind, object_id, data)
+        return data["name"], data["count"], (TrackInfo.from_dict(track) for track in tracks)
+
+    def get_tracks_info(self, track_ids: List[str]) -> Dict[str, TrackInfo]:
+        """Get several tracks by id in batches of 50 (one API call per batch)"""
+        track_infos = {}
+        unique_ids = list(dict.fromkeys(track_ids))
+        
+        # Solo se piden a la API los tracks que no estén vigentes en caché
+        missing = []
+        for track_id in unique_ids:
+            entry = self.cache.get("track", track_id)
+            if entry and entry["fresh"]:
+                track_infos[track_id] = TrackInfo.from_dict(entry["data"])
+            else:
+                missing.append(track_id)
+        
+        # Los lotes se piden en paralelo con el mismo fan-out que la paginación
+        def fetch_batch(start):
+            batch = missing[start:start + TRACKS_BATCH_SIZE]
+            return call_with_retry(self.sp.tracks, batch, budget=self.budget).get("tracks") or []
+        
+        try:
+            batches = list(self._iter_pages(fetch_batch, range(0, len(missing), TRACKS_BATCH_SIZE)))
+        except spotipy.exceptions.SpotifyException as e:
+            if e.http_status == 401:
+                raise ValueError("Credenciales de Spotify inválidas")
+            raise ValueError(f"Error de Spotify API: {e}")
+        
+        for batch_tracks in batches:
+            for track in batch_tracks:
+                if not track:
+                    continue  # Id desconocido o retirado del catálogo
+                try:
+                    track_infos[track["id"]] = self._track_to_info(track)
+                    self.cache.put("track", track["id"], track_infos[track["id"]].to_dict())
+                except Exception as e:
+                    logger.warning(f"Error procesando track {track.get('name', 'Unknown')}: {e}")
+        
+        logger.debug(f"✅ {len(track_infos)}/{len(unique_ids)} tracks obtenidos por lotes")
+        return track_infos
+
+    @contextmanager
+    def _api_errors(self, not_found: str, what: str):
+        """Traducir errores de la API a ``ValueError`` con mensajes para el usuario"""
         try:
-            # Obtener info básica de playlist
-            pl = self.sp.playlist(playlist_url, fields="name,tracks.total")
+            yield
+        except spotipy.exceptions.SpotifyException as e:
+            if e.http_status == 404:
+                raise ValueError(not_found)
+            elif e.http_status == 401:
+                raise ValueError("Credenciales de Spotify inválidas")
+            else:
+                raise ValueError(f"Error de Spotify API: {e}")
+        except Exception as e:
+            logger.error(f"Error obteniendo {what}: {e}")
+            raise ValueError(f"Error obteniendo {what}: {e}")
+
+    def iter_playlist_tracks(self, playlist_url: str) -> Tuple[str, int, Iterator[TrackInfo]]:
+        """Devolver ``(nombre, total, tracks)`` donde ``tracks`` se produce página a página.
+
+        Solo la cabecera de la playlist se pide antes de volver: el primer track
+        está disponible tras una página y el resto se pide en paralelo mientras
+        el pipeline ya descarga.
+        """
+        with self._api_errors(f"Playlist no encontrada: {playlist_url}", "playlist"):
+            # Obtener info básica de playlist; snapshot_id cambia con cada edición
+            playlist_id = _spotify_id("playlist", playlist_url)
+            entry = self.cache.get("playlist", playlist_id)
+            pl, etag = self._api_get(
+                f"playlists/{playlist_id}",
+                params={"fields": "name,snapshot_id,tracks.total"},
+                etag=entry.get("etag") if entry else None,
+            )
+            if entry and (pl is None or pl.get("snapshot_id") == entry.get("snapshot_id")):
+                logger.debug(f"📋 Playlist {playlist_id} sin cambios, usando caché")
+                self.cache.touch("playlist", playlist_id, entry)
+                return self._cached_tracks("playlist", playlist_id, entry)
+            
             playlist_name = pl.get("name", "Unnamed Playlist")
             total_tracks = pl["tracks"]["total"]
             
-            logger.debug(f"📋 Playlist '{playlist_name}' tiene {total_tracks} tracks")
-            
-            # Obtener TODOS los tracks de una vez con campos mínimos necesarios
-            tracks = []
-            offset = 0
+        logger.debug(f"📋 Playlist '{playlist_name}' tiene {total_tracks} tracks")
+        tracks = self._stream_playlist(playlist_url, playlist_id, playlist_name, total_tracks, etag, pl.get("snapshot_id"))
+        return playlist_name, total_tracks, tracks
+
+    def _stream_playlist(self, playlist_url, playlist_id, playlist_name, total_tracks, etag, snapshot_id):
+        with self._api_errors(f"Playlist no encontrada: {playlist_url}", "playlist"):
             limit = 100  # Máximo permitido
             
-            while offset < total_tracks:
-                results = self.sp.playlist_tracks(
+            def fetch_page(offset):
+                results = call_with_retry(
+                    self.sp.playlist_tracks,
                     playlist_url, 
                     offset=offset, 
                     limit=limit,
-                    fields="items.track(name,artists,album(name,release_date,images),external_ids,track_number)"
+                    fields="items.track(id,name,artists,album(name,release_date,images),external_ids,track_number,duration_ms)",
+                    budget=self.budget,
                 )
-                
-                batch_tracks = [item["track"] for item in results["items"] if item["track"]]
-                tracks.extend(batch_tracks)
-                
-                if len(results["items"]) < limit:
-                    break
-                    
-                offset += limit
+                return [item["track"] for item in results["items"] if item["track"]]
             
-            # Convertir todo de una vez sin logs innecesarios
-            track_infos = []
-            for track in tracks:
-                try:
-                    album_art = ""
-                    if track["album"]["images"]:
-                        album_art = track["album"]["images"][0]["url"]
-                    
-                    track_info = {
-                        "artist_name": track["artists"][0]["name"],
-                        "track_title": track["name"],
-                        "track_number": track["track_number"],
-                        "isrc": track["external_ids"].get("isrc", ""),
-                        "album_art": album_art,
-                        "album_name": track["album"]["name"],
-                        "release_date": track["album"]["release_date"],
-                        "artists": [artist["name"] for artist in track["artists"]],
-                    }
-                    
-                    track_infos.append(track_info)
-                        
-                except Exception as e:
-                    logger.warning(f"Error procesando track {track.get('name', 'Unknown')}: {e}")
-                    continue
-            
-            logger.debug(f"✅ {len(track_infos)} tracks procesados")
-            return playlist_name, track_infos
+            # Cada página va a la caché al llegar; la entrada solo se publica al terminar
+            writer = self.cache.chunk_writer("playlist", playlist_id)
+            try:
+                for page in self._iter_pages(fetch_page, range(0, total_tracks, limit)):
+                    page_infos = []
+                    for track in page:
+                        try:
+                            page_infos.append(self._track_to_info(track))
+                        except Exception as e:
+                            logger.warning(f"Error procesando track {track.get('name', 'Unknown')}: {e}")
+                    writer.add([info.to_dict() for info in page_infos])
+                    yield from page_infos
+            except BaseException:
+                writer.discard()
+                raise
             
-        except spotipy.exceptions.SpotifyException as e:
-            if e.http_status == 404:
-                raise ValueError(f"Playlist no encontrada: {playlist_url}")
-            elif e.http_status == 401:
-                raise ValueError("Credenciales de Spotify inválidas")
-            else:
-                raise ValueError(f"Error de Spotify API: {e}")
-        except Exception as e:
-            logger.error(f"Error obteniendo playlist: {e}")
-            raise ValueError(f"Error obteniendo playlist: {e}")
+            # Solo una enumeración completa se guarda en caché
+            logger.debug(f"✅ {writer.count} tracks procesados")
+            writer.commit({"name": playlist_name}, etag=etag, snapshot_id=snapshot_id)
 
-    def get_album_tracks(self, album_url: str) -> Tuple[str, List[Dict]]:
-        """Get all tracks from a Spotify album"""
+    def get_playlist_tracks(self, playlist_url: str) -> Tuple[str, List[TrackInfo]]:
+        """Get all tracks from a Spotify playlist - Ultra optimizado"""
+        playlist_name, _, tracks = self.iter_playlist_tracks(playlist_url)
+        return playlist_name, list(tracks)
+
+    @staticmethod
+    def _album_track_to_info(track: Dict, album_name: str, album_art: str, release_date: str) -> TrackInfo:
+        """Convertir un track simplificado de álbum (sin ISRC ni datos del álbum)"""
+        return TrackInfo(
+            artist_name=track["artists"][0]["name"],
+            track_title=track["name"],
+            track_number=track["track_number"],
+            isrc="",  # Se completa en _enrich_tracks
+            album_art=album_art,
+            album_name=album_name,
+            release_date=release_date,
+            artists=tuple(artist["name"] for artist in track["artists"]),
+            duration=track.get("duration_ms", 0) // 1000,
+            source_id=f"spotify:track:{track['id']}" if track.get("id") else "",
+        )
+
+    def _enrich_tracks(self, track_infos: List[TrackInfo]) -> bool:
+        """Completar ISRC y duración de tracks simplificados con los objetos completos (lotes de 50).
+
+        Devuelve ``False`` si la petición falló y los tracks quedaron sin ISRC.
+        """
+        track_ids = [info.source_id[len("spotify:track:"):] for info in track_infos if info.source_id]
+        if not track_ids:
+            return True
         try:
-            album = self.sp.album(album_url)
+            full_infos = self.get_tracks_info(track_ids)
+        except Exception as e:
+            # El enriquecimiento es opcional: sin él solo falta el ISRC
+            logger.warning(f"No se pudo enriquecer los tracks del álbum: {e}")
+            return False
+        for info in track_infos:
+            full = full_infos.get(info.source_id[len("spotify:track:"):])
+            if full:
+                info.isrc = full.isrc
+                info.duration = full.duration or info.duration
+        return True
+
+    def iter_album_tracks(self, album_url: str) -> Tuple[str, int, Iterator[TrackInfo]]:
+        """Devolver ``(nombre, total, tracks)``; los tracks se producen página a página"""
+        with self._api_errors(f"Album no encontrado: {album_url}", "album"):
+            album_id = _spotify_id("album", album_url)
+            entry = self.cache.get("album", album_id)
+            if entry and entry["fresh"]:
+                return self._cached_tracks("album", album_id, entry)
+            
+            album, etag = self._api_get(f"albums/{album_id}", etag=entry.get("etag") if entry else None)
+            if album is None:
+                logger.debug(f"Spotify album {album_id} not modified")
+                self.cache.touch("album", album_id, entry)
+                return self._cached_tracks("album", album_id, entry)
+        
+        album_name = album.get("name", "Unnamed Album")
+        return album_name, album["tracks"]["total"], self._stream_album(album_url, album_id, album, etag)
+
+    def _stream_album(self, album_url, album_id, album, etag):
+        with self._api_errors(f"Album no encontrado: {album_url}", "album"):
             album_name = album.get("name", "Unnamed Album")
             album_art = album["images"][0]["url"] if album["images"] else ""
             release_date = album.get("release_date", "")
             
-            tracks = []
-            results = self.sp.album_tracks(album_url)
-            tracks_raw = results['items']
-            while results['next']:
-                results = self.sp.next(results)
-                tracks_raw.extend(results['items'])
-                
-            track_infos = []
-            for track in tracks_raw:
-                try:
-                    track_info = {
-                        "artist_name": track["artists"][0]["name"],
-                        "track_title": track["name"],
-                        "track_number": track["track_number"],
-                        "isrc": "", 
-                        "album_art": album_art,
-                        "album_name": album_name,
-                        "release_date": release_date,
-                        "artists": [artist["name"] for artist in track["artists"]],
-                    }
-                    track_infos.append(track_info)
-                except Exception as e:
-                    logger.warning(f"Error procesando track de album: {e}")
+            # El objeto álbum ya trae la primera página de tracks: solo se piden las siguientes
+            first_page = album["tracks"]
+            limit = first_page.get('limit') or ALBUM_PAGE_SIZE
             
-            logger.debug(f"✅ {len(track_infos)} tracks de album procesados")
-            return album_name, track_infos
+            def fetch_page(offset):
+                """Página convertida y enriquecida: ``(track_infos, enriquecida)``.
+
+                Corre en los workers de ``_iter_pages``, así que el lote de varios
+                tracks de una página se pide mientras otras páginas se descargan
+                o enriquecen. ``offset=None`` es la primera página, ya incluida
+                en el objeto álbum.
+                """
+                if offset is None:
+                    items = first_page['items']
+                else:
+                    items = call_with_retry(
+                        self.sp.album_tracks, album_id, limit=limit, offset=offset, budget=self.budget
+                    )['items']
+                page_infos = []
+                for track in items:
+                    try:
+                        page_infos.append(self._album_track_to_info(track, album_name, album_art, release_date))
+                    except Exception as e:
+                        logger.warning(f"Error procesando track de album: {e}")
+                # Una página de álbum (50) = un lote del endpoint de varios tracks
+                return page_infos, self._enrich_tracks(page_infos)
             
-        except spotipy.exceptions.SpotifyException as e:
-            if e.http_status == 404:
-                raise ValueError(f"Album no encontrado: {album_url}")
-            elif e.http_status == 401:
-                raise ValueError("Credenciales de Spotify inválidas")
-            else:
-                raise ValueError(f"Error de Spotify API: {e}")
-        except Exception as e:
-            logger.error(f"Error obteniendo album: {e}")
-            raise ValueError(f"Error obteniendo album: {e}")
\ No newline at end of file
+            offsets = range(len(first_page['items']), first_page['total'], limit) if first_page['next'] else ()
+            writer = self.cache.chunk_writer("album", album_id)
+            enriched = True
+            try:
+                for page_infos, page_enriched in self._iter_pages(fetch_page, chain([None], offsets)):
+                    enriched = enriched and page_enriched
+                    writer.add([info.to_dict() for info in page_infos])
+                    yield from page_infos
+            except BaseException:
+                writer.discard()
+                raise
+            
+            logger.debug(f"✅ {writer.count} tracks de album procesados")
+            if not enriched:
+                # Sin ISRC no se guarda: con el TTL largo de los álbumes nunca se completarían
+                logger.debug(f"Album {album_id} not cached: ISRC enrichment failed")
+                writer.discard()
+                return
+            writer.commit({"name": album_name}, etag=etag)
+
+    def get_album_tracks(self, album_url: str) -> Tuple[str, List[TrackInfo]]:
+        """Get all tracks from a Spotify album"""
+        album_name, _, tracks = self.iter_album_tracks(album_url)
+        return album_name, list(tracks)
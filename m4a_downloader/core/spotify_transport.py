@@ -0,0 +1,108 @@
+"""Spotify transport policy - shared request budget, Retry-After and retries with backoff"""
+import logging
+import random
+import threading
+import time
+
+import spotipy
+
+logger = logging.getLogger(__name__)
+
+# Estados reintentables; todas las peticiones a la Web API son GET idempotentes
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# Un Retry-After mayor (bloqueo largo de Spotify) aborta en lugar de esperar
+MAX_RETRY_AFTER = 300.0
+
+
+class RequestBudget:
+    """Token bucket global de peticiones compartido por todos los clientes y trabajos.
+
+    ``pause()`` detiene a todos los hilos a la vez: cuando Spotify responde 429
+    nadie vuelve a llamar antes de que venza el ``Retry-After``.
+    """
+
+    def __init__(self, rate=10.0, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquear hasta que haya presupuesto para una petición"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def retry_after(headers):
+    """Segundos de ``Retry-After`` (``None`` si no viene o no es numérico)"""
+    if not headers:
+        return None
+    for name, value in headers.items():
+        if name.lower() == 'retry-after':
+            try:
+                return max(0.0, float(value))
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _backoff(attempt):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def call_with_retry(fn, *args, budget=None, max_retries=MAX_RETRIES, **kwargs):
+    """Ejecutar una petición GET respetando el presupuesto global.
+
+    Un 429 pausa a todos los hilos durante ``Retry-After`` (o el backoff si no
+    viene); los 5xx y errores de red se reintentan con backoff exponencial.
+    """
+    budget = budget or spotify_budget
+    for attempt in range(max_retries + 1):
+        budget.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except spotipy.exceptions.SpotifyException as e:
+            if e.http_status not in RETRY_STATUS or attempt == max_retries:
+                raise
+            if e.http_status == 429:
+                wait = retry_after(e.headers)
+                if wait is None:
+                    wait = _backoff(attempt)
+                elif wait > MAX_RETRY_AFTER:
+                    raise
+                logger.warning(f"Spotify rate limit reached, waiting {wait:.1f}s")
+                budget.pause(wait)
+                continue
+            error = e
+        except OSError as e:
+            # requests.RequestException hereda de IOError: cubre ambos transportes
+            if attempt == max_retries:
+                raise
+            error = e
+        delay = _backoff(attempt)
+        logger.debug(f"Spotify request failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+# Presupuesto global compartido por todos los trabajos del proceso
+spotify_budget = RequestBudget()
@@ -0,0 +1,125 @@
+"""Per-stage timing of download jobs - monotonic timers, percentiles and JSON reports"""
+import json
+import platform
+from array import array
+import threading
+import time
+from contextlib import contextmanager
+
+# Orden de presentación de las etapas conocidas; las demás van al final
+STAGE_ORDER = ('enumerate', 'metadata', 'search', 'transfer', 'ffmpeg', 'lyrics', 'cover', 'tag')
+
+
+def percentile(values, pct):
+    """Percentil por interpolación lineal (``values`` no vacío)"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class StageTimings:
+    """Duraciones por etapa de un trabajo, medidas con ``time.perf_counter`` (monótono).
+
+    Se comparte entre todos los workers; ``listener(stage, seconds, context)``
+    recibe cada medición (p. ej. para emitirla como evento) y ``tracer`` (un
+    ``TraceRecorder``) guarda además cada medición como span en su hilo.
+    """
+
+    def __init__(self, listener=None, enabled=True, tracer=None):
+        self.listener = listener
+        self.enabled = enabled
+        self.tracer = tracer
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, start=None, **context):
+        """Añadir una muestra; ``start`` (``perf_counter``) sitúa el span en la traza"""
+        if not self.enabled:
+            return
+        with self._lock:
+            # array('d'): 8 bytes por muestra, también en trabajos de decenas de miles de tracks
+            self._samples.setdefault(stage, array('d')).append(seconds)
+        if self.listener:
+            self.listener(stage, seconds, context)
+        if self.tracer and start is not None:
+            self.tracer.span(stage, start, seconds, **context)
+
+    @contextmanager
+    def measure(self, stage, **context):
+        """Medir el bloque como una muestra de ``stage`` (también si lanza)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, start=start, **context)
+
+    def bind(self, **context):
+        """Vista que añade ``context`` (fuente, track...) a cada medición"""
+        return BoundTimings(self, context)
+
+    def summary(self):
+        """``{stage: {count, total_s, mean_s, p50_s, p95_s, p99_s, max_s}}`` en orden de etapa"""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+        result = {}
+        for stage in sorted(samples, key=lambda name: (order.get(name, len(order)), name)):
+            values = samples[stage]
+            total = sum(values)
+            result[stage] = {
+                "count": len(values),
+                "total_s": round(total, 4),
+                "mean_s": round(total / len(values), 4),
+                "p50_s": round(percentile(values, 50), 4),
+                "p95_s": round(percentile(values, 95), 4),
+                "p99_s": round(percentile(values, 99), 4),
+                "max_s": round(max(values), 4),
+            }
+        return result
+
+    def format_table(self):
+        """Líneas de texto con el desglose por etapa para el resumen del trabajo"""
+        lines = [f"{'etapa':<10} {'n':>5} {'total':>9} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for stage, row in self.summary().items():
+            lines.append(
+                f"{stage:<10} {row['count']:>5} {row['total_s']:>8.1f}s "
+                f"{row['p50_s']:>7.2f}s {row['p95_s']:>7.2f}s {row['p99_s']:>7.2f}s"
+            )
+        return lines
+
+    def save_report(self, path, wall_seconds, **meta):
+        """Guardar el desglose como JSON junto al tiempo total y los datos del trabajo"""
+        report = {
+            "meta": dict(
+                timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                python=platform.python_version(),
+                platform=platform.platform(),
+                wall_s=round(wall_seconds, 3),
+                **meta,
+            ),
+            "stages": self.summary(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+class BoundTimings:
+    """``StageTimings`` con contexto fijo; misma interfaz ``record`` / ``measure``"""
+
+    def __init__(self, timings, context):
+        self.timings = timings
+        self.context = context
+
+    def record(self, stage, seconds, start=None):
+        self.timings.record(stage, seconds, start=start, **self.context)
+
+    def measure(self, stage):
+        return self.timings.measure(stage, **self.context)
+
+
+# Sin medición (llamadas fuera del pipeline, p. ej. el retag o los benchmarks)
+NULL_TIMINGS = StageTimings(enabled=False)
@@ -0,0 +1,75 @@
+"""Chrome trace (Perfetto / chrome://tracing) timeline of a download job"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TraceRecorder:
+    """Spans por etapa y por track, un carril por hilo.
+
+    Los spans se guardan como eventos "X" (completos) del formato Trace Event
+    de Chrome, con ``ts``/``dur`` en microsegundos relativos al inicio del
+    trabajo. ``list.append`` es atómico, así que los workers no toman locks
+    salvo para el contador de tracks en curso.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _us(self, perf_time):
+        return round((perf_time - self._origin) * 1_000_000, 1)
+
+    def span(self, name, start, seconds, category="stage", **args):
+        """Añadir un span que empezó en ``start`` (``perf_counter``) en el hilo actual"""
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread.name
+        self._events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._us(start),
+            "dur": round(seconds * 1_000_000, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        })
+
+    @contextmanager
+    def track(self, name, **args):
+        """Span de un track completo; actualiza el contador de tracks en curso"""
+        self._count_active(+1)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.span(name, start, time.perf_counter() - start, category="track", **args)
+            self._count_active(-1)
+
+    def _count_active(self, delta):
+        with self._lock:
+            self._active += delta
+            self._events.append({
+                "name": "tracks en curso",
+                "ph": "C",
+                "ts": self._us(time.perf_counter()),
+                "pid": os.getpid(),
+                "args": {"tracks": self._active},
+            })
+
+    def save(self, path, **metadata):
+        """Escribir el JSON (``{"traceEvents": [...]}``) para Perfetto / chrome://tracing"""
+        pid = os.getpid()
+        events = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "MorphyDownloader"}},
+        ]
+        for tid, name in self._threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        events.extend(self._events)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "metadata": metadata}, f, ensure_ascii=False)
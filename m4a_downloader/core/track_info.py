@@ -0,0 +1,60 @@
+"""Typed track records shared by every pipeline stage"""
+from dataclasses import asdict, dataclass, fields
+from typing import Optional, Tuple
+
+
+@dataclass(slots=True)
+class TrackInfo:
+    """Metadata de un track tal como la usan búsqueda, descarga, tagging y letras.
+
+    ``__slots__`` evita un ``__dict__`` por instancia: en trabajos de decenas de
+    miles de tracks ocupa una fracción de lo que ocupaba el dict equivalente.
+    """
+
+    track_title: str = ""
+    artist_name: str = ""
+    artists: Tuple[str, ...] = ()
+    album_name: str = ""
+    album_art: str = ""
+    release_date: str = ""
+    track_number: int = 0
+    isrc: str = ""
+    duration: int = 0
+    # "spotify:track:<id>" / "youtube:<id>", se guarda en los tags para el retag
+    source_id: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        """Construir desde un dict (cachés en disco); las claves desconocidas se ignoran"""
+        values = {name: data[name] for name in _FIELD_NAMES if name in data}
+        if "artists" in values:
+            values["artists"] = tuple(values["artists"] or ())
+        return cls(**values)
+
+    @classmethod
+    def coerce(cls, value):
+        """Aceptar tanto ``TrackInfo`` como el dict de la API anterior"""
+        return value if isinstance(value, cls) else cls.from_dict(value)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @property
+    def main_artist(self):
+        return self.artists[0] if self.artists else self.artist_name
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(TrackInfo))
+
+
+@dataclass(slots=True)
+class YouTubeEntry:
+    """Video a descargar; ``track`` ya viene resuelto cuando la URL era un solo video"""
+
+    url: str
+    title: str = ""
+    playlist_title: str = ""
+    track_number: int = 1
+    track: Optional[TrackInfo] = None
+    # Segundos según la playlist (0 si no se conoce); sirve para estimar el coste del track
+    duration: int = 0
@@ -1,7 +1,8 @@
 """YouTube audio downloader module - Optimized version with MP3/M4A support"""
 import os
 import yt_dlp
-from typing import Optional, List, Dict
+from dataclasses import dataclass, replace
+from typing import Optional, List, Dict, Iterator, Tuple
 import logging
 import re
 from difflib import SequenceMatcher
@@ -11,18 +12,43 @@ import subprocess
 import shutil
 from urllib.parse import parse_qs, urlparse
 from ..config import Config
+from .track_info import TrackInfo, YouTubeEntry
 
 logger = logging.getLogger(__name__)
 
+# Campos del info de yt-dlp que usa _metadata_from_youtube_info
+YOUTUBE_INFO_FIELDS = (
+    'id', 'title', 'track', 'artist', 'creator', 'uploader', 'channel', 'album',
+    'playlist_title', 'upload_date', 'duration',
+)
+
+
+@dataclass(slots=True)
+class SearchMatch:
+    """Video elegido para un track y cómo se encontró"""
+
+    url: str
+    query: str
+    score: Optional[float] = None  # None en el fallback (primer resultado sin puntuar)
+    title: str = ""
+    fallback: bool = False
+    cached: bool = False
+    duration: int = 0
+    # Tamaño esperado del archivo final en bytes (0 si no se conoce)
+    filesize: int = 0
+    # Resultados evaluados en todas las queries: dicts con id, título, canal, duración y score
+    candidates: Tuple[dict, ...] = ()
+
+
 class YouTubeDownloader:
-    def __init__(self, output_dir: str = "music/tmp", quality: str = '192', audio_format: str = 'm4a'):
+    def __init__(self, output_dir: str = "music/tmp", quality: str = '192', audio_format: str = 'm4a', search_cache=None):
+        # Se crea al descargar: una instancia que solo busca o enumera no toca el disco
         self.output_dir = output_dir
         self.quality = quality
         self.audio_format = audio_format.lower()
-        os.makedirs(self.output_dir, exist_ok=True)
         
-        # Cache para búsquedas recientes
-        self.search_cache = {}
+        # Cache para búsquedas recientes; ``search_cache`` la comparte entre instancias
+        self.search_cache = {} if search_cache is None else search_cache
         
         # Verificar FFmpeg si se necesita MP3
         if self.audio_format == 'mp3' and not Config.check_ffmpeg():
@@ -44,10 +70,10 @@ class YouTubeDownloader:
         
         return ' '.join(words)
     
-    def _get_optimized_search_queries(self, track_info: dict) -> List[str]:
+    def _get_optimized_search_queries(self, track_info: TrackInfo) -> List[str]:
         """Generar consultas de búsqueda optimizadas - menos variantes, más efectivas"""
-        artist = track_info.get('artist_name', '')
-        title = track_info.get('track_title', '')
+        artist = track_info.artist_name
+        title = track_info.track_title
         
         # Normalizar para búsqueda
         clean_artist = re.sub(r'[^\w\s-]', '', artist)
@@ -65,13 +91,13 @@ class YouTubeDownloader:
         
         return queries
     
-    def _quick_score_video(self, entry, track_info: dict) -> float:
+    def _quick_score_video(self, entry, track_info: TrackInfo) -> float:
         """Scoring rápido y eficiente - solo métricas esenciales"""
         if not entry or not entry.get('title'):
             return 0.0
         
-        artist_norm = self._normalize_text(track_info.get('artist_name', ''))
-        title_norm = self._normalize_text(track_info.get('track_title', ''))
+        artist_norm = self._normalize_text(track_info.artist_name)
+        title_norm = self._normalize_text(track_info.track_title)
         
         video_title_norm = self._normalize_text(entry.get('title', ''))
         uploader_norm = self._normalize_text(entry.get('uploader', ''))
@@ -117,8 +143,49 @@ class YouTubeDownloader:
         
         return min(1.0, score)
     
-    def _search_single_query(self, query: str, track_info: dict) -> Optional[Dict]:
-        """Buscar en una sola query y retornar el mejor resultado"""
+    def estimate_filesize(self, info: dict) -> int:
+        """Tamaño esperado (bytes) del archivo final de un video según el formato de salida"""
+        duration = info.get('duration') or 0
+        if self.audio_format == 'mp3':
+            return int(duration * int(self.quality) * 1000 / 8)
+        # Mismo criterio que el format de _get_ydl_opts: bestaudio[ext=m4a]/bestaudio
+        audio = [
+            f for f in info.get('formats') or []
+            if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')
+        ]
+        candidates = [f for f in audio if f.get('ext') == 'm4a'] or audio
+        best = max(candidates, key=lambda f: f.get('abr') or f.get('tbr') or 0, default=None)
+        if best:
+            size = best.get('filesize') or best.get('filesize_approx')
+            bitrate = best.get('abr') or best.get('tbr')
+            if size:
+                return int(size)
+            if bitrate and duration:
+                return int(duration * bitrate * 1000 / 8)
+        return int(info.get('filesize') or info.get('filesize_approx') or 0)
+
+    def _candidate(self, entry, score: Optional[float]) -> dict:
+        """Resumen de un resultado de búsqueda para el plan de descarga"""
+        return {
+            'id': entry.get('id'),
+            'title': entry.get('title') or "",
+            'uploader': entry.get('uploader') or "",
+            'duration': int(entry.get('duration') or 0),
+            'score': round(score, 3) if score is not None else None,
+        }
+
+    def _match(self, entry, query: str, score: Optional[float], candidates, fallback: bool = False) -> SearchMatch:
+        return SearchMatch(
+            f"https://www.youtube.com/watch?v={entry['id']}", query, score, entry.get('title') or "",
+            fallback=fallback, duration=int(entry.get('duration') or 0),
+            filesize=self.estimate_filesize(entry), candidates=tuple(candidates),
+        )
+
+    def _search_single_query(self, query: str, track_info: TrackInfo, candidates=None) -> Optional[Dict]:
+        """Buscar en una sola query y retornar el mejor resultado
+
+        Si se pasa ``candidates`` (lista), se le añade cada resultado evaluado.
+        """
         try:
             ydl_opts = {
                 'quiet': True,
@@ -144,6 +211,8 @@ class YouTubeDownloader:
                         continue
                         
                     score = self._quick_score_video(entry, track_info)
+                    if candidates is not None:
+                        candidates.append(self._candidate(entry, score))
                     
                     if score > best_score:
                         best_video = entry
@@ -162,48 +231,58 @@ class YouTubeDownloader:
             
         return None
     
-    def find_youtube(self, track_info: dict) -> str:
+    def find_youtube(self, track_info: TrackInfo) -> str:
         """Búsqueda ultra-optimizada en YouTube con fallback agregando 'song' al título si no se encuentra resultado adecuado"""
-        if not track_info or not track_info.get('track_title'):
+        return self.search_youtube(track_info).url
+
+    def has_cached_search(self, track_info: TrackInfo) -> bool:
+        """``True`` si ``search_youtube`` respondería desde la caché, sin buscar"""
+        return f"{track_info.artist_name}_{track_info.track_title}".lower() in self.search_cache
+
+    def search_youtube(self, track_info: TrackInfo) -> SearchMatch:
+        """Como ``find_youtube`` pero devuelve también la query, el score y el título elegidos"""
+        if not track_info or not track_info.track_title:
             raise ValueError("Track info cannot be empty")
 
-        artist = track_info.get('artist_name', '')
-        title = track_info.get('track_title', '')
+        artist = track_info.artist_name
+        title = track_info.track_title
 
         # Cache check
         cache_key = f"{artist}_{title}".lower()
-        if cache_key in self.search_cache:
-            cached_result = self.search_cache[cache_key]
+        cached_result = self.search_cache.get(cache_key)
+        if cached_result is not None:
             logger.debug(f"Using cached result for: {artist} - {title}")
-            return cached_result
+            return replace(cached_result, cached=True)
 
         logger.debug(f"Searching YouTube for: {artist} - {title}")
         start_time = time.time()
 
         queries = self._get_optimized_search_queries(track_info)
+        candidates = []
 
         # Buscar secuencialmente, parando en el primer buen resultado
         for query in queries:
-            result = self._search_single_query(query, track_info)
+            result = self._search_single_query(query, track_info, candidates)
 
             if result and result['score'] > 0.4:
-                video_url = f"https://www.youtube.com/watch?v={result['entry']['id']}"
+                match = self._match(result['entry'], query, result['score'], candidates)
 
                 # Cache del resultado
-                self.search_cache[cache_key] = video_url
+                self.search_cache[cache_key] = match
 
                 # Limpiar cache si se vuelve muy grande
                 if len(self.search_cache) > 100:
                     # Remover entradas más antiguas (simple FIFO)
                     oldest_keys = list(self.search_cache.keys())[:20]
                     for key in oldest_keys:
-                        del self.search_cache[key]
+                        # pop: otra instancia que comparte la caché puede haberla vaciado ya
+                        self.search_cache.pop(key, None)
 
                 elapsed_time = time.time() - start_time
                 logger.info(f"Found: {result['entry'].get('title')} by {result['entry'].get('uploader')} "
                             f"(score: {result['score']:.2f}, time: {elapsed_time:.1f}s)")
 
-                return video_url
+                return match
 
         # Fallback: agregar 'song' al final del título y buscar de nuevo, usar el primer resultado
         logger.info(f"No suitable video found for: {artist} - {title}, retrying with 'song' appended...")
@@ -224,11 +303,12 @@ class YouTubeDownloader:
                     entry = entries[0]
                     # Validar que el entry tiene 'id' y 'title' para evitar cuelgues
                     if 'id' in entry and 'title' in entry:
-                        video_url = f"https://www.youtube.com/watch?v={entry['id']}"
-                        self.search_cache[cache_key] = video_url
+                        candidates.append(self._candidate(entry, None))
+                        match = self._match(entry, fallback_query, None, candidates, fallback=True)
+                        self.search_cache[cache_key] = match
                         elapsed_time = time.time() - start_time
                         logger.info(f"Fallback used: {entry.get('title')} by {entry.get('uploader')} (time: {elapsed_time:.1f}s)")
-                        return video_url
+                        return match
                     else:
                         logger.warning(f"Fallback entry missing 'id' or 'title': {entry}")
         except Exception as e:
@@ -291,7 +371,17 @@ class YouTubeDownloader:
             return thumbnails[-1].get('url', '')
         return info.get('thumbnail', '')
 
-    def _metadata_from_youtube_info(self, info: dict, track_number: int = 1) -> dict:
+    def _slim_info(self, info: dict) -> dict:
+        """Proyección mínima del info de yt-dlp: solo los campos que usa la metadata.
+
+        El info completo (formatos, miniaturas, subtítulos...) ocupa cientos de KB
+        por video; no debe quedar referenciado en las listas de entries.
+        """
+        slim = {key: info[key] for key in YOUTUBE_INFO_FIELDS if info.get(key) is not None}
+        slim['thumbnail'] = self._select_thumbnail(info)
+        return slim
+
+    def _metadata_from_youtube_info(self, info: dict, track_number: int = 1) -> TrackInfo:
         artist = (
             info.get('artist')
             or info.get('creator')
@@ -305,34 +395,23 @@ class YouTubeDownloader:
         if len(upload_date) == 8:
             release_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
 
-        return {
-            "artist_name": artist,
-            "track_title": title,
-            "track_number": track_number,
-            "isrc": "",
-            "album_art": self._select_thumbnail(info),
-            "album_name": info.get('playlist_title') or info.get('album') or "YouTube",
-            "release_date": release_date,
-            "artists": [artist],
-            "youtube_url": info.get('webpage_url') or info.get('original_url') or info.get('url', ''),
-        }
-
-    def get_youtube_entries(self, url: str) -> List[dict]:
-        """Extraer videos descargables desde una URL de YouTube video/playlist."""
-        parsed = urlparse(url)
-        query = parse_qs(parsed.query)
-        is_playlist = "list" in query or parsed.path.lower().startswith("/playlist")
-
-        with yt_dlp.YoutubeDL(self._get_info_opts(flat_playlist=is_playlist)) as ydl:
-            info = ydl.extract_info(url, download=False)
-
-        if not info:
-            raise ValueError("No se pudo leer la URL de YouTube")
+        return TrackInfo(
+            artist_name=artist,
+            track_title=title,
+            track_number=track_number,
+            album_art=self._select_thumbnail(info),
+            album_name=info.get('playlist_title') or info.get('album') or "YouTube",
+            release_date=release_date,
+            artists=(artist,),
+            duration=int(info.get('duration') or 0),
+            source_id=f"youtube:{info['id']}" if info.get('id') else "",
+        )
 
-        if info.get('_type') == 'playlist' or is_playlist:
-            playlist_title = info.get('title') or info.get('playlist_title') or "YouTube Playlist"
-            entries = []
-            for index, entry in enumerate(info.get('entries') or [], start=1):
+    def _iter_playlist_entries(self, raw_entries, playlist_title: str, ydl=None) -> Iterator[YouTubeEntry]:
+        """Convertir entries de playlist a medida que yt-dlp los va produciendo"""
+        try:
+            found = False
+            for index, entry in enumerate(raw_entries, start=1):
                 if not entry:
                     continue
                 video_id = entry.get('id')
@@ -342,27 +421,74 @@ class YouTubeDownloader:
                 if not video_url:
                     logger.warning(f"Skipping playlist item without URL: {entry.get('title', 'Unknown')}")
                     continue
-                entries.append({
-                    "url": video_url,
-                    "title": entry.get('title') or f"Track {index}",
-                    "playlist_title": playlist_title,
-                    "track_number": index,
-                })
-
-            if not entries:
+                found = True
+                yield YouTubeEntry(
+                    url=video_url,
+                    title=entry.get('title') or f"Track {index}",
+                    playlist_title=playlist_title,
+                    track_number=index,
+                    duration=int(entry.get('duration') or 0),
+                )
+
+            if not found:
                 raise ValueError("La playlist de YouTube no contiene videos descargables")
+        finally:
+            if ydl is not None:
+                ydl.close()
+
+    def iter_youtube_entries(self, url: str) -> Tuple[str, bool, int, Iterator[YouTubeEntry]]:
+        """Devolver ``(título, es_playlist, total, entries)`` sin enumerar la playlist completa.
+
+        Las playlists se leen con ``process=False``: yt-dlp pide cada página de
+        la playlist a medida que se consumen los entries, así que la primera
+        descarga empieza tras la primera página. ``total`` es 0 si no se conoce.
+        """
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        is_playlist = "list" in query or parsed.path.lower().startswith("/playlist")
+
+        if not is_playlist:
+            with yt_dlp.YoutubeDL(self._get_info_opts(flat_playlist=False)) as ydl:
+                info = ydl.extract_info(url, download=False)
+
+            if not info:
+                raise ValueError("No se pudo leer la URL de YouTube")
+
+            if info.get('_type') == 'playlist':
+                playlist_title = info.get('title') or info.get('playlist_title') or "YouTube Playlist"
+                entries = self._iter_playlist_entries(info.get('entries') or [], playlist_title)
+                return playlist_title, True, info.get('playlist_count') or 0, entries
+
+            # La metadata ya está resuelta: el pipeline no vuelve a extraerla
+            return "", False, 1, iter([YouTubeEntry(
+                url=info.get('webpage_url') or url,
+                title=info.get('title') or "YouTube video",
+                track=self._metadata_from_youtube_info(self._slim_info(info)),
+            )])
 
-            return entries
+        # El YoutubeDL debe seguir abierto mientras se consumen los entries
+        ydl = yt_dlp.YoutubeDL(self._get_info_opts(flat_playlist=True))
+        try:
+            info = ydl.extract_info(url, download=False, process=False)
+            # watch?v=...&list=... resuelve primero a la pestaña de la playlist
+            while info and info.get('_type') in ('url', 'url_transparent'):
+                info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+            if not info:
+                raise ValueError("No se pudo leer la URL de YouTube")
+        except Exception:
+            ydl.close()
+            raise
+
+        playlist_title = info.get('title') or info.get('playlist_title') or "YouTube Playlist"
+        entries = self._iter_playlist_entries(info.get('entries') or [], playlist_title, ydl)
+        return playlist_title, True, info.get('playlist_count') or 0, entries
 
-        return [{
-            "url": info.get('webpage_url') or url,
-            "title": info.get('title') or "YouTube video",
-            "playlist_title": "",
-            "track_number": 1,
-            "info": info,
-        }]
+    def get_youtube_entries(self, url: str) -> List[YouTubeEntry]:
+        """Extraer videos descargables desde una URL de YouTube video/playlist."""
+        _, _, _, entries = self.iter_youtube_entries(url)
+        return list(entries)
 
-    def get_youtube_metadata(self, url: str, track_number: int = 1, playlist_title: str = "") -> dict:
+    def get_youtube_metadata(self, url: str, track_number: int = 1, playlist_title: str = "") -> TrackInfo:
         """Obtener metadata completa para un video de YouTube."""
         with yt_dlp.YoutubeDL(self._get_info_opts(flat_playlist=False)) as ydl:
             info = ydl.extract_info(url, download=False)
@@ -370,6 +496,7 @@ class YouTubeDownloader:
         if not info:
             raise ValueError(f"No se pudo leer la metadata de YouTube: {url}")
 
+        info = self._slim_info(info)
         if playlist_title:
             info['playlist_title'] = playlist_title
         return self._metadata_from_youtube_info(info, track_number)
@@ -421,10 +548,19 @@ class YouTubeDownloader:
             logger.error(f"Error during FFmpeg conversion: {e}")
             raise
     
-    def download_audio(self, yt_link: str, playlist: bool = False) -> str:
-        """Download audio from YouTube link in specified format"""
+    def download_audio(self, yt_link: str, playlist: bool = False, progress_hook=None, postprocessor_hook=None) -> str:
+        """Download audio from YouTube link in specified format
+
+        ``progress_hook`` recibe los dicts de progreso de yt-dlp (bytes descargados/totales)
+        y ``postprocessor_hook`` el inicio y fin de cada postproceso (FFmpeg).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
         ydl_opts = self._get_ydl_opts()
         ydl_opts['noplaylist'] = not playlist
+        if progress_hook:
+            ydl_opts['progress_hooks'] = [progress_hook]
+        if postprocessor_hook:
+            ydl_opts['postprocessor_hooks'] = [postprocessor_hook]
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             try:
@@ -455,9 +591,9 @@ class YouTubeDownloader:
                 logger.error(f"Error downloading {yt_link}: {e}")
                 raise
     
-    def get_output_filename(self, track_info: dict) -> str:
+    def get_output_filename(self, track_info: TrackInfo) -> str:
         """Generar nombre de archivo de salida basado en el formato"""
-        artist = re.sub(r'[\\/:*?"<>|]', '', track_info.get('artist_name', ''))
-        title = re.sub(r'[\\/:*?"<>|]', '', track_info.get('track_title', ''))
+        artist = re.sub(r'[\\/:*?"<>|]', '', track_info.artist_name)
+        title = re.sub(r'[\\/:*?"<>|]', '', track_info.track_title)
         extension = self.audio_format
         return f"{title} - {artist}.{extension}"
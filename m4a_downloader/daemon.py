@@ -0,0 +1,500 @@
+"""Headless download service - local HTTP/JSON job API over a persistent queue"""
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from .cli import _source_counts, download_batch
+from .config import Config
+from .core.spotify_client import SpotifyClient
+from .core.youtube_downloader import YouTubeDownloader
+from .settings import load_settings
+from .utils import is_spotify_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Líneas de log que se conservan por trabajo (solo en memoria)
+LOG_TAIL = 200
+# Trabajos terminados que se conservan en la cola
+MAX_FINISHED = 100
+# Opciones que acepta POST /jobs además de las URLs
+JOB_OPTIONS = ('output', 'format', 'quality', 'parallel')
+MAX_PARALLEL = 8
+# Trabajos que se ejecutan a la vez: uno pequeño no espera a que termine uno grande
+JOB_WORKERS = 3
+# YouTubeDownloader (carpeta, calidad, formato) que el servicio conserva entre trabajos
+MAX_DOWNLOADERS = 32
+# Nombres de host aceptados en la cabecera Host (contra DNS rebinding)
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+def default_queue_path():
+    return os.path.join(Config.get_config_dir(), 'daemon-queue.json')
+
+
+def default_token_path():
+    return os.path.join(Config.get_config_dir(), 'daemon-token')
+
+
+def load_token(path=None):
+    """Token de la API guardado en ``path`` (solo legible por el usuario); se genera si no existe"""
+    path = path or default_token_path()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + "\n")
+    return token
+
+
+def _host_name(header):
+    """Nombre de host de una cabecera ``Host`` sin el puerto"""
+    header = (header or '').strip().lower()
+    if header.startswith('['):
+        return header[1:].split(']', 1)[0]
+    return header.rsplit(':', 1)[0] if header.count(':') == 1 else header
+
+
+@dataclass
+class Job:
+    """Un trabajo del servicio: un lote de URLs con sus opciones y su estado"""
+
+    id: str
+    urls: list
+    options: dict = field(default_factory=dict)
+    status: str = QUEUED
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    completed: int = 0
+    total: int = 0
+    error: Optional[str] = None
+    # Resumen por fuente (``_source_counts``) al terminar
+    sources: list = field(default_factory=list)
+    log: deque = field(default_factory=lambda: deque(maxlen=LOG_TAIL), repr=False)
+    cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    PERSISTED = ('id', 'urls', 'options', 'status', 'created', 'started', 'finished',
+                 'completed', 'total', 'error', 'sources')
+
+    def to_dict(self, with_log=False):
+        data = {name: getattr(self, name) for name in self.PERSISTED}
+        if with_log:
+            data['log'] = list(self.log)
+        return data
+
+
+class JobQueue:
+    """Cola de trabajos guardada en ``path`` (JSON) en cada cambio de estado.
+
+    Un trabajo que estaba en curso cuando el servicio se detuvo vuelve a la
+    cola al arrancar; los ya descargados se saltan porque sus archivos existen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._jobs = {}
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read daemon queue {self.path}: {e}")
+            return
+        for record in records:
+            job = Job(**{name: record[name] for name in Job.PERSISTED if name in record})
+            if job.status == RUNNING:
+                job.status, job.started = QUEUED, None
+            self._jobs[job.id] = job
+
+    def _save(self):
+        """Escribir la cola (con el lock tomado); escritura atómica vía archivo temporal"""
+        finished = [job for job in self._jobs.values() if job.status in FINISHED_STATES]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self._jobs[job.id]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump([job.to_dict() for job in self._jobs.values()], f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def submit(self, urls, options):
+        job = Job(uuid.uuid4().hex[:12], list(urls), dict(options))
+        with self._cond:
+            self._jobs[job.id] = job
+            self._save()
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def next_job(self):
+        """Esperar al siguiente trabajo en cola y marcarlo en curso (``None`` al detener).
+
+        Un trabajo con alguna URL de otro en curso espera a que termine: ambos
+        escribirían (y limpiarían) la misma carpeta temporal.
+        """
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                busy = {url for job in self._jobs.values() if job.status == RUNNING for url in job.urls}
+                job = next((job for job in self._jobs.values()
+                            if job.status == QUEUED and busy.isdisjoint(job.urls)), None)
+                if job is not None:
+                    job.status, job.started = RUNNING, time.time()
+                    self._save()
+                    return job
+                self._cond.wait()
+
+    def finish(self, job, status, error=None):
+        with self._cond:
+            job.status, job.error = status, error
+            job.finished = time.time() if status in FINISHED_STATES else None
+            if status == QUEUED:
+                job.started = None
+            self._save()
+            self._cond.notify_all()
+
+    def cancel(self, job_id):
+        """Cancelar un trabajo: si está en cola no llega a empezar; si está en curso se detiene"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            job.cancel.set()
+            if job.status == QUEUED:
+                job.status, job.finished = CANCELLED, time.time()
+                self._save()
+            return job
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+
+def validate_options(options):
+    """Comprobar las opciones de un trabajo; ``ValueError`` con el motivo si alguna no es válida"""
+    audio_format = options.get('format')
+    if audio_format is not None and audio_format not in Config.SUPPORTED_FORMATS:
+        raise ValueError(f"'format' debe ser uno de {', '.join(Config.SUPPORTED_FORMATS)}")
+    quality = options.get('quality')
+    if quality is not None and quality not in Config.SUPPORTED_QUALITY:
+        raise ValueError(f"'quality' debe ser uno de {', '.join(repr(q) for q in Config.SUPPORTED_QUALITY)}")
+    parallel = options.get('parallel')
+    if parallel is not None and (isinstance(parallel, bool) or not isinstance(parallel, int)
+                                 or not 1 <= parallel <= MAX_PARALLEL):
+        raise ValueError(f"'parallel' debe ser un entero entre 1 y {MAX_PARALLEL}")
+    output = options.get('output')
+    if output is not None and not isinstance(output, str):
+        raise ValueError("'output' debe ser una ruta")
+
+
+class DownloaderPool:
+    """``YouTubeDownloader`` reutilizados entre trabajos, con una caché de búsquedas común.
+
+    Se llama con los mismos argumentos que la clase (``downloaders`` de
+    ``download_batch``); conserva los ``MAX_DOWNLOADERS`` usados más recientemente.
+    """
+
+    def __init__(self, max_size=MAX_DOWNLOADERS):
+        self.max_size = max_size
+        self.search_cache = {}
+        self._downloaders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, output_dir, quality='192', audio_format='m4a'):
+        key = (os.path.abspath(output_dir), quality, audio_format)
+        with self._lock:
+            downloader = self._downloaders.get(key)
+            if downloader is not None:
+                self._downloaders.move_to_end(key)
+                return downloader
+        downloader = YouTubeDownloader(output_dir=output_dir, quality=quality, audio_format=audio_format,
+                                       search_cache=self.search_cache)
+        with self._lock:
+            downloader = self._downloaders.setdefault(key, downloader)
+            while len(self._downloaders) > self.max_size:
+                self._downloaders.popitem(last=False)
+        return downloader
+
+
+class DownloadService:
+    """Ejecuta los trabajos de la cola en un único proceso, hasta ``job_workers`` a la vez.
+
+    El cliente de Spotify (y su token) se crea una vez y se comparte entre
+    trabajos, igual que los ``YouTubeDownloader`` (con su caché de búsquedas),
+    las cachés en memoria y en disco (Spotify, portadas, letras) y los módulos
+    ya importados: un trabajo pequeño no paga el arranque en frío de un
+    proceso nuevo, y con varios runners tampoco espera a que termine una
+    playlist grande encolada antes.
+    """
+
+    def __init__(self, queue_path=None, settings=None, token=None, job_workers=JOB_WORKERS):
+        self.settings = settings or load_settings()
+        self.queue = JobQueue(queue_path or default_queue_path())
+        self.token = token or load_token()
+        self.job_workers = max(1, job_workers)
+        self.downloaders = DownloaderPool()
+        self._spotify = None
+        self._spotify_lock = threading.Lock()
+        self._stopping = False
+        self._runners = []
+
+    def start(self):
+        for index in range(self.job_workers):
+            runner = threading.Thread(target=self._run, name=f"daemon-runner-{index}", daemon=True)
+            runner.start()
+            self._runners.append(runner)
+        return self
+
+    def stop(self):
+        """Detener el servicio; los trabajos en curso se interrumpen y vuelven a la cola"""
+        self._stopping = True
+        self.queue.stop()
+        for job in self.queue.jobs():
+            if job.status == RUNNING:
+                job.cancel.set()
+        for runner in self._runners:
+            runner.join()
+        self._runners = []
+
+    def output_root(self):
+        return os.path.abspath(self.settings.default_output_dir or Config.DEFAULT_OUTPUT_DIR)
+
+    def resolve_output(self, output=None):
+        """Carpeta de salida de un trabajo dentro de la raíz de descargas; ``ValueError`` si sale de ella"""
+        root = os.path.realpath(self.output_root())
+        if not output:
+            return root
+        path = os.path.realpath(os.path.join(root, os.path.expanduser(output)))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"'output' debe estar dentro de la carpeta de descargas: {root}")
+        return path
+
+    def spotify(self):
+        with self._spotify_lock:
+            if self._spotify is None:
+                self._spotify = SpotifyClient()
+            return self._spotify
+
+    def _run(self):
+        while True:
+            job = self.queue.next_job()
+            if job is None:
+                return
+            self._execute(job)
+
+    def _execute(self, job):
+        def log(message, level="info"):
+            job.log.append({"ts": round(time.time(), 3), "level": level, "message": str(message)})
+
+        def progress(completed, total):
+            job.completed, job.total = completed, total
+
+        options = job.options
+        try:
+            # También para trabajos ya guardados en la cola antes de esta comprobación
+            output = self.resolve_output(options.get('output'))
+            spotify = self.spotify() if any(is_spotify_url(url) for url in job.urls) else None
+            sources = download_batch(
+                job.urls, output, options.get('format'), options.get('quality'), options.get('parallel'),
+                progress, log, self.settings, spotify=spotify, cancel=job.cancel,
+                downloaders=self.downloaders,
+            )
+            job.sources = [_source_counts(source) for source in sources]
+            status, error = DONE, None
+        except Exception as e:
+            status, error = FAILED, str(e)
+        if job.cancel.is_set():
+            status = QUEUED if self._stopping else CANCELLED
+        self.queue.finish(job, status, error)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """API JSON: /health, /jobs y /jobs/<id> (GET), /jobs y /jobs/<id>/cancel (POST), /jobs/<id> (DELETE).
+
+    Solo para clientes locales: se rechaza cualquier petición con ``Origin``
+    (navegadores), con un ``Host`` que no sea local (DNS rebinding) o sin el
+    token ``Authorization: Bearer``; los POST deben ser ``application/json``,
+    lo que obliga a un navegador a hacer preflight CORS.
+    """
+
+    server_version = "MorphyDownloader"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlparse(self.path)
+        return [part for part in url.path.split('/') if part], parse_qs(url.query)
+
+    def _authorized(self, post=False):
+        """Comprobar origen, host, token y tipo de contenido; responde el error si no pasa"""
+        if self.headers.get('Origin') is not None:
+            self._send(403, {"error": "Peticiones desde navegador no permitidas"})
+            return False
+        host = _host_name(self.headers.get('Host'))
+        if host not in LOCAL_HOSTS and host != self.server.server_address[0]:
+            self._send(403, {"error": f"Host no permitido: {host}"})
+            return False
+        auth = self.headers.get('Authorization') or ''
+        scheme, _, token = auth.partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip(), self.server.service.token):
+            self._send(401, {"error": "Token no válido; está en el archivo daemon-token de la carpeta de configuración"})
+            return False
+        if post:
+            content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+            if content_type != 'application/json':
+                self._send(415, {"error": "Content-Type debe ser application/json"})
+                return False
+        return True
+
+    def _job(self, job_id):
+        job = self.server.service.queue.get(job_id)
+        if job is None:
+            self._send(404, {"error": f"Trabajo no encontrado: {job_id}"})
+        return job
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts, query = self._route()
+        queue = self.server.service.queue
+        if parts == ['health']:
+            jobs = queue.jobs()
+            self._send(200, {
+                "status": "ok",
+                "queued": sum(1 for job in jobs if job.status == QUEUED),
+                "running": [job.id for job in jobs if job.status == RUNNING],
+            })
+        elif parts == ['jobs']:
+            self._send(200, {"jobs": [job.to_dict() for job in queue.jobs()]})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job is not None:
+                self._send(200, job.to_dict(with_log=query.get('log', ['1'])[0] != '0'))
+        else:
+            self._send(404, {"error": "Ruta no encontrada"})
+
+    def do_POST(self):
+        if not self._authorized(post=True):
+            return
+        parts, _ = self._route()
+        if parts == ['jobs']:
+            self._submit()
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            self._cancel(parts[1])
+        else:
+            self._send(404, {"error": "Ruta no encontrada"})
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            self._cancel(parts[1])
+        else:
+            self._send(404, {"error": "Ruta no encontrada"})
+
+    def _submit(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            urls = payload.get('urls') or ([payload['url']] if payload.get('url') else [])
+            if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+                raise ValueError("Indica 'url' o una lista 'urls' no vacía")
+            options = {name: payload[name] for name in JOB_OPTIONS if payload.get(name) is not None}
+            validate_options(options)
+            if 'output' in options:
+                self.server.service.resolve_output(options['output'])
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        job = self.server.service.queue.submit([url.strip() for url in urls], options)
+        self._send(201, job.to_dict())
+
+    def _cancel(self, job_id):
+        job = self.server.service.queue.cancel(job_id)
+        if job is None:
+            self._send(404, {"error": f"Trabajo no encontrado: {job_id}"})
+        else:
+            self._send(202 if job.status == RUNNING else 200, job.to_dict())
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Servidor HTTP de la API (un hilo por petición) ligado a ``service``"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(host=None, port=None, queue_path=None, settings=None, log=None, jobs=None):
+    """Arrancar el servicio y atender la API hasta Ctrl+C"""
+    host = host or DEFAULT_HOST
+    port = DEFAULT_PORT if port is None else port
+    service = DownloadService(queue_path, settings, job_workers=jobs or JOB_WORKERS).start()
+    server = create_server(service, host, port)
+    if log:
+        log(f"🛰️ Servicio escuchando en http://{host}:{server.server_port} (cola: {service.queue.path})", "info")
+        log(f"🔑 Token de la API en {default_token_path()}", "info")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        if log:
+            log("🛑 Servicio detenido; los trabajos pendientes siguen en la cola", "info")
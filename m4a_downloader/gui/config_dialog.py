@@ -10,6 +10,7 @@ from PySide6.QtCore import Qt, QUrl, QSettings, Signal
 from ..config import Config
 from .theme_manager import ThemeManager
 from ..locales import _, translator
+from ..settings import Settings
 
 # Configuración de rutas de iconos
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -293,6 +294,19 @@ class ConfigDialog(QDialog):
         parallel_layout.addStretch()
         adv_layout.addLayout(parallel_layout)
         
+        self.profile_cb = QCheckBox(_('profile_downloads'))
+        adv_layout.addWidget(self.profile_cb)
+        
+        cover_layout = QHBoxLayout()
+        cover_layout.addWidget(QLabel(_('cover_max_size')))
+        self.cover_size_spinbox = QSpinBox()
+        self.cover_size_spinbox.setRange(0, 4000)
+        self.cover_size_spinbox.setSingleStep(100)
+        self.cover_size_spinbox.setValue(Settings.cover_max_size)
+        cover_layout.addWidget(self.cover_size_spinbox)
+        cover_layout.addStretch()
+        adv_layout.addLayout(cover_layout)
+        
         self.dont_show_again_cb = QCheckBox(_('dont_show_startup'))
         adv_layout.addWidget(self.dont_show_again_cb)
         
@@ -348,23 +362,11 @@ class ConfigDialog(QDialog):
         if not client_id or not client_secret:
             return False
         
-        old_id = os.environ.get('SPOTIPY_CLIENT_ID')
-        old_secret = os.environ.get('SPOTIPY_CLIENT_SECRET')
-        os.environ['SPOTIPY_CLIENT_ID'] = client_id
-        os.environ['SPOTIPY_CLIENT_SECRET'] = client_secret
-        
         try:
             from ..core.spotify_client import SpotifyClient
-            spotify = SpotifyClient()
-            spotify.get_track_info('https://open.spotify.com/track/4iV5W9uYEdYUVa79Axb7Rh')
-            return True
+            return SpotifyClient(client_id, client_secret).validate_credentials()
         except Exception:
             return False
-        finally:
-            if old_id: os.environ['SPOTIPY_CLIENT_ID'] = old_id
-            else: os.environ.pop('SPOTIPY_CLIENT_ID', None)
-            if old_secret: os.environ['SPOTIPY_CLIENT_SECRET'] = old_secret
-            else: os.environ.pop('SPOTIPY_CLIENT_SECRET', None)
     
     def save_and_close(self):
         client_id = self.client_id_entry.text().strip()
@@ -397,9 +399,17 @@ class ConfigDialog(QDialog):
         self.settings.setValue('create_subfolders', self.subfolders_cb.isChecked())
         self.settings.setValue('download_lyrics', self.lyrics_cb.isChecked())
         self.settings.setValue('parallel_downloads', self.parallel_spinbox.value())
+        self.settings.setValue('profile_downloads', self.profile_cb.isChecked())
+        self.settings.setValue('cover_max_size', self.cover_size_spinbox.value())
         self.settings.setValue('default_output_dir', self.output_dir_entry.text())
         self.settings.setValue('dont_show_config', self.dont_show_again_cb.isChecked())
         
+        # Exportar a config.toml para que la CLI headless use la misma configuración
+        try:
+            Settings.from_qsettings().save_toml()
+        except OSError as e:
+            QMessageBox.warning(self, _('error'), _('config_export_failed', error=e))
+        
         if has_spotify_credentials:
             os.environ['SPOTIPY_CLIENT_ID'] = client_id
             os.environ['SPOTIPY_CLIENT_SECRET'] = client_secret
@@ -451,9 +461,14 @@ class ConfigDialog(QDialog):
         if self.settings.value('download_lyrics', False, type=bool):
             self.lyrics_cb.setChecked(True)
 
+        if self.settings.value('profile_downloads', False, type=bool):
+            self.profile_cb.setChecked(True)
+
         saved_parallel = self.settings.value('parallel_downloads', 2, type=int)
         if 1 <= saved_parallel <= 8:
             self.parallel_spinbox.setValue(saved_parallel)
+        
+        self.cover_size_spinbox.setValue(self.settings.value('cover_max_size', Settings.cover_max_size, type=int))
             
         if self.settings.value('dont_show_config', False, type=bool):
             self.dont_show_again_cb.setChecked(True)
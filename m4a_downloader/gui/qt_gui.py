@@ -1,19 +1,25 @@
 # qt_gui.py
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QTextEdit, QFileDialog, QProgressBar, QSizePolicy, QMessageBox,
-    QComboBox, QGroupBox, QDialog
+    QPushButton, QPlainTextEdit, QFileDialog, QProgressBar, QSizePolicy, QMessageBox,
+    QComboBox, QGroupBox, QDialog, QTabWidget, QTableView, QHeaderView, QAbstractItemView
 )
 from PySide6.QtGui import QIcon, QFont, QCursor, QShortcut, QKeySequence
-from PySide6.QtCore import Qt, QThread, Signal, QSize, QSettings
+from PySide6.QtCore import Qt, QThread, Signal, QSize, QSettings, QTimer
 from ..config import Config
 from ..gui.config_dialog import get_saved_audio_format, get_saved_audio_quality
 from .theme_manager import ThemeManager
 from ..locales import _
 from ..utils import detect_url_source
+from ..settings import Settings
+from ..core.profiler import default_profile_path, run_profiled
+from ..core.events import EventCallback
+from .track_model import TrackTableModel
 
 import sys
 import os
+import html
+import queue
 import time
 import logging
 
@@ -33,18 +39,34 @@ ICON_PATHS = {
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Líneas que conserva el registro; las más antiguas se descartan
+LOG_MAX_LINES = 5000
+# Intervalo (ms) con el que la GUI vacía las colas del worker
+FLUSH_INTERVAL_MS = 100
+
 class DownloadWorker(QThread):
+    """Descarga en segundo plano.
+
+    Los mensajes de log y los eventos por track no viajan como señales (una
+    por mensaje saturaría el bucle de eventos en listas largas): se encolan y
+    la ventana los vacía por lotes con un ``QTimer``.
+    """
     progress_updated = Signal(int, int)
-    log_message = Signal(str, str) 
     download_finished = Signal(bool, str) 
     
-    def __init__(self, url, output_dir, audio_format='m4a', quality='192'):
+    def __init__(self, url, output_dir, audio_format='m4a', quality='192', settings=None):
         super().__init__()
         self.url = url
         self.output_dir = output_dir
         self.audio_format = audio_format
         self.quality = quality
+        self.settings = settings
         self.cancel_requested = False
+        self.log_queue = queue.SimpleQueue()
+        self.event_queue = queue.SimpleQueue()
+        
+    def _log(self, msg, level="info"):
+        self.log_queue.put((msg, level))
         
     def cancel(self):
         self.cancel_requested = True
@@ -72,19 +94,29 @@ class DownloadWorker(QThread):
                 elapsed = time.time() - start_time
                 if "Descarg" in msg or "Download" in msg:
                     timed_msg = f"[{elapsed:.1f}s] {msg}"
-                    self.log_message.emit(timed_msg, level)
+                    self._log(timed_msg, level)
                 else:
-                    self.log_message.emit(msg, level)
+                    self._log(msg, level)
+            
+            self._log("Connecting to API...", "info")
+            def job():
+                download(
+                    url=self.url, 
+                    output=self.output_dir,
+                    audio_format=self.audio_format,
+                    quality=self.quality,
+                    progress_callback=progress_callback, 
+                    log_callback=log_callback,
+                    settings=self.settings,
+                    events=EventCallback(lambda event, fields: self.event_queue.put((event, fields)))
+                )
             
-            self.log_message.emit("Connecting to API...", "info")
-            download(
-                url=self.url, 
-                output=self.output_dir,
-                audio_format=self.audio_format,
-                quality=self.quality,
-                progress_callback=progress_callback, 
-                log_callback=log_callback
-            )
+            if self.settings is not None and self.settings.profile_downloads:
+                # El informe completo queda junto al perfil; en el log solo la ruta
+                run_profiled(job, default_profile_path(Config.get_cache_dir('profiles')),
+                             log=self._log)
+            else:
+                job()
             
             if not self.cancel_requested:
                 total_time = time.time() - start_time
@@ -94,7 +126,7 @@ class DownloadWorker(QThread):
         except Exception as e:
             total_time = time.time() - start_time
             message = f"Error after {total_time:.1f}s: {str(e)}"
-            self.log_message.emit(str(e), "error")
+            self._log(str(e), "error")
             success = False
             
         finally:
@@ -220,12 +252,40 @@ class MorphyDownloaderQt(QWidget):
         self.progress.setTextVisible(True)
         layout.addWidget(self.progress)
 
-        self.output_box = QTextEdit()
+        # Tabla de tracks (model/view: solo se pintan las filas visibles)
+        self.track_model = TrackTableModel(self)
+        self.track_view = QTableView()
+        self.track_view.setModel(self.track_model)
+        self.track_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.track_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.track_view.setWordWrap(False)
+        self.track_view.verticalHeader().setVisible(False)
+        # Altura fija: la vista no mide cada fila al insertar miles
+        self.track_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.track_view.verticalHeader().setDefaultSectionSize(24)
+        self.track_view.horizontalHeader().setStretchLastSection(True)
+        self.track_view.setColumnWidth(0, 56)
+        self.track_view.setColumnWidth(1, 200)
+        self.track_view.setColumnWidth(2, 140)
+        self.track_view.setColumnWidth(3, 110)
+        self.track_view.setColumnWidth(4, 70)
+
+        # Registro acotado: texto plano con un máximo de bloques (ring buffer)
+        self.output_box = QPlainTextEdit()
         self.output_box.setReadOnly(True)
         self.output_box.setFont(QFont('JetBrains Mono', 10))
-        self.output_box.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.output_box.setMinimumHeight(140)
-        layout.addWidget(self.output_box)
+        self.output_box.setMaximumBlockCount(LOG_MAX_LINES)
+
+        self.output_tabs = QTabWidget()
+        self.output_tabs.addTab(self.track_view, _('tracks_tab'))
+        self.output_tabs.addTab(self.output_box, _('log_tab'))
+        self.output_tabs.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.output_tabs.setMinimumHeight(180)
+        layout.addWidget(self.output_tabs)
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush_worker_output)
 
         bottom_layout = QHBoxLayout()
         bottom_layout.setSpacing(8)
@@ -356,6 +416,9 @@ class MorphyDownloaderQt(QWidget):
         self.lbl_quality.setText(_('quality'))
         self.folder_label.setText(_('output_folder'))
         self.download_btn.setText(_('download'))
+        self.output_tabs.setTabText(0, _('tracks_tab'))
+        self.output_tabs.setTabText(1, _('log_tab'))
+        self.track_model.retranslate()
         self.on_format_changed(self.format_combo.currentText())
 
     def setup_styling(self):
@@ -412,6 +475,8 @@ class MorphyDownloaderQt(QWidget):
                 return
         
         self.output_box.clear()
+        self.track_model.clear()
+        self.output_tabs.setCurrentIndex(0)
         
         if source_type == 'spotify_track':
             msg = _('preparing_song', format=audio_format.upper())
@@ -431,14 +496,15 @@ class MorphyDownloaderQt(QWidget):
         self.cancel_btn.setEnabled(True)
         self.progress.setValue(0)
         
-        self.worker_thread = DownloadWorker(url, output, audio_format, quality)
+        # Snapshot leído en el hilo de la GUI; el worker no vuelve a tocar QSettings
+        self.worker_thread = DownloadWorker(url, output, audio_format, quality, settings=Settings.from_qsettings())
         self.worker_thread.progress_updated.connect(self.update_progress)
-        self.worker_thread.log_message.connect(self.handle_log_message)
         self.worker_thread.download_finished.connect(self.handle_download_finished)
         
         start_msg = f"Start: {time.strftime('%H:%M:%S')} - {audio_format.upper()} {quality}kbps"
         self.append_log(start_msg, "#888888")
         
+        self.flush_timer.start()
         self.worker_thread.start()
 
     def cancel_download(self):
@@ -452,7 +518,27 @@ class MorphyDownloaderQt(QWidget):
             percent = int((current / total) * 100)
             self.progress.setValue(percent)
 
-    def handle_log_message(self, message, level):
+    @staticmethod
+    def _drain(source):
+        items = []
+        while True:
+            try:
+                items.append(source.get_nowait())
+            except queue.Empty:
+                return items
+
+    def flush_worker_output(self):
+        """Aplicar por lotes los eventos y mensajes acumulados por el worker"""
+        worker = self.worker_thread
+        if worker is None:
+            return
+        events = self._drain(worker.event_queue)
+        if events:
+            self.track_model.apply_events(events)
+        # Lo que no cabe en el registro se descartaría igualmente: no se pinta
+        messages = self._drain(worker.log_queue)[-LOG_MAX_LINES:]
+        if not messages:
+            return
         theme = ThemeManager.get_theme(self.current_theme)
         color_map = {
             "error": theme['ERROR_COLOR'],
@@ -460,9 +546,17 @@ class MorphyDownloaderQt(QWidget):
             "warning": "#f1c40f",
             "info": None
         }
-        self.append_log(message, color_map.get(level))
+        self.output_box.setUpdatesEnabled(False)
+        try:
+            for message, level in messages:
+                self.append_log(message, color_map.get(level), scroll=False)
+        finally:
+            self.output_box.setUpdatesEnabled(True)
+        self._scroll_log()
 
     def handle_download_finished(self, success, message):
+        self.flush_timer.stop()
+        self.flush_worker_output()
         theme = ThemeManager.get_theme(self.current_theme)
         color = theme['SUCCESS_COLOR'] if success else theme['ERROR_COLOR']
         self.append_log(message, color)
@@ -478,13 +572,14 @@ class MorphyDownloaderQt(QWidget):
             self.worker_thread.deleteLater()
             self.worker_thread = None
 
-    def append_log(self, text, color=None):
-        font_family = "JetBrains Mono, Fira Code, Monaco, 'Courier New', monospace"
-        if color:
-            self.output_box.append(f'<span style="color:{color}; font-family:{font_family}; font-size:11px; line-height: 1.7;">{text}</span>')
-        else:
-            self.output_box.append(f'<span style="font-family:{font_family}; font-size:11px; line-height: 1.7;">{text}</span>')
-        
+    def append_log(self, text, color=None, scroll=True):
+        # Color explícito: appendHtml hereda el formato del bloque anterior
+        color = color or ThemeManager.get_theme(self.current_theme)['FG_COLOR']
+        self.output_box.appendHtml(f'<span style="color:{color}; white-space:pre-wrap;">{html.escape(str(text))}</span>')
+        if scroll:
+            self._scroll_log()
+
+    def _scroll_log(self):
         scrollbar = self.output_box.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
 
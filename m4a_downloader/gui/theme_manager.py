@@ -155,7 +155,7 @@ class ThemeManager:
             color: {thm["FG_COLOR"]};
             selection-background-color: {thm["PRIMARY_COLOR"]};
         }}
-        QTextEdit {{ 
+        QTextEdit, QPlainTextEdit {{ 
             background: {thm["BG_COLOR"]}; 
             color: {thm["FG_COLOR"]}; 
             border-radius: 12px; 
@@ -237,6 +237,23 @@ class ThemeManager:
         QCheckBox {{
             color: {thm["FG_COLOR"]};
         }}
+        QTableView {{
+            background: {thm["BG_COLOR"]};
+            color: {thm["FG_COLOR"]};
+            border: 2px solid {thm["ENTRY_BG"]};
+            border-radius: 12px;
+            gridline-color: {thm["ENTRY_BG"]};
+            selection-background-color: {thm["PRIMARY_COLOR"]};
+            selection-color: white;
+            font-size: 12px;
+        }}
+        QHeaderView::section {{
+            background: {thm["ENTRY_BG"]};
+            color: {thm["FG_COLOR"]};
+            border: none;
+            padding: 4px 8px;
+            font-weight: 600;
+        }}
         """
 
     @staticmethod
@@ -0,0 +1,169 @@
+# track_model.py
+"""Per-track status table of a download job, fed by its structured events"""
+from dataclasses import dataclass
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from ..locales import _
+
+# Claves de traducción de las cabeceras, en orden de columna
+COLUMNS = ('col_number', 'col_title', 'col_artist', 'col_status', 'col_progress', 'col_video')
+COL_NUMBER, COL_TITLE, COL_ARTIST, COL_STATUS, COL_PROGRESS, COL_VIDEO = range(len(COLUMNS))
+
+STARTED = 'started'
+DOWNLOADING = 'downloading'
+PROCESSING = 'processing'
+DONE = 'done'
+EXISTS = 'exists'
+FAILED = 'failed'
+STATUS_KEYS = {
+    STARTED: 'status_started',
+    DOWNLOADING: 'status_downloading',
+    PROCESSING: 'status_processing',
+    DONE: 'status_done',
+    EXISTS: 'status_exists',
+    FAILED: 'status_failed',
+}
+
+
+@dataclass(slots=True)
+class TrackRow:
+    source: int
+    track: int
+    title: str = ""
+    artist: str = ""
+    video: str = ""
+    status: str = STARTED
+    percent: int = 0
+    error: str = ""
+
+
+class TrackTableModel(QAbstractTableModel):
+    """Una fila por track del trabajo, actualizada por lotes de eventos.
+
+    ``apply_events`` recibe los eventos acumulados desde el último lote y
+    emite como mucho una inserción de filas y un ``dataChanged``: la vista solo
+    repinta las filas visibles, así que sigue fluida con decenas de miles.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._positions = {}
+        self._sources = set()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return _(COLUMNS[section])
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == COL_NUMBER:
+                # Con varias fuentes (lote), "fuente.track"
+                return f"{row.source}.{row.track}" if len(self._sources) > 1 else str(row.track)
+            if column == COL_TITLE:
+                return row.title
+            if column == COL_ARTIST:
+                return row.artist
+            if column == COL_STATUS:
+                status = _(STATUS_KEYS[row.status])
+                return f"{status}: {row.error}" if row.error else status
+            if column == COL_PROGRESS:
+                return f"{row.percent}%" if row.percent else ""
+            if column == COL_VIDEO:
+                return row.video
+        elif role == Qt.ToolTipRole and column == COL_STATUS and row.error:
+            return row.error
+        elif role == Qt.TextAlignmentRole and column in (COL_NUMBER, COL_PROGRESS):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._positions = {}
+        self._sources = set()
+        self.endResetModel()
+
+    def retranslate(self):
+        """Repintar cabeceras y estados tras cambiar el idioma"""
+        self.headerDataChanged.emit(Qt.Horizontal, 0, len(COLUMNS) - 1)
+        if self._rows:
+            self.dataChanged.emit(self.index(0, COL_STATUS), self.index(len(self._rows) - 1, COL_STATUS))
+
+    def apply_events(self, events):
+        """Aplicar una lista de ``(event, fields)`` del trabajo"""
+        added = []
+        first_changed = last_changed = None
+        for event, fields in events:
+            track = fields.get('track')
+            if track is None:
+                continue
+            key = (fields.get('source'), track)
+            position = self._positions.get(key)
+            if position is None:
+                if event != 'track_start':
+                    continue
+                position = len(self._rows) + len(added)
+                self._positions[key] = position
+                self._sources.add(key[0])
+                added.append(TrackRow(key[0], track))
+            row = self._rows[position] if position < len(self._rows) else added[position - len(self._rows)]
+            if not self._update(row, event, fields):
+                continue
+            if position < len(self._rows):
+                first_changed = position if first_changed is None else min(first_changed, position)
+                last_changed = position if last_changed is None else max(last_changed, position)
+
+        if first_changed is not None:
+            self.dataChanged.emit(self.index(first_changed, 0), self.index(last_changed, len(COLUMNS) - 1))
+        if added:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+
+    @staticmethod
+    def _update(row, event, fields):
+        """Actualizar ``row`` con un evento; ``False`` si el evento no le afecta"""
+        if event == 'track_start':
+            row.title = fields.get('title') or row.title
+            row.artist = fields.get('artist') or row.artist
+            row.status = STARTED
+        elif event == 'track_resolved':
+            row.title = fields.get('title') or row.title
+            row.artist = fields.get('artist') or row.artist
+            row.video = fields.get('video_title') or fields.get('video_url') or ""
+        elif event == 'progress':
+            total = fields.get('total_bytes')
+            row.status = DOWNLOADING
+            if total:
+                row.percent = min(100, int(100 * (fields.get('downloaded_bytes') or 0) / total))
+        elif event == 'stage':
+            if fields.get('stage') != 'transfer':
+                return False
+            row.status = PROCESSING
+            row.percent = 100
+        elif event == 'skip':
+            row.status = EXISTS
+        elif event == 'error':
+            if not fields.get('fatal'):
+                return False
+            row.status = FAILED
+            row.error = fields.get('message') or ""
+        elif event == 'track_done':
+            row.status = DONE
+            row.percent = 100
+        else:
+            return False
+        return True
@@ -1,8 +1,6 @@
 """
 Módulo para el manejo de idiomas (Internacionalización) en la aplicación.
 """
-from PySide6.QtCore import QSettings
-
 TRANSLATIONS = {
     "es": {
         "title": "Harmony",
@@ -49,6 +47,7 @@ TRANSLATIONS = {
         "file_naming": "Plantilla de Archivos:",
         "create_subfolders": "Crear subcarpetas para Álbumes/Playlists",
         "download_lyrics": "Buscar e incrustar letras (Lyrics)",
+        "profile_downloads": "Perfilar descargas (diagnóstico de rendimiento)",
         
         # Alertas
         "error": "Error",
@@ -57,6 +56,23 @@ TRANSLATIONS = {
         "invalid_url": "Debe ser una URL válida de Spotify o YouTube.",
         "ffmpeg_missing_warn": "Has seleccionado MP3 pero FFmpeg no está instalado.\n¿Deseas continuar con M4A en su lugar?",
         "cancel_confirm": "¿Estás seguro de que quieres cerrar? La descarga se cancelará.",
+        "config_export_failed": "No se pudo exportar config.toml: {error}",
+        
+        # Tabla de tracks y registro
+        "tracks_tab": "Tracks",
+        "log_tab": "Registro",
+        "col_number": "#",
+        "col_title": "Título",
+        "col_artist": "Artista",
+        "col_status": "Estado",
+        "col_progress": "Progreso",
+        "col_video": "Video",
+        "status_started": "En cola",
+        "status_downloading": "Descargando",
+        "status_processing": "Procesando",
+        "status_done": "Listo",
+        "status_exists": "Ya existía",
+        "status_failed": "Error",
         
         # Nombres de Plantillas Visuales
         "naming_default": "Predeterminado: Título",
@@ -68,6 +84,7 @@ TRANSLATIONS = {
         "files_group": "Archivos y Carpetas",
         "advanced_group": "Avanzado",
         "parallel_downloads": "Descargas Paralelas:",
+        "cover_max_size": "Tamaño máximo de portada (px, 0 = original):",
         "dont_show_startup": "No mostrar configuración al inicio",
         "check_ffmpeg": "Verificar FFmpeg",
         
@@ -126,6 +143,7 @@ TRANSLATIONS = {
         "file_naming": "File Naming Format:",
         "create_subfolders": "Create subfolders for Albums/Playlists",
         "download_lyrics": "Search and embed song Lyrics",
+        "profile_downloads": "Profile downloads (performance diagnostics)",
         
         # Alerts
         "error": "Error",
@@ -134,6 +152,23 @@ TRANSLATIONS = {
         "invalid_url": "It must be a valid Spotify or YouTube URL.",
         "ffmpeg_missing_warn": "You picked MP3 but FFmpeg is not installed.\nDo you want to continue with M4A instead?",
         "cancel_confirm": "Are you sure you want to close? Download will be canceled.",
+        "config_export_failed": "Could not export config.toml: {error}",
+        
+        # Track table and log
+        "tracks_tab": "Tracks",
+        "log_tab": "Log",
+        "col_number": "#",
+        "col_title": "Title",
+        "col_artist": "Artist",
+        "col_status": "Status",
+        "col_progress": "Progress",
+        "col_video": "Video",
+        "status_started": "Queued",
+        "status_downloading": "Downloading",
+        "status_processing": "Processing",
+        "status_done": "Done",
+        "status_exists": "Already exists",
+        "status_failed": "Error",
         
         # Naming Defaults
         "naming_default": "Default: Title",
@@ -145,6 +180,7 @@ TRANSLATIONS = {
         "files_group": "Files & Folders",
         "advanced_group": "Advanced Settings",
         "parallel_downloads": "Parallel Downloads:",
+        "cover_max_size": "Max cover size (px, 0 = original):",
         "dont_show_startup": "Don't show config at startup",
         "check_ffmpeg": "Check FFmpeg",
         
@@ -161,16 +197,26 @@ TRANSLATIONS = {
 }
 
 class Translator:
-    def __init__(self):
-        # El usuario pidió el default en inglés
-        settings = QSettings('MorphyDownloader', 'Config')
-        self.language = settings.value('language', 'en')
-        if self.language not in TRANSLATIONS:
-            self.language = 'en'
+    def __init__(self, language=None):
+        # El idioma se resuelve al primer uso, así importar este módulo no carga Qt
+        self._language = language
+        
+    @property
+    def language(self):
+        if self._language is None:
+            # El usuario pidió el default en inglés
+            try:
+                from .settings import Settings
+                language = Settings.from_qsettings().language
+            except ImportError:
+                language = 'en'
+            self._language = language if language in TRANSLATIONS else 'en'
+        return self._language
             
     def set_language(self, lang_code):
         if lang_code in TRANSLATIONS:
-            self.language = lang_code
+            self._language = lang_code
+            from PySide6.QtCore import QSettings
             settings = QSettings('MorphyDownloader', 'Config')
             settings.setValue('language', lang_code)
             
@@ -0,0 +1,133 @@
+"""
+Snapshot inmutable de la configuración de usuario.
+
+Se carga una vez por trabajo (QSettings en la GUI, TOML o variables de entorno
+en modo headless) y se pasa explícitamente al pipeline, así que ``core`` y la
+CLI nunca importan PySide6 ni releen la configuración por cada track.
+"""
+import dataclasses
+import logging
+import os
+from dataclasses import dataclass
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+ENV_PREFIX = 'MORPHY_'
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Los nombres coinciden con las claves de QSettings('MorphyDownloader', 'Config')
+    audio_format: str = Config.DEFAULT_FORMAT
+    audio_quality: str = Config.DEFAULT_QUALITY
+    parallel_downloads: int = 2
+    naming_format: str = '{title}.{ext}'
+    create_subfolders: bool = False
+    download_lyrics: bool = False
+    language: str = 'en'
+    default_output_dir: str = ''
+    # Portadas: lado máximo en px (0 = sin límite) y calidad JPEG al recodificar
+    cover_max_size: int = 1000
+    cover_quality: int = 90
+    # Perfilar cada trabajo (diagnóstico): perfil pstats + informe top-N
+    profile_downloads: bool = False
+    # Orden de descarga de los tracks de un trabajo (ver core.schedule.SCHEDULE_POLICIES)
+    schedule_policy: str = 'longest'
+
+    @classmethod
+    def from_mapping(cls, values, base=None):
+        """Crear un snapshot desde un dict, ignorando claves desconocidas"""
+        base = base or cls()
+        changes = {}
+        for field in dataclasses.fields(cls):
+            if field.name in values and values[field.name] is not None:
+                try:
+                    changes[field.name] = _coerce(values[field.name], field.type)
+                except (TypeError, ValueError):
+                    logger.warning(f"Invalid value for setting '{field.name}': {values[field.name]!r}")
+        return dataclasses.replace(base, **changes)
+
+    @classmethod
+    def from_qsettings(cls):
+        """Leer la configuración guardada por la GUI (requiere PySide6)"""
+        from PySide6.QtCore import QSettings
+        qsettings = QSettings('MorphyDownloader', 'Config')
+        values = {field.name: qsettings.value(field.name) for field in dataclasses.fields(cls)}
+        return cls.from_mapping(values)
+
+    @classmethod
+    def from_toml(cls, path, base=None):
+        """Leer un archivo TOML plano (``audio_format = "mp3"``, ...)"""
+        import tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+        # Se aceptan las claves en la raíz o bajo una tabla [settings]
+        return cls.from_mapping(data.get('settings', data), base=base)
+
+    @classmethod
+    def from_env(cls, base=None, environ=None):
+        """Aplicar overrides ``MORPHY_<CLAVE>`` desde el entorno"""
+        environ = os.environ if environ is None else environ
+        values = {}
+        for field in dataclasses.fields(cls):
+            env_name = f"{ENV_PREFIX}{field.name.upper()}"
+            if env_name in environ:
+                values[field.name] = environ[env_name]
+        return cls.from_mapping(values, base=base)
+
+    def to_toml(self):
+        """Serializar como TOML plano para compartir la configuración con la CLI"""
+        lines = []
+        for field in dataclasses.fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, bool):
+                rendered = 'true' if value else 'false'
+            elif isinstance(value, int):
+                rendered = str(value)
+            else:
+                rendered = '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+            lines.append(f"{field.name} = {rendered}")
+        return "\n".join(lines) + "\n"
+
+    def save_toml(self, path=None):
+        path = path or get_default_config_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_toml())
+        return path
+
+
+def _coerce(value, field_type):
+    if field_type in (bool, 'bool'):
+        if isinstance(value, str):
+            return value.strip().lower() in TRUE_VALUES
+        return bool(value)
+    if field_type in (int, 'int'):
+        return int(value)
+    return str(value)
+
+
+def get_default_config_path():
+    """Ruta del ``config.toml`` compartido entre la GUI y la CLI"""
+    return os.environ.get(f'{ENV_PREFIX}CONFIG') or os.path.join(Config.get_config_dir(), 'config.toml')
+
+
+def load_settings(config_path=None):
+    """Cargar el snapshot para un trabajo headless: TOML (si existe) + entorno.
+
+    No toca QSettings: la GUI construye su snapshot con ``Settings.from_qsettings()``
+    y exporta ``config.toml`` al guardar, así la CLI ve la misma configuración.
+    """
+    settings = Settings()
+    path = config_path or get_default_config_path()
+    if config_path or os.path.exists(path):
+        try:
+            settings = Settings.from_toml(path)
+        except (OSError, ValueError) as e:
+            if config_path:
+                raise
+            logger.warning(f"Failed to read settings from {path}: {e}")
+    return Settings.from_env(base=settings)
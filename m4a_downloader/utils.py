@@ -50,5 +50,18 @@ def is_youtube_url(url):
     return detect_url_source(url).startswith("youtube")
 
 
+def youtube_video_id(url):
+    """Return the video id of a YouTube watch/short/youtu.be URL, or ``None``."""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host not in YOUTUBE_HOSTS:
+        return None
+    if host == "youtu.be":
+        return parsed.path.strip("/").split("/")[0] or None
+    if parsed.path.startswith("/shorts/"):
+        return parsed.path.split("/")[2] or None
+    return parse_qs(parsed.query).get("v", [None])[0]
+
+
 def sanitize_filename_part(value):
     return "".join(ch for ch in str(value) if ch not in '\\/:*?"<>|').strip()
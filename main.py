@@ -3,33 +3,34 @@
 MorphyDownloader - Spotify to MP3 Downloader
 Punto de entrada optimizado con auto-instalación y gestión de iconos
 """
-from PySide6.QtWidgets import QApplication, QMessageBox, QDialog
 import sys
 import os
 import argparse
+import importlib.util
 import subprocess
 import platform
 
 # Añadir el directorio del proyecto al path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def install_requirements():
+def install_requirements(gui=True):
     """Instalar dependencias automáticamente si no están disponibles"""
     required_packages = [
         'spotipy',
         'yt-dlp', 
         'mutagen',
-        'PySide6',
         'typer',
         'rich',
         'certifi'  # Añadido para certificados SSL
     ]
+    if gui:
+        required_packages.append('PySide6')
     
+    # find_spec no importa el paquete: el modo CLI no debe cargar Qt
     missing_packages = []
     for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
+        module_name = package.replace('-', '_')
+        if importlib.util.find_spec(module_name) is None:
             missing_packages.append(package)
     
     if missing_packages:
@@ -96,7 +97,7 @@ def check_assets():
     else:
         print("✅ Todos los assets encontrados")
 
-def show_dependencies_status():
+def show_dependencies_status(check_gui_assets=True):
     """Mostrar estado de todas las dependencias"""
     print("\n🔍 Verificando dependencias...")
     print("=" * 50)
@@ -111,8 +112,9 @@ def show_dependencies_status():
     else:
         print("⚠️ Credenciales de Spotify no configuradas")
     
-    # Assets
-    check_assets()
+    # Assets (solo la GUI los necesita; importarlos carga Qt)
+    if check_gui_assets:
+        check_assets()
     
     print("=" * 50)
     
@@ -137,26 +139,32 @@ def main():
     """Punto de entrada principal optimizado"""
     print("🎵 MorphyDownloader - Iniciando...")
     
-    # Auto-instalar dependencias básicas
-    if not install_requirements():
-        sys.exit(1)
-    
-    # Verificar todas las dependencias
-    show_dependencies_status()
-    
     parser = argparse.ArgumentParser(
         description='MorphyDownloader - Descarga música desde Spotify o YouTube'
     )
     parser.add_argument('--cli', action='store_true', help='Usar modo línea de comandos')
     parser.add_argument('-u', '--url', type=str, help='URL de Spotify o YouTube (solo para modo CLI)')
+    parser.add_argument('-b', '--batch', type=str, help="Archivo con URLs, una por línea ('-' para stdin; solo modo CLI)")
     parser.add_argument('-o', '--output', type=str, default='music', help='Directorio de salida')
     
     args, unknown = parser.parse_known_args()
+    cli_mode = bool(args.cli or args.url or args.batch or unknown)
     
-    if args.cli or args.url or unknown:
+    # Auto-instalar dependencias básicas (PySide6 solo para la GUI)
+    if not install_requirements(gui=not cli_mode):
+        sys.exit(1)
+    
+    # Verificar todas las dependencias
+    show_dependencies_status(check_gui_assets=not cli_mode)
+    
+    if cli_mode:
         # Modo CLI
         from m4a_downloader.utils import is_spotify_url
-        needs_spotify = bool(args.url and is_spotify_url(args.url))
+        urls = []
+        if args.url or args.batch:
+            from m4a_downloader.core.batch import read_url_file, read_url_list
+            urls = read_url_list(([args.url] if args.url else []) + (read_url_file(args.batch) if args.batch else []))
+        needs_spotify = any(is_spotify_url(url) for url in urls)
 
         if needs_spotify and not check_spotify_credentials():
             print("❌ Error: Credenciales de Spotify no configuradas.")
@@ -166,12 +174,12 @@ def main():
             print("\n📋 Más info: https://developer.spotify.com/dashboard/")
             sys.exit(1)
         
-        if args.url:
-            # Descarga directa CLI
+        if urls:
+            # Descarga directa CLI (una URL o un lote en un solo pipeline)
             try:
-                print(f"🎵 Descargando: {args.url}")
-                from m4a_downloader.cli import download
-                download(args.url, args.output)
+                print(f"🎵 Descargando: {urls[0]}" if len(urls) == 1 else f"🎵 Descargando lote de {len(urls)} URL(s)")
+                from m4a_downloader.cli import download_batch
+                download_batch(urls, args.output)
             except Exception as e:
                 print(f"❌ Error: {e}")
                 sys.exit(1)
@@ -182,6 +190,8 @@ def main():
     else:
         # Modo GUI (por defecto)
         try:
+            from PySide6.QtWidgets import QApplication, QDialog
+            
             # Fix Taskbar Icon in Windows (avoid default python logo)
             if platform.system() == "Windows":
                 import ctypes
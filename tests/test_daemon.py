@@ -0,0 +1,116 @@
+"""Download service: concurrent jobs, shared downloaders and option validation (no network)"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from m4a_downloader import daemon
+from m4a_downloader.settings import Settings
+
+BIG = "https://www.youtube.com/playlist?list=big"
+SMALL = "https://www.youtube.com/watch?v=small"
+
+
+class FakeBatch:
+    """``download_batch`` que no descarga: el trabajo BIG espera hasta ``release``"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.downloaders = []
+
+    def __call__(self, urls, output, audio_format, quality, parallel, progress, log, settings,
+                 spotify=None, cancel=None, downloaders=None):
+        self.downloaders.append(downloaders)
+        if BIG in urls:
+            while not (self.release.is_set() or cancel.is_set()):
+                time.sleep(0.01)
+        return []
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    fake = FakeBatch()
+    monkeypatch.setattr(daemon, 'download_batch', fake)
+    settings = Settings(default_output_dir=str(tmp_path / "music"))
+    service = daemon.DownloadService(str(tmp_path / "queue.json"), settings, token="token").start()
+    service.fake = fake
+    yield service
+    fake.release.set()
+    service.stop()
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_small_job_overtakes_a_running_big_one(service):
+    big = service.queue.submit([BIG], {})
+    small = service.queue.submit([SMALL], {})
+
+    _wait(lambda: small.status == daemon.DONE)
+    assert big.status == daemon.RUNNING
+
+    service.fake.release.set()
+    _wait(lambda: big.status == daemon.DONE)
+    assert service.fake.downloaders == [service.downloaders, service.downloaders]
+
+
+def test_job_sharing_a_url_with_a_running_one_waits(service):
+    first = service.queue.submit([BIG], {})
+    _wait(lambda: first.status == daemon.RUNNING)
+    second = service.queue.submit([BIG], {})
+    time.sleep(0.1)
+    assert second.status == daemon.QUEUED
+
+    service.fake.release.set()
+    _wait(lambda: second.status == daemon.DONE)
+
+
+def test_downloader_pool_reuses_instances_and_search_cache(tmp_path):
+    pool = daemon.DownloaderPool(max_size=2)
+    first = pool(output_dir=str(tmp_path / "a"), quality='192', audio_format='m4a')
+
+    assert pool(output_dir=str(tmp_path / "a"), quality='192', audio_format='m4a') is first
+    other = pool(output_dir=str(tmp_path / "b"), quality='320', audio_format='mp3')
+    assert other is not first and other.search_cache is first.search_cache
+
+    pool(output_dir=str(tmp_path / "c"))
+    assert pool(output_dir=str(tmp_path / "a"), quality='192', audio_format='m4a') is not first
+
+
+@pytest.mark.parametrize("options, status", [
+    ({"quality": "320", "format": "mp3", "parallel": 4}, 201),
+    ({"quality": 320}, 400),
+    ({"quality": "1000"}, 400),
+    ({"format": "flac"}, 400),
+    ({"parallel": 0}, 400),
+    ({"parallel": "4"}, 400),
+    ({"output": ["a"]}, 400),
+])
+def test_submit_validates_options(tmp_path, options, status):
+    service = daemon.DownloadService(str(tmp_path / "queue.json"),
+                                     Settings(default_output_dir=str(tmp_path / "music")), token="token")
+    server = daemon.create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_port}/jobs", method="POST",
+            data=json.dumps(dict(options, url=SMALL)).encode('utf-8'),
+            headers={"Authorization": "Bearer token", "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                code = response.status
+        except urllib.error.HTTPError as e:
+            code = e.code
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert code == status
+    assert len(service.queue.jobs()) == (1 if status == 201 else 0)
@@ -0,0 +1,74 @@
+"""Lyrics prefetcher lifecycle against a fake lrclib (no network)"""
+import threading
+import time
+
+from m4a_downloader.core import lyrics
+from m4a_downloader.core.track_info import TrackInfo
+
+
+class MemoryCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return key in self.entries, self.entries.get(key)
+
+    def put(self, key, value):
+        self.entries[key] = value
+
+
+def _tracks(n):
+    return [TrackInfo(artist_name="Artist", track_title=f"Song {i}", duration=180) for i in range(n)]
+
+
+def _blocking_fetch(monkeypatch):
+    """``fetch_lyrics`` que no termina hasta ``release``; registra los títulos pedidos"""
+    release = threading.Event()
+    calls = []
+
+    def fetch(artist, title, duration=0):
+        calls.append(title)
+        release.wait(5)
+        return f"lyrics of {title}"
+
+    monkeypatch.setattr(lyrics, 'fetch_lyrics', fetch)
+    return release, calls
+
+
+def test_cancel_pending_drops_only_queued_prefetches(monkeypatch):
+    release, calls = _blocking_fetch(monkeypatch)
+    prefetcher = lyrics.LyricsPrefetcher(MemoryCache(), max_workers=1)
+    tracks = _tracks(5)
+
+    keys = prefetcher.prefetch(tracks)
+    assert len(keys) == 5
+    prefetcher.cancel_pending(keys[1:])
+    release.set()
+
+    assert prefetcher.get(tracks[0]) == "lyrics of Song 0"
+    prefetcher.shutdown()
+    assert calls == ["Song 0"]
+
+
+def test_release_of_the_last_user_shuts_the_executor_down(monkeypatch):
+    release, calls = _blocking_fetch(monkeypatch)
+    prefetcher = lyrics.LyricsPrefetcher(MemoryCache(), max_workers=1)
+    tracks = _tracks(3)
+
+    prefetcher.acquire()
+    prefetcher.acquire()
+    prefetcher.prefetch(tracks)
+    while not calls:
+        time.sleep(0.01)
+    prefetcher.release()
+    assert prefetcher._executor is not None
+
+    prefetcher.release()
+    assert prefetcher._executor is None
+    assert list(prefetcher._inflight) == [lyrics._lyrics_key(tracks[0])]
+    release.set()
+
+    # Un trabajo nuevo vuelve a crear los hilos; lo cancelado se busca al taggear
+    assert prefetcher.prefetch(tracks[2:]) == [lyrics._lyrics_key(tracks[2])]
+    assert prefetcher.get(tracks[1]) == "lyrics of Song 1"
+    prefetcher.shutdown()
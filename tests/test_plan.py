@@ -0,0 +1,67 @@
+"""plan_batch against fake Spotify/YouTube clients (no network, no downloads)"""
+import threading
+import time
+
+from m4a_downloader import cli
+from m4a_downloader.core.track_info import TrackInfo
+from m4a_downloader.core.youtube_downloader import SearchMatch
+from m4a_downloader.settings import Settings
+
+URLS = ["https://open.spotify.com/playlist/a", "https://open.spotify.com/playlist/b",
+        "https://open.spotify.com/playlist/c"]
+
+
+def _track(i):
+    return TrackInfo(track_title=f"Song {i}", artist_name="Artist", track_number=i + 1,
+                     source_id=f"spotify:track:{i}", duration=180)
+
+
+class FakeSpotify:
+    """Playlists de 3 tracks, una página lenta por track; registra las enumeraciones a la vez"""
+
+    active = max_active = 0
+    lock = threading.Lock()
+
+    def iter_playlist_tracks(self, url):
+        base = 10 * URLS.index(url)
+
+        def pages():
+            cls = type(self)
+            with cls.lock:
+                cls.active += 1
+                cls.max_active = max(cls.max_active, cls.active)
+            try:
+                for i in range(3):
+                    time.sleep(0.05)
+                    yield _track(base + i)
+            finally:
+                with cls.lock:
+                    cls.active -= 1
+
+        return url.rsplit('/', 1)[1], 3, pages()
+
+
+class FakeResolver:
+    instances = 0
+
+    def __init__(self, output_dir, quality='192', audio_format='m4a'):
+        type(self).instances += 1
+
+    def search_youtube(self, track_info):
+        return SearchMatch(f"https://www.youtube.com/watch?v={track_info.source_id}", "q", 0.9, "video",
+                           duration=180)
+
+
+def test_plan_enumerates_sources_concurrently_without_creating_folders(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'SpotifyClient', FakeSpotify)
+    monkeypatch.setattr(cli, 'YouTubeDownloader', FakeResolver)
+    output = tmp_path / "music"
+
+    plan = cli.plan_batch(URLS, str(tmp_path / "plan.json"), output=str(output),
+                          settings=Settings(create_subfolders=True), log_callback=lambda message, level: None)
+
+    assert plan["summary"]["resolved"] == 9
+    assert [source["folder"] for source in plan["sources"]] == ["a", "b", "c"]
+    assert FakeSpotify.max_active >= 2
+    assert FakeResolver.instances == 1
+    assert not output.exists()
@@ -0,0 +1,31 @@
+"""Sampling profiler across short-lived worker threads"""
+import threading
+import time
+
+from m4a_downloader.core.profiler import SamplingProfiler
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_finished_threads_are_dropped_from_the_cpu_clocks():
+    profiler = SamplingProfiler(interval=0.005).start()
+    try:
+        workers = [threading.Thread(target=_busy, args=(0.1,), name=f"worker-{i}") for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # Un par de muestras más tras terminar los workers
+        time.sleep(0.05)
+    finally:
+        profiler.stop()
+    alive = {thread.native_id for thread in threading.enumerate()}
+
+    assert sum(profiler.thread_samples[f"worker-{i}"] for i in range(4)) > 0
+    assert profiler._cpu_time.keys() <= alive
+    if profiler.cpu_clocks:
+        assert sum(profiler.thread_cpu[f"worker-{i}"] for i in range(4)) > 0
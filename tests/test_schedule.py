@@ -0,0 +1,26 @@
+"""Cost model updates from the stage timings of a finished job"""
+from m4a_downloader.core.schedule import DEFAULT_COSTS, HISTORY_WEIGHT, CostModel
+
+
+def _blend(previous, observed):
+    return (1 - HISTORY_WEIGHT) * previous + HISTORY_WEIGHT * observed
+
+
+def test_per_second_costs_count_the_audio_of_failed_attempts():
+    model = CostModel()
+    # Dos intentos de 200 s de audio: uno descargado y otro que falló tras transferir
+    summary = {'transfer': {'total_s': 8.0, 'mean_s': 4.0}, 'ffmpeg': {'total_s': 2.0, 'mean_s': 2.0}}
+
+    model.update(summary, {'transfer': 400, 'ffmpeg': 200})
+
+    assert model.costs['transfer_per_s'] == _blend(DEFAULT_COSTS['transfer_per_s'], 8.0 / 400)
+    assert model.costs['ffmpeg_per_s'] == _blend(DEFAULT_COSTS['ffmpeg_per_s'], 2.0 / 200)
+
+
+def test_stages_without_audio_keep_their_cost():
+    model = CostModel()
+
+    model.update({'transfer': {'total_s': 8.0, 'mean_s': 8.0}, 'search': {'total_s': 3.0, 'mean_s': 1.5}}, {})
+
+    assert model.costs['transfer_per_s'] == DEFAULT_COSTS['transfer_per_s']
+    assert model.costs['search'] == _blend(DEFAULT_COSTS['search'], 1.5)
@@ -0,0 +1,83 @@
+"""SpotifyClient album streaming against a fake spotipy client (no network)"""
+import threading
+import time
+
+from m4a_downloader.core.spotify_cache import SpotifyResponseCache
+from m4a_downloader.core.spotify_client import SpotifyClient
+from m4a_downloader.core.spotify_transport import RequestBudget
+
+PAGE_SIZE = 50
+TOTAL = 200
+
+
+def _simple_track(i):
+    return {"id": f"t{i}", "name": f"Song {i}", "artists": [{"name": "Artist"}], "track_number": i + 1,
+            "duration_ms": 180000}
+
+
+def _full_track(i):
+    return dict(_simple_track(i), external_ids={"isrc": f"ISRC{i:04d}"},
+                album={"name": "Album", "release_date": "2024-01-01", "images": []})
+
+
+class FakeSpotipy:
+    """``album_tracks`` inmediato; ``tracks`` (enriquecimiento) tarda y registra la concurrencia"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def album_tracks(self, album_id, limit, offset):
+        return {"items": [_simple_track(i) for i in range(offset, min(TOTAL, offset + limit))]}
+
+    def tracks(self, ids):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            return {"tracks": [_full_track(int(track_id[1:])) for track_id in ids]}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _client(tmp_path, fake, page_workers=4):
+    client = SpotifyClient("client-id", "client-secret", cache=SpotifyResponseCache(str(tmp_path)),
+                           page_workers=page_workers, budget=RequestBudget(rate=1000, burst=1000))
+    client._sp = fake
+    album = {
+        "name": "Album", "images": [], "release_date": "2024-01-01",
+        "tracks": {"items": [_simple_track(i) for i in range(PAGE_SIZE)], "limit": PAGE_SIZE,
+                   "total": TOTAL, "next": "page-2"},
+    }
+    client._api_get = lambda path, params=None, etag=None: (album, "etag")
+    return client
+
+
+def test_album_enrichment_of_different_pages_overlaps(tmp_path):
+    fake = FakeSpotipy()
+    client = _client(tmp_path, fake)
+
+    started = time.perf_counter()
+    name, total, tracks = client.iter_album_tracks("https://open.spotify.com/album/abc")
+    tracks = list(tracks)
+    elapsed = time.perf_counter() - started
+
+    assert (name, total, len(tracks)) == ("Album", TOTAL, TOTAL)
+    assert [info.isrc for info in tracks] == [f"ISRC{i:04d}" for i in range(TOTAL)]
+    assert fake.max_active >= 2
+    # 4 páginas x 0.2 s en serie serían 0.8 s
+    assert elapsed < 4 * fake.delay
+
+
+def test_album_enrichment_is_serial_with_one_page_worker(tmp_path):
+    fake = FakeSpotipy(delay=0.01)
+    client = _client(tmp_path, fake, page_workers=1)
+
+    tracks = list(client.iter_album_tracks("https://open.spotify.com/album/abc")[2])
+
+    assert len(tracks) == TOTAL
+    assert fake.max_active == 1
@@ -0,0 +1,92 @@
+"""Retry-After handling of Spotify 429 responses, with a fake HTTP session and clock"""
+import json
+
+import pytest
+import requests
+import spotipy
+
+from m4a_downloader.core import spotify_client, spotify_transport
+from m4a_downloader.core.spotify_cache import SpotifyResponseCache
+from m4a_downloader.core.spotify_transport import MAX_RETRY_AFTER, RequestBudget, call_with_retry
+
+
+class FakeClock:
+    """``time.monotonic``/``time.sleep`` que avanzan al dormir, sin esperar de verdad"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeSession:
+    """Sesión de requests que devuelve ``responses`` en orden y después 200"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        response = requests.Response()
+        response.status_code = status
+        response.url = url
+        response.headers.update(headers)
+        payload = {"id": "track"} if status == 200 else {"error": {"status": status, "message": "test"}}
+        response._content = json.dumps(payload).encode('utf-8')
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(spotify_transport, 'time', clock)
+    return clock
+
+
+def _spotipy(tmp_path, monkeypatch, session):
+    monkeypatch.setattr(spotify_client.SpotifyClientCredentials, 'get_access_token',
+                        lambda self, *args, **kwargs: 'token')
+    sp = spotify_client.SpotifyClient('client-id', 'client-secret', cache=SpotifyResponseCache(str(tmp_path))).sp
+    sp._session = session
+    return sp
+
+
+def test_429_waits_for_its_retry_after(tmp_path, monkeypatch, clock):
+    session = FakeSession((429, {'Retry-After': '7'}))
+    sp = _spotipy(tmp_path, monkeypatch, session)
+
+    result = call_with_retry(sp.track, "track", budget=RequestBudget(rate=100, burst=100))
+
+    assert result == {"id": "track"}
+    assert session.calls == 2
+    assert clock.sleeps == [7.0]
+
+
+def test_retry_after_above_the_limit_raises_without_waiting(tmp_path, monkeypatch, clock):
+    session = FakeSession((429, {'Retry-After': str(int(MAX_RETRY_AFTER) + 1)}))
+    sp = _spotipy(tmp_path, monkeypatch, session)
+
+    with pytest.raises(spotipy.exceptions.SpotifyException) as error:
+        call_with_retry(sp.track, "track", budget=RequestBudget(rate=100, burst=100))
+
+    assert error.value.http_status == 429
+    assert session.calls == 1
+    assert clock.sleeps == []
+
+
+def test_5xx_is_retried_with_backoff(tmp_path, monkeypatch, clock):
+    session = FakeSession((503, {}))
+    sp = _spotipy(tmp_path, monkeypatch, session)
+
+    assert call_with_retry(sp.track, "track", budget=RequestBudget(rate=100, burst=100)) == {"id": "track"}
+    assert session.calls == 2
+    assert len(clock.sleeps) == 1
+    assert spotify_transport.BACKOFF_BASE / 2 <= clock.sleeps[0] <= spotify_transport.BACKOFF_BASE